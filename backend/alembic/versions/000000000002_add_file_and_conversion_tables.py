@@ -33,6 +33,8 @@ def upgrade() -> None:
     sa.UniqueConstraint('storage_path')
     )
     op.create_index(op.f('ix_files_original_filename'), 'files', ['original_filename'], unique=False)
+    # The column below does not create its type; databases that already have it keep it
+    postgresql.ENUM('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='conversion_status_enum').create(op.get_bind(), checkfirst=True)
     op.create_table('conversions',
     sa.Column('id', sa.UUID(), nullable=False),
     sa.Column('task_id', sa.String(), nullable=True),
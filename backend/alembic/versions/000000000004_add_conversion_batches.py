@@ -0,0 +1,42 @@
+"""Add conversion_batches table and conversions.batch_id
+
+Revision ID: 000000000004
+Revises: 000000000003
+Create Date: 2025-04-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000004'
+down_revision: Union[str, None] = '000000000003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('conversion_batches',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('owner_id', sa.UUID(), nullable=False),
+    sa.Column('output_format', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_conversion_batches_owner_id'), 'conversion_batches', ['owner_id'], unique=False)
+    op.add_column('conversions', sa.Column('batch_id', sa.UUID(), nullable=True))
+    op.create_foreign_key('fk_conversions_batch_id', 'conversions', 'conversion_batches', ['batch_id'], ['id'])
+    op.create_index(op.f('ix_conversions_batch_id'), 'conversions', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_conversions_batch_id'), table_name='conversions')
+    op.drop_constraint('fk_conversions_batch_id', 'conversions', type_='foreignkey')
+    op.drop_column('conversions', 'batch_id')
+    op.drop_index(op.f('ix_conversion_batches_owner_id'), table_name='conversion_batches')
+    op.drop_table('conversion_batches')
@@ -0,0 +1,25 @@
+"""Add tier to user for priority scheduling
+
+Revision ID: 000000000005
+Revises: 000000000004
+Create Date: 2025-04-24 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000005'
+down_revision: Union[str, None] = '000000000004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('tier', sa.String(length=20), server_default='free', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'tier')
@@ -0,0 +1,25 @@
+"""Add encoder options to conversions
+
+Revision ID: 000000000006
+Revises: 000000000005
+Create Date: 2025-04-25 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000006'
+down_revision: Union[str, None] = '000000000005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversions', sa.Column('options', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('conversions', 'options')
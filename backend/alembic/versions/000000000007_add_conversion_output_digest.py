@@ -0,0 +1,27 @@
+"""Add output digest and size to conversions for HTTP caching
+
+Revision ID: 000000000007
+Revises: 000000000006
+Create Date: 2025-04-26 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000007'
+down_revision: Union[str, None] = '000000000006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversions', sa.Column('output_sha256', sa.String(length=64), nullable=True))
+    op.add_column('conversions', sa.Column('output_size', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('conversions', 'output_size')
+    op.drop_column('conversions', 'output_sha256')
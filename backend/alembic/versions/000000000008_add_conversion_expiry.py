@@ -0,0 +1,35 @@
+"""Add conversion expiry for the retention reaper
+
+Revision ID: 000000000008
+Revises: 000000000007
+Create Date: 2025-04-27 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000008'
+down_revision: Union[str, None] = '000000000007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversions', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing jobs get the default one-hour retention from their last update, so old files are reaped on the first run
+    op.execute("UPDATE conversions SET expires_at = updated_at + interval '1 hour'")
+    op.create_index(op.f('ix_conversions_expires_at'), 'conversions', ['expires_at'], unique=False)
+    # The reaper keeps File rows while conversions still reference them, and the orphan sweep
+    # looks stored keys up by value: both must be index lookups
+    op.create_index(op.f('ix_conversions_original_file_id'), 'conversions', ['original_file_id'], unique=False)
+    op.create_index(op.f('ix_conversions_converted_file_path'), 'conversions', ['converted_file_path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_conversions_converted_file_path'), table_name='conversions')
+    op.drop_index(op.f('ix_conversions_original_file_id'), table_name='conversions')
+    op.drop_index(op.f('ix_conversions_expires_at'), table_name='conversions')
+    op.drop_column('conversions', 'expires_at')
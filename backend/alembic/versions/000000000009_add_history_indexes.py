@@ -0,0 +1,27 @@
+"""Add indexes for keyset pagination of conversion history
+
+Revision ID: 000000000009
+Revises: 000000000008
+Create Date: 2025-04-27 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000009'
+down_revision: Union[str, None] = '000000000008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_files_owner_id_id', 'files', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_conversions_created_at_id', 'conversions', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversions_created_at_id', table_name='conversions')
+    op.drop_index('ix_files_owner_id_id', table_name='files')
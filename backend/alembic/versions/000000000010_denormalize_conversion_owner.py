@@ -0,0 +1,43 @@
+"""Copy owner and original filename onto conversions
+
+Revision ID: 000000000010
+Revises: 000000000009
+Create Date: 2025-04-28 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000010'
+down_revision: Union[str, None] = '000000000009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversions', sa.Column('owner_id', sa.UUID(), nullable=True))
+    op.add_column('conversions', sa.Column('original_filename', sa.String(), nullable=True))
+    # Backfill from files in one pass, then enforce the columns like the rest of the row
+    op.execute(
+        "UPDATE conversions SET owner_id = files.owner_id, original_filename = files.original_filename "
+        "FROM files WHERE files.id = conversions.original_file_id"
+    )
+    op.alter_column('conversions', 'owner_id', nullable=False)
+    op.alter_column('conversions', 'original_filename', nullable=False)
+    op.create_foreign_key('fk_conversions_owner_id', 'conversions', 'user', ['owner_id'], ['id'])
+    # Supersedes the history indexes from 000000000009: owner filter and keyset order in one index
+    op.create_index('ix_conversions_owner_id_created_at_id', 'conversions', ['owner_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_conversions_created_at_id', table_name='conversions')
+    op.drop_index('ix_files_owner_id_id', table_name='files')
+
+
+def downgrade() -> None:
+    op.create_index('ix_files_owner_id_id', 'files', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_conversions_created_at_id', 'conversions', ['created_at', 'id'], unique=False)
+    op.drop_index('ix_conversions_owner_id_created_at_id', table_name='conversions')
+    op.drop_constraint('fk_conversions_owner_id', 'conversions', type_='foreignkey')
+    op.drop_column('conversions', 'original_filename')
+    op.drop_column('conversions', 'owner_id')
@@ -0,0 +1,26 @@
+"""Add preview sizes to conversions
+
+Revision ID: 000000000011
+Revises: 000000000010
+Create Date: 2025-04-29 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000011'
+down_revision: Union[str, None] = '000000000010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable, no default: existing conversions simply have no previews
+    op.add_column('conversions', sa.Column('preview_sizes', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('conversions', 'preview_sizes')
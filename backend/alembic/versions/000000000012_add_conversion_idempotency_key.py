@@ -0,0 +1,30 @@
+"""Add idempotency keys to conversions
+
+Revision ID: 000000000012
+Revises: 000000000011
+Create Date: 2025-04-30 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000012'
+down_revision: Union[str, None] = '000000000011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversions', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    # Unique per owner; rows without a key (NULL) never conflict
+    op.create_index(
+        'ix_conversions_owner_id_idempotency_key', 'conversions', ['owner_id', 'idempotency_key'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversions_owner_id_idempotency_key', table_name='conversions')
+    op.drop_column('conversions', 'idempotency_key')
@@ -0,0 +1,49 @@
+"""Add chunked_uploads table and widen files.file_size
+
+Revision ID: 000000000013
+Revises: 000000000012
+Create Date: 2025-05-01 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000013'
+down_revision: Union[str, None] = '000000000012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chunked_uploads',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('owner_id', sa.UUID(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('offset', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('output_format', sa.String(), nullable=False),
+    sa.Column('options', sa.JSON(), nullable=True),
+    sa.Column('storage_path', sa.String(), nullable=False),
+    sa.Column('storage_state', sa.JSON(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('storage_path')
+    )
+    op.create_index(op.f('ix_chunked_uploads_owner_id'), 'chunked_uploads', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_chunked_uploads_expires_at'), 'chunked_uploads', ['expires_at'], unique=False)
+    # Resumable uploads go beyond 2 GiB, the limit of a 32-bit integer
+    op.alter_column('files', 'file_size', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('files', 'file_size', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=True)
+    op.drop_index(op.f('ix_chunked_uploads_expires_at'), table_name='chunked_uploads')
+    op.drop_index(op.f('ix_chunked_uploads_owner_id'), table_name='chunked_uploads')
+    op.drop_table('chunked_uploads')
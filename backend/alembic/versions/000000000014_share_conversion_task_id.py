@@ -0,0 +1,29 @@
+"""Let the conversions of a multi-format upload share one task id
+
+Revision ID: 000000000014
+Revises: 000000000013
+Create Date: 2025-05-02 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '000000000014'
+down_revision: Union[str, None] = '000000000013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One task converts every format of an upload, so task_id is no longer unique
+    op.drop_index(op.f('ix_conversions_task_id'), table_name='conversions')
+    op.create_index(op.f('ix_conversions_task_id'), 'conversions', ['task_id'], unique=False)
+
+
+def downgrade() -> None:
+    # Fails while multi-format uploads that share a task id remain
+    op.drop_index(op.f('ix_conversions_task_id'), table_name='conversions')
+    op.create_index(op.f('ix_conversions_task_id'), 'conversions', ['task_id'], unique=True)
@@ -0,0 +1,32 @@
+# Converter registry: maps (input MIME type, output format) pairs to converter backends.
+# Backends are referenced by import path and only imported when first used.
+
+from .registry import ConverterRegistry, ConverterSpec, Hop, UnsupportedConversionError, plan_label
+
+registry = ConverterRegistry()
+
+# --- Image conversions (Pillow) ---
+registry.register(ConverterSpec(
+    name="pillow-image",
+    input_types=frozenset({"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff"}),
+    output_formats=frozenset({"png", "jpg", "webp"}),
+    target="app.converters.image:convert",
+    multi_target="app.converters.image:convert_many",
+    streams=True,
+    job_class="image",
+    description="Raster image conversion using Pillow",
+))
+
+# --- Document conversions ---
+registry.register(ConverterSpec(
+    name="pdf-text",
+    input_types=frozenset({"application/pdf"}),
+    output_formats=frozenset({"txt"}),
+    target="app.converters.pdf:convert",
+    parallel_target="app.converters.pdf:convert_parallel",
+    job_class="document",
+    max_concurrency=4,  # Pool processes shared by all PDF page ranges in flight on a worker
+    description="PDF text extraction (page-parallel, pypdf)",
+))
+
+__all__ = ["registry", "ConverterRegistry", "ConverterSpec", "Hop", "UnsupportedConversionError", "plan_label"]
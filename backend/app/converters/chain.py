@@ -0,0 +1,76 @@
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from app.converters import registry
+from app.core.config import settings
+from app.services.progress import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+# (converter name, content type it reads, format it writes), picklable for the pool
+ChainStep = Tuple[str, str, str]
+
+
+class _HopProgress:
+    """Maps a hop's own 0..1 progress onto its share of the whole chain."""
+
+    def __init__(self, reporter: ProgressReporter, index: int, hops: int):
+        self.reporter = reporter
+        self.index = index
+        self.hops = hops
+
+    def report(self, done: float, total: Optional[float] = None, unit: str = "steps") -> None:
+        fraction = max(0.0, min(1.0, done / total if total else done))
+        self.reporter.report((self.index + fraction) / self.hops, unit="stage")
+
+
+def run_chain(
+    steps: List[ChainStep],
+    input_path: Path,
+    output_path: Path,
+    progress: Optional[ProgressReporter] = None,
+    options: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[int, float]]:
+    """
+    Runs the converters of a planned chain one after the other in this process. Each
+    intermediate result lives in a spooled temporary file, in memory up to
+    CHAIN_SPOOL_MAX_BYTES, and is handed to the next converter as a file object
+    instead of being written to CONVERTED_DIR and read back.
+
+    The request's options apply to the last hop; intermediate hops use their
+    converter's defaults. Returns the input size and duration of every hop, from
+    which the planner's cost estimates are learned.
+    """
+    timings: List[Tuple[int, float]] = []
+    source: Union[Path, BinaryIO] = input_path
+    source_size = input_path.stat().st_size
+    try:
+        for index, (name, content_type, output_format) in enumerate(steps):
+            last = index == len(steps) - 1
+            converter = registry.load(registry.by_name(name))
+            target: Union[Path, BinaryIO] = output_path if last else tempfile.SpooledTemporaryFile(
+                max_size=settings.CHAIN_SPOOL_MAX_BYTES, dir=settings.TEMP_DIR
+            )
+            hop_progress = _HopProgress(progress, index, len(steps)) if progress else None
+            logger.info(f"Chain hop {index + 1}/{len(steps)}: {content_type} -> {output_format} using '{name}'")
+            started = time.perf_counter()
+            try:
+                converter(source, target, output_format, progress=hop_progress, options=options if last else None)
+            except BaseException:
+                if not last:
+                    target.close()
+                raise
+            timings.append((source_size, time.perf_counter() - started))
+            if not isinstance(source, Path):
+                source.close()
+            source = target
+            if not last:
+                source_size = target.tell()
+                target.seek(0)
+    finally:
+        if not isinstance(source, Path):
+            source.close()
+    return timings
@@ -0,0 +1,344 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+from app.core.config import settings
+from app.services.progress import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+# Pillow refuses to decode images above twice this size; the explicit check below is stricter
+Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
+
+# Modes each output format can be written in without a conversion
+_NATIVE_MODES = {
+    "jpg": {"L", "RGB", "CMYK"},
+    "png": {"1", "L", "LA", "P", "RGB", "RGBA", "I", "I;16"},
+    "webp": {"RGB", "RGBA"},
+}
+_ALPHA_MODES = {"LA", "La", "PA", "RGBA", "RGBa"}
+_WEBP_MAX_DIMENSION = 16383
+# Pixels converted per strip on the large-image path (~16MB per RGBA strip)
+_STRIP_PIXELS = 4 * 1024 * 1024
+
+# Pillow save() arguments per preset and output format. PNG optimize (implies zlib level 9
+# plus filter trials) is the slowest option by far, so only "smallest" uses it.
+ENCODER_PRESETS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "fast": {
+        "jpg": {"quality": 80},
+        "png": {"compress_level": 1},
+        "webp": {"quality": 80, "method": 0},
+    },
+    "balanced": {
+        "jpg": {"quality": 85, "optimize": True},
+        "png": {"compress_level": 6},
+        "webp": {"quality": 85, "method": 4},
+    },
+    "smallest": {
+        "jpg": {"quality": 75, "optimize": True, "progressive": True},
+        "png": {"optimize": True},
+        "webp": {"quality": 75, "method": 6},
+    },
+}
+DEFAULT_PRESET = "balanced"
+
+# A path, or an in-memory file holding the intermediate of a chained conversion
+ImageFile = Union[Path, BinaryIO]
+
+
+def _name(source: ImageFile) -> str:
+    return source.name if isinstance(source, Path) else "intermediate image"
+
+
+def _has_alpha(img: Image.Image) -> bool:
+    return img.mode in _ALPHA_MODES or "transparency" in img.info
+
+
+def _target_mode(img: Image.Image, output_format: str) -> Optional[str]:
+    """The mode `img` must be converted to for `output_format`, or None if it can be saved as is."""
+    if img.mode in _NATIVE_MODES[output_format]:
+        return None
+    if output_format == "jpg":
+        # JPEG has no alpha channel: transparency is dropped, grayscale stays grayscale
+        return "L" if img.mode in ("1", "LA", "La") else "RGB"
+    return "RGBA" if _has_alpha(img) else "RGB"
+
+
+def _convert_in_strips(img: Image.Image, mode: str, progress: Optional[ProgressReporter]) -> Image.Image:
+    """Converts `img` to `mode` one horizontal strip at a time.
+
+    Only the source, the destination and a single strip are resident at once; a
+    chained convert (e.g. P -> RGBA -> RGB) would hold extra full-size copies.
+    """
+    width, height = img.size
+    out = Image.new(mode, img.size)
+    rows = max(1, _STRIP_PIXELS // width)
+    for top in range(0, height, rows):
+        box = (0, top, width, min(top + rows, height))
+        out.paste(img.crop(box).convert(mode), box)
+        if progress:
+            progress.report(0.3 + 0.4 * box[3] / height, unit="stage")
+    return out
+
+
+def save_options(output_format: str, options: Optional[Dict[str, Any]] = None, large: bool = False) -> Dict[str, Any]:
+    """Builds Pillow save() arguments from a preset plus per-request overrides (see ConversionOptions)."""
+    options = options or {}
+    kwargs: Dict[str, Any] = {"format": "JPEG" if output_format == "jpg" else output_format.upper()}
+    kwargs.update(ENCODER_PRESETS[options.get("preset") or DEFAULT_PRESET][output_format])
+
+    if output_format == "jpg":
+        for key in ("quality", "progressive", "subsampling"):
+            if options.get(key) is not None:
+                kwargs[key] = options[key]
+    elif output_format == "png":
+        if options.get("png_compress_level") is not None:
+            kwargs.pop("optimize", None)  # optimize would override the level
+            kwargs["compress_level"] = options["png_compress_level"]
+    elif output_format == "webp":
+        if options.get("quality") is not None:
+            kwargs["quality"] = options["quality"]
+        if options.get("webp_method") is not None:
+            kwargs["method"] = options["webp_method"]
+        if options.get("lossless") is not None:
+            kwargs["lossless"] = options["lossless"]
+
+    if large:
+        # optimize makes libjpeg buffer the whole image and zlib run extra passes; skip it for huge images
+        kwargs.pop("optimize", None)
+    return kwargs
+
+
+@contextmanager
+def _image_errors(input_path: ImageFile) -> Iterator[None]:
+    """Translates Pillow and I/O failures into ValueErrors with a message fit for the user."""
+    try:
+        yield
+    except Image.DecompressionBombError as bomb_err:
+        logger.error(f"Refusing to decode oversized image: {bomb_err}")
+        raise ValueError(f"Image is too large to convert: {_name(input_path)}")
+    except UnidentifiedImageError as img_err:
+        logger.error(f"Pillow could not identify image file: {img_err}", exc_info=True)
+        raise ValueError(f"Invalid or unsupported image file: {_name(input_path)}")
+    except ValueError:
+        raise
+    except (OSError, IOError) as io_err: # Catch file system related errors during open/save
+        logger.error(f"Pillow I/O error during conversion: {io_err}", exc_info=True)
+        raise ValueError(f"Error processing image file: {io_err}")
+    except Exception as img_exc: # Catch other potential Pillow errors
+        logger.error(f"Pillow conversion failed unexpectedly: {img_exc}", exc_info=True)
+        raise ValueError(f"Image conversion failed: {img_exc}")
+
+
+def _decode(input_path: ImageFile, max_dimension: Optional[int], progress: Optional[ProgressReporter]) -> Image.Image:
+    """Opens and fully decodes the image, downscaled to `max_dimension` if it is larger."""
+    img = Image.open(input_path)
+    try:
+        # Header-only so far: reject oversized images before any pixels are decoded
+        width, height = img.size
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise ValueError(f"Image is too large to convert ({width}x{height} pixels)")
+        logger.info(f"Opened image '{_name(input_path)}' with mode: {img.mode}, size: {width}x{height}")
+        if progress:
+            progress.report(0.1, unit="stage")
+
+        if max_dimension and max(width, height) > max_dimension:
+            # thumbnail() applies JPEG draft mode (DCT scaling) before decoding,
+            # then reduce() and a final resample on the much smaller bitmap
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            logger.info(f"Downscaled to {img.size[0]}x{img.size[1]} (max dimension {max_dimension})")
+        else:
+            img.load()
+        if progress:
+            progress.report(0.3, unit="stage")
+    except BaseException:
+        img.close()
+        raise
+    return img
+
+
+def _check_dimensions(img: Image.Image, output_format: str) -> None:
+    if output_format == "webp" and max(img.size) > _WEBP_MAX_DIMENSION:
+        raise ValueError(f"WEBP output is limited to {_WEBP_MAX_DIMENSION}px per side")
+
+
+def _converted(img: Image.Image, mode: str, large: bool, progress: Optional[ProgressReporter]) -> Image.Image:
+    """A copy of `img` in `mode`, made in one direct conversion (strip by strip when `large`)."""
+    # Never via an intermediate RGBA copy
+    return _convert_in_strips(img, mode, progress) if large else img.convert(mode)
+
+
+def _save(
+    out: Image.Image,
+    output_path: ImageFile,
+    output_format: str,
+    options: Optional[Dict[str, Any]],
+    large: bool,
+    progress: Optional[ProgressReporter],
+) -> None:
+    if progress:
+        progress.report(0.7, unit="stage")
+    out.save(output_path, **save_options(output_format, options, large))
+    logger.info(f"Pillow conversion successful to {output_path}")
+    if progress:
+        progress.report(1.0, unit="stage")
+
+
+def _encode(
+    img: Image.Image,
+    output_path: ImageFile,
+    output_format: str,
+    options: Optional[Dict[str, Any]],
+    progress: Optional[ProgressReporter],
+) -> None:
+    """Converts the decoded `img` to the mode `output_format` needs and saves it.
+
+    The source is closed as soon as it has been converted, so only one full-size
+    bitmap is resident while encoding.
+    """
+    _check_dimensions(img, output_format)
+    large = img.size[0] * img.size[1] > settings.IMAGE_STRIP_THRESHOLD_PIXELS
+    mode = _target_mode(img, output_format)
+    out = img
+    try:
+        if mode is not None:
+            logger.info(f"Converting image mode {img.mode} to {mode} for {output_format.upper()} output")
+            out = _converted(img, mode, large, progress)
+            img.close()  # Release the decoded source before encoding; close() is idempotent
+        _save(out, output_path, output_format, options, large, progress)
+    finally:
+        if out is not img:
+            out.close()
+
+
+def convert(
+    input_path: ImageFile,
+    output_path: ImageFile,
+    output_format: str,
+    progress: Optional[ProgressReporter] = None,
+    options: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Converts a raster image to png/jpg/webp using Pillow.
+
+    `options` selects the encoder preset and overrides. When `max_dimension` is set
+    the image is downscaled to fit, letting JPEG sources decode at 1/2, 1/4 or 1/8
+    scale instead of full resolution. Input and output may also be binary file objects.
+    """
+    logger.info(f"Attempting image conversion to {output_format} using Pillow...")
+    max_dimension = (options or {}).get("max_dimension")
+    with _image_errors(input_path):
+        img = _decode(input_path, max_dimension, progress)
+        try:
+            _encode(img, output_path, output_format, options, progress)
+        finally:
+            img.close()
+
+
+class _ProgressFanOut:
+    """Reports the shared decode stages to the reporter of every output."""
+
+    def __init__(self, reporters: Sequence[Optional[ProgressReporter]]):
+        self.reporters = [reporter for reporter in reporters if reporter]
+
+    def report(self, *args: Any, **kwargs: Any) -> None:
+        for reporter in self.reporters:
+            reporter.report(*args, **kwargs)
+
+
+def convert_many(
+    input_path: Path,
+    outputs: Sequence[Tuple[Path, str, Optional[ProgressReporter]]],
+    options: Optional[Dict[str, Any]] = None,
+) -> List[Optional[str]]:
+    """Converts one image to several (output_path, output_format, progress) targets.
+
+    The input is decoded once and converted once per output mode; the outputs are
+    then encoded from those bitmaps, up to IMAGE_ENCODE_THREADS at a time. Images
+    above IMAGE_STRIP_THRESHOLD_PIXELS are encoded one at a time instead, keeping
+    at most the source and one converted copy resident. Returns the error message
+    of each output, None for those that succeeded. A failure to decode the input raises.
+    """
+    formats = ", ".join(output_format for _, output_format, _ in outputs)
+    logger.info(f"Attempting image conversion to {formats} using Pillow...")
+    max_dimension = (options or {}).get("max_dimension")
+    with _image_errors(input_path):
+        img = _decode(input_path, max_dimension, _ProgressFanOut([progress for _, _, progress in outputs]))
+
+    large = img.size[0] * img.size[1] > settings.IMAGE_STRIP_THRESHOLD_PIXELS
+    errors: List[Optional[str]] = [None] * len(outputs)
+    # Outputs that need the same mode share one conversion of the source
+    by_mode: Dict[Optional[str], List[int]] = {}
+    for index, (_, output_format, _) in enumerate(outputs):
+        try:
+            _check_dimensions(img, output_format)
+        except ValueError as e:
+            errors[index] = str(e)
+            continue
+        by_mode.setdefault(_target_mode(img, output_format), []).append(index)
+
+    def convert_mode(mode: Optional[str], indices: List[int]) -> Optional[Image.Image]:
+        """The source in `mode`, or None after recording the failure for `indices`."""
+        if mode is None:
+            return img
+        try:
+            with _image_errors(input_path):
+                logger.info(f"Converting image mode {img.mode} to {mode} for {len(indices)} output(s)")
+                return _converted(img, mode, large, _ProgressFanOut([outputs[index][2] for index in indices]))
+        except ValueError as e:
+            for index in indices:
+                errors[index] = str(e)
+            return None
+
+    def encode(index: int, source: Image.Image, own_copy: bool = False) -> None:
+        output_path, output_format, progress = outputs[index]
+        out = source.copy() if own_copy else source
+        try:
+            with _image_errors(input_path):
+                _save(out, output_path, output_format, options, large, progress)
+        except ValueError as e:
+            errors[index] = str(e)
+        finally:
+            if own_copy:
+                out.close()
+
+    converted: List[Image.Image] = []
+    try:
+        if large:
+            for mode, indices in by_mode.items():
+                source = convert_mode(mode, indices)
+                if source is None:
+                    continue
+                try:
+                    for index in indices:
+                        encode(index, source)
+                finally:
+                    if source is not img:
+                        source.close()
+            return errors
+
+        jobs: List[Tuple[int, Image.Image, bool]] = []
+        for mode, indices in by_mode.items():
+            source = convert_mode(mode, indices)
+            if source is None:
+                continue
+            if source is not img:
+                converted.append(source)
+            # save() keeps per-call state on the Image object, so outputs of the same mode
+            # encoded concurrently each need their own (small) copy
+            jobs.extend((index, source, position > 0) for position, index in enumerate(indices))
+        threads = max(1, min(settings.IMAGE_ENCODE_THREADS, len(jobs)))
+        if threads == 1:
+            for index, source, _ in jobs:
+                encode(index, source)
+        else:
+            with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="encode") as executor:
+                list(executor.map(lambda job: encode(*job), jobs))
+        return errors
+    finally:
+        for source in converted:
+            source.close()
+        img.close()
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from pypdf import PdfReader
+from pypdf.errors import PdfReadError
+
+from app.core.config import settings
+from app.services.progress import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+PAGE_SEPARATOR = "\f"  # Form feed after every page, as pdftotext does
+# Extracted chunks allowed ahead of the one being written; bounds memory for huge documents
+_READ_AHEAD_CHUNKS = 8
+
+PageRange = Tuple[int, int]  # Zero-based, stop exclusive
+
+
+def parse_page_ranges(pages: Optional[str], page_count: int) -> List[PageRange]:
+    """Parses a 1-based selection such as "1-3,7,10-" into ranges clipped to the document."""
+    if not pages:
+        return [(0, page_count)]
+    ranges = []
+    for part in pages.split(","):
+        first, dash, last = part.strip().partition("-")
+        start = int(first)
+        stop = (int(last) if last else page_count) if dash else start
+        if start < 1 or stop < start:
+            raise ValueError(f"Invalid page range '{part}'")
+        if start <= page_count:
+            ranges.append((start - 1, min(stop, page_count)))
+    if not ranges:
+        raise ValueError(f"Requested pages '{pages}' are outside the document ({page_count} pages)")
+    return ranges
+
+
+def split_ranges(ranges: List[PageRange], chunk_size: int) -> List[PageRange]:
+    return [
+        (start, min(start + chunk_size, stop))
+        for range_start, stop in ranges
+        for start in range(range_start, stop, chunk_size)
+    ]
+
+
+def _open(input_path: Path) -> PdfReader:
+    try:
+        reader = PdfReader(input_path)
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise ValueError(f"Password-protected PDF is not supported: {input_path.name}")
+        return reader
+    except PdfReadError as pdf_err:
+        raise ValueError(f"Invalid or corrupted PDF file: {pdf_err}")
+
+
+def _page_text(reader: PdfReader, index: int) -> str:
+    try:
+        text = reader.pages[index].extract_text() or ""
+    except Exception as page_err:  # One malformed page should not fail the whole document
+        logger.warning(f"Failed to extract text from page {index + 1}: {page_err}")
+        text = ""
+    return text.rstrip("\n") + "\n" + PAGE_SEPARATOR
+
+
+# --- Pool process entry points (module-level so they can be pickled) ---
+
+def count_pages(input_path: Path) -> int:
+    return len(_open(input_path).pages)
+
+
+def extract_pages(input_path: Path, start: int, stop: int) -> str:
+    """Extracts pages [start, stop) as text; every pool process parses the file once per chunk."""
+    reader = _open(input_path)
+    return "".join(_page_text(reader, index) for index in range(start, stop))
+
+
+def convert(
+    input_path: Path,
+    output_path: Path,
+    output_format: str,
+    progress: Optional[ProgressReporter] = None,
+    options: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Extracts PDF text page by page in one process, streaming it to `output_path`."""
+    started = time.monotonic()
+    reader = _open(input_path)
+    ranges = parse_page_ranges((options or {}).get("pages"), len(reader.pages))
+    total = sum(stop - start for start, stop in ranges)
+    done = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for start, stop in ranges:
+            for index in range(start, stop):
+                out.write(_page_text(reader, index))
+                done += 1
+                if progress:
+                    progress.report(done, total, unit="pages")
+    _log_rate(input_path, total, started)
+
+
+async def convert_parallel(
+    input_path: Path,
+    output_path: Path,
+    output_format: str,
+    progress: Optional[ProgressReporter] = None,
+    options: Optional[Dict[str, Any]] = None,
+    *,
+    submit: Callable[..., Awaitable[Any]],
+) -> None:
+    """
+    Splits the selected pages into chunks of PDF_PAGES_PER_CHUNK, extracts them in
+    parallel via `submit` (one pool process per chunk) and appends each chunk to
+    `output_path` in page order as soon as it and all earlier chunks are done.
+    """
+    started = time.monotonic()
+    page_count = await submit(count_pages, input_path)
+    chunks = split_ranges(
+        parse_page_ranges((options or {}).get("pages"), page_count), settings.PDF_PAGES_PER_CHUNK
+    )
+    total = sum(stop - start for start, stop in chunks)
+    logger.info(f"Extracting {total} of {page_count} pages from {input_path.name} in {len(chunks)} chunks")
+
+    remaining = iter(chunks)
+    pending: Deque[Tuple[PageRange, asyncio.Future]] = deque()
+
+    def schedule() -> None:
+        while len(pending) < _READ_AHEAD_CHUNKS:
+            chunk = next(remaining, None)
+            if chunk is None:
+                return
+            pending.append((chunk, asyncio.ensure_future(submit(extract_pages, input_path, *chunk))))
+
+    done = 0
+    try:
+        with open(output_path, "w", encoding="utf-8") as out:
+            schedule()
+            while pending:
+                (start, stop), future = pending.popleft()
+                text = await future
+                out.write(text)
+                done += stop - start
+                schedule()
+                if progress:
+                    # The reporter writes to Redis synchronously; keep that off the orchestration loop
+                    await asyncio.to_thread(progress.report, done, total, "pages")
+    except BaseException:
+        for _, future in pending:
+            future.cancel()
+        output_path.unlink(missing_ok=True)
+        raise
+    _log_rate(input_path, total, started)
+
+
+def _log_rate(input_path: Path, pages: int, started: float) -> None:
+    elapsed = max(time.monotonic() - started, 1e-6)
+    logger.info(f"Extracted {pages} pages from {input_path.name} in {elapsed:.2f}s ({pages / elapsed:.1f} pages/sec)")
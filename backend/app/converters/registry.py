@@ -0,0 +1,227 @@
+import heapq
+import importlib
+import itertools
+import logging
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Content type each output format is read back as when a chained conversion continues from it
+FORMAT_CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "pdf": "application/pdf",
+    "txt": "text/plain",
+}
+# Intermediates in these formats lose quality; the planner only uses them when nothing else connects
+LOSSY_FORMATS = frozenset({"jpg", "webp"})
+# Longest chain the planner considers
+MAX_PLAN_HOPS = 3
+
+
+def format_content_type(output_format: str) -> Optional[str]:
+    return FORMAT_CONTENT_TYPES.get(output_format) or mimetypes.guess_type(f"file.{output_format}")[0]
+
+
+class UnsupportedConversionError(NotImplementedError):
+    """Raised when no registered converter handles an (input MIME, output format) pair."""
+
+    def __init__(self, content_type: Optional[str], output_format: str):
+        self.content_type = content_type
+        self.output_format = output_format
+        super().__init__(f"Conversion from {content_type} to {output_format} not supported.")
+
+
+@dataclass(frozen=True)
+class ConverterSpec:
+    """Describes a converter backend and the pairs it can handle.
+
+    `target` is a "module:function" string that is only imported the first time
+    the converter actually runs, so a worker never pays the import cost (or memory)
+    of heavy libraries for converters it does not execute.
+
+    `parallel_target`, if set, names an async function that runs on the worker's
+    orchestration loop instead, splits the job into chunks and fans them out over
+    the process pool itself (see `app.worker.runtime.run_converter`).
+
+    `multi_target`, if set, names a function that converts one input to several
+    output formats in a single pool task, decoding the input only once (see
+    `app.worker.runtime.run_converter_many`).
+
+    `streams` marks converters whose `target` also accepts binary file objects for its
+    input and output. Only those can take or produce the intermediate of a chained
+    conversion, which is kept in memory instead of a file (see `app.converters.chain`).
+    """
+    name: str
+    input_types: FrozenSet[str]
+    output_formats: FrozenSet[str]
+    target: str
+    # --- Capability metadata ---
+    job_class: str = "image"  # Broad workload class: "image", "document" or "media"
+    max_concurrency: Optional[int] = None  # Per-worker limit, None means bounded only by the pool
+    description: str = ""
+    parallel_target: Optional[str] = None
+    multi_target: Optional[str] = None
+    streams: bool = False
+    extra: Dict[str, object] = field(default_factory=dict, compare=False, hash=False)
+
+    def pairs(self) -> Iterable[Tuple[str, str]]:
+        for content_type in self.input_types:
+            for output_format in self.output_formats:
+                yield content_type, output_format
+
+
+@dataclass(frozen=True)
+class Hop:
+    """One step of a conversion plan: `spec` converts `content_type` to `output_format`."""
+    spec: ConverterSpec
+    content_type: str
+    output_format: str
+
+
+def plan_label(plan: List[Hop]) -> str:
+    """Metric label of a plan: the converter, or the converters of a chain joined by '>'."""
+    return ">".join(hop.spec.name for hop in plan)
+
+
+class ConverterRegistry:
+    """Maps (input MIME type, output format) pairs to converter specs with O(1) lookups."""
+
+    def __init__(self):
+        self._by_pair: Dict[Tuple[str, str], ConverterSpec] = {}
+        self._by_name: Dict[str, ConverterSpec] = {}
+        self._loaded: Dict[str, Callable] = {}
+        self._load_lock = threading.Lock()
+
+    def register(self, spec: ConverterSpec) -> ConverterSpec:
+        if spec.name in self._by_name:
+            raise ValueError(f"Converter '{spec.name}' is already registered")
+        for pair in spec.pairs():
+            existing = self._by_pair.get(pair)
+            if existing is not None:
+                raise ValueError(f"Pair {pair} already handled by converter '{existing.name}'")
+        for pair in spec.pairs():
+            self._by_pair[pair] = spec
+        self._by_name[spec.name] = spec
+        return spec
+
+    def get(self, content_type: Optional[str], output_format: str) -> Optional[ConverterSpec]:
+        if not content_type:
+            return None
+        return self._by_pair.get((content_type.lower(), output_format.lower()))
+
+    def resolve(self, content_type: Optional[str], output_format: str) -> ConverterSpec:
+        spec = self.get(content_type, output_format)
+        if spec is None:
+            raise UnsupportedConversionError(content_type, output_format)
+        return spec
+
+    def by_name(self, name: str) -> ConverterSpec:
+        return self._by_name[name]
+
+    def plan(
+        self,
+        content_type: Optional[str],
+        output_format: str,
+        cost: Optional[Callable[[Hop], float]] = None,
+    ) -> Optional[List[Hop]]:
+        """
+        The converters that turn `content_type` into `output_format`, in order, or None.
+
+        A registered direct converter is always used as is. Other pairs are planned as
+        the cheapest chain of at most MAX_PLAN_HOPS converters, by `cost` per hop
+        (fewest hops without it), going through another format only when both sides
+        of it are `streams` converters and through lossy formats only as a last resort.
+        """
+        if not content_type:
+            return None
+        content_type, output_format = content_type.lower(), output_format.lower()
+        direct = self._by_pair.get((content_type, output_format))
+        if direct is not None:
+            return [Hop(direct, content_type, output_format)]
+
+        hop_cost = cost or (lambda hop: 1.0)
+        tie = itertools.count()
+        # Dijkstra over content types; the key ranks lossy intermediates before cost
+        queue = [((0, 0.0), next(tie), content_type, [])]
+        settled: Set[str] = set()
+        while queue:
+            key, _, node, path = heapq.heappop(queue)
+            if node == output_format:
+                return path
+            if node in settled or len(path) >= MAX_PLAN_HOPS:
+                continue
+            settled.add(node)
+            for (source, fmt), spec in self._by_pair.items():
+                if source != node or (path and not spec.streams):
+                    continue
+                hop = Hop(spec, node, fmt)
+                if fmt == output_format:
+                    # Final hop: written to the output file, so any converter may produce it
+                    heapq.heappush(queue, ((key[0], key[1] + hop_cost(hop)), next(tie), fmt, path + [hop]))
+                    continue
+                intermediate = format_content_type(fmt)
+                if not spec.streams or intermediate is None or intermediate in settled:
+                    continue
+                lossy = key[0] + (fmt in LOSSY_FORMATS)
+                heapq.heappush(queue, ((lossy, key[1] + hop_cost(hop)), next(tie), intermediate, path + [hop]))
+        return None
+
+    def resolve_plan(
+        self,
+        content_type: Optional[str],
+        output_format: str,
+        cost: Optional[Callable[[Hop], float]] = None,
+    ) -> List[Hop]:
+        plan = self.plan(content_type, output_format, cost)
+        if plan is None:
+            raise UnsupportedConversionError(content_type, output_format)
+        return plan
+
+    def is_supported(self, content_type: Optional[str], output_format: str) -> bool:
+        return self.plan(content_type, output_format) is not None
+
+    def supported_pairs(self) -> Set[Tuple[str, str]]:
+        return set(self._by_pair)
+
+    def output_formats_for(self, content_type: str) -> List[str]:
+        """Formats `content_type` can be converted to, directly or through a chain."""
+        formats = {fmt for (_, fmt) in self._by_pair}
+        return sorted(fmt for fmt in formats if self.is_supported(content_type, fmt))
+
+    def specs(self) -> List[ConverterSpec]:
+        return list(self._by_name.values())
+
+    def _import(self, key: str, target: str) -> Callable:
+        func = self._loaded.get(key)
+        if func is not None:
+            return func
+        with self._load_lock:
+            func = self._loaded.get(key)
+            if func is None:
+                module_name, _, attr = target.partition(":")
+                logger.info(f"Loading converter backend '{key}' from {target}")
+                module = importlib.import_module(module_name)
+                func = getattr(module, attr or "convert")
+                self._loaded[key] = func
+        return func
+
+    def load(self, spec: ConverterSpec) -> Callable:
+        """Imports (once) and returns the callable implementing `spec`."""
+        return self._import(spec.name, spec.target)
+
+    def load_parallel(self, spec: ConverterSpec) -> Optional[Callable]:
+        """Imports (once) and returns the async fan-out entry point of `spec`, if it has one."""
+        if not spec.parallel_target:
+            return None
+        return self._import(f"{spec.name}:parallel", spec.parallel_target)
+
+    def load_multi(self, spec: ConverterSpec) -> Optional[Callable]:
+        """Imports (once) and returns the multi-output entry point of `spec`, if it has one."""
+        if not spec.multi_target:
+            return None
+        return self._import(f"{spec.name}:multi", spec.multi_target)
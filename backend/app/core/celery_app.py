@@ -1,5 +1,6 @@
 from celery import Celery
 from app.core.config import settings
+from app.worker.scheduling import FAST_QUEUE, MAINTENANCE_QUEUE, PREVIEW_QUEUE, celery_queues
 
 # Initialize Celery
 # The first argument is the name of the current module, important for autodiscovery
@@ -8,7 +9,7 @@ celery_app = Celery(
     "worker",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=['app.worker.tasks'] # Specify where tasks are defined
+    include=['app.worker.tasks', 'app.worker.maintenance', 'app.worker.previews'] # Specify where tasks are defined
 )
 
 # Optional Celery configuration (can also be in settings)
@@ -18,9 +19,49 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',          # Use UTC timezone
     enable_utc=True,
+    # Task threads only orchestrate; CPU-heavy conversions run in the process pool
+    # from app.worker.runtime (prefork children are daemonic and cannot own one).
+    worker_pool='threads',
+    # Conversions are long-running: don't let one thread hoard queued messages
+    worker_prefetch_multiplier=1,
+    # Per-job-class queues with priorities (0 = highest on Redis)
+    task_queues=celery_queues(),
+    task_default_queue=FAST_QUEUE,
+    task_default_priority=5,
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        # A worker consuming several queues drains them in -Q order (fast first)
+        'queue_order_strategy': 'priority',
+        # Tasks ack late: a message not acknowledged within this time goes back to the queue.
+        # The worker's claim (app.worker.tasks._claim_job) uses the same limit to tell a
+        # dead worker's job from one that is still running.
+        'visibility_timeout': settings.TASK_VISIBILITY_TIMEOUT_SECONDS,
+    },
+    task_routes={
+        'app.worker.maintenance.*': {'queue': MAINTENANCE_QUEUE},
+        'app.worker.previews.*': {'queue': PREVIEW_QUEUE},
+    },
+    # Retention: run `celery -A app.core.celery_app beat` exactly once per deployment.
+    # Runs expire after one interval so a stalled worker does not build up a backlog of them.
+    beat_schedule={
+        'reap-expired-conversions': {
+            'task': 'app.worker.maintenance.reap_expired_conversions',
+            'schedule': settings.REAPER_INTERVAL_SECONDS,
+            'options': {'expires': settings.REAPER_INTERVAL_SECONDS},
+        },
+        'sweep-orphaned-files': {
+            'task': 'app.worker.maintenance.sweep_orphaned_files',
+            'schedule': settings.ORPHAN_SWEEP_INTERVAL_SECONDS,
+            'options': {'expires': settings.ORPHAN_SWEEP_INTERVAL_SECONDS},
+        },
+        'expire-chunked-uploads': {
+            'task': 'app.worker.maintenance.expire_chunked_uploads',
+            'schedule': settings.REAPER_INTERVAL_SECONDS,
+            'options': {'expires': settings.REAPER_INTERVAL_SECONDS},
+        },
+    },
     # Add other Celery settings as needed
     # task_track_started=True,
-    # worker_prefetch_multiplier=1,
 )
 
 if __name__ == '__main__':
@@ -1,6 +1,20 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import validator, AnyHttpUrl, Field
-from typing import List, Union, Set
+from typing import Dict, List, Optional, Union, Set
+
+
+def _parse_int_mapping(value: str, setting_name: str) -> Dict[str, int]:
+    """Parses a comma-separated "key=int" string, e.g., "free=6,pro=3"."""
+    mapping = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        key, _, number = item.partition("=")
+        try:
+            mapping[key.strip()] = int(number)
+        except ValueError:
+            raise ValueError(f"Invalid {setting_name} entry: {item!r}")
+    return mapping
 
 class Settings(BaseSettings):
     # Pydantic will automatically look for a .env file in the current or parent directories
@@ -13,26 +27,88 @@ class Settings(BaseSettings):
 
     # --- Database --- Optional ---
     DB_ECHO_LOG: bool = Field(default=False, description="Set to True to log SQL statements")
+    DB_POOL_SIZE: int = Field(default=10, description="Connections kept open per API process")
+    DB_MAX_OVERFLOW: int = Field(default=10, description="Extra connections an API process may open under load")
+    DB_POOL_TIMEOUT_SECONDS: float = Field(default=10.0, description="How long a request waits for a free connection before failing")
+    DB_POOL_RECYCLE_SECONDS: int = Field(default=1800, description="Replace connections older than this (-1 disables); keep below server/proxy idle timeouts")
+    DB_POOL_PRE_PING: bool = Field(default=True, description="Test connections on checkout (one extra round trip, survives DB restarts)")
+    WORKER_DB_POOL_SIZE: int = Field(default=4, description="Connections kept open per Celery worker process (shared by its task threads)")
+    WORKER_DB_MAX_OVERFLOW: int = Field(default=4, description="Extra connections a worker process may open under load")
 
     # --- Celery --- Required if using background tasks ---
     CELERY_BROKER_URL: str = Field(default="redis://localhost:6379/0", description="URL for the Celery message broker (Redis)")
     CELERY_RESULT_BACKEND: str = Field(default="redis://localhost:6379/0", description="URL for the Celery result backend (Redis)")
 
+    # --- Realtime Events --- Redis pub/sub used to push conversion status to clients ---
+    EVENTS_REDIS_URL: str = Field(default="", description="Redis URL for conversion event pub/sub (Default: CELERY_BROKER_URL)")
+    EVENTS_KEEPALIVE_SECONDS: int = Field(default=15, description="Interval between keep-alive comments on idle event streams")
+    PROGRESS_MIN_INTERVAL_SECONDS: float = Field(default=1.0, description="Minimum interval between progress updates written per job")
+    PROGRESS_TTL_SECONDS: int = Field(default=3600, description="Lifetime of a job's progress record in Redis")
+
+    @property
+    def events_redis_url(self) -> str:
+        return self.EVENTS_REDIS_URL or self.CELERY_BROKER_URL
+
     # --- CORS --- Defaults are for local development. Override with env var. ---
     # Environment variable should be a comma-separated string, e.g., "http://localhost:5173,http://127.0.0.1:5173,https://your-frontend.com"
     BACKEND_CORS_ORIGINS: Union[str, List[AnyHttpUrl]] = Field(default="http://localhost:5173,http://127.0.0.1:5173", description="Allowed origins for CORS requests")
 
     # --- File Conversion Settings --- Optional defaults, override in .env ---
     MAX_UPLOAD_SIZE: int = Field(default=10 * 1024 * 1024, description="Maximum file upload size in bytes (Default: 10MB)")
+    MAX_BATCH_FILES: int = Field(default=50, description="Maximum number of files accepted by one batch upload")
+    UPLOAD_WRITE_BUFFER_SIZE: int = Field(default=1024 * 1024, description="Bytes buffered per upload before each disk write (Default: 1MB)")
     # Comma-separated string in .env, e.g., "image/jpeg,image/png,application/pdf"
     ALLOWED_CONTENT_TYPES: str = Field(default="image/jpeg,image/png,application/pdf,text/plain", description="Allowed MIME types for file uploads")
     # Comma-separated string in .env, e.g., "pdf,docx,txt"
     SUPPORTED_OUTPUT_FORMATS: str = Field(default="pdf,png,jpg,txt", description="Supported output formats for conversion")
 
+    # --- Resumable Uploads --- Large files sent in chunks through /convert/uploads ---
+    # Comma-separated "tier=bytes" pairs; tiers not listed fall back to MAX_UPLOAD_SIZE
+    TIER_MAX_UPLOAD_SIZES: str = Field(default="free=104857600,premium=2147483648,business=2147483648", description="Largest resumable upload per user tier (Default: free 100MB, paid 2GB)")
+    CHUNKED_UPLOAD_MAX_CHUNK_SIZE: int = Field(default=64 * 1024 * 1024, description="Largest chunk accepted by one PATCH (Default: 64MB)")
+    CHUNKED_UPLOAD_EXPIRY_SECONDS: int = Field(default=24 * 3600, description="An unfinished upload is discarded this long after its last chunk (Default: 24 hours)")
+
+    # --- Worker Execution --- CPU-bound conversions run in a process pool inside each worker ---
+    CONVERSION_POOL_SIZE: int = Field(default=0, description="Number of conversion processes per worker (0 = one per CPU core)")
+    # Comma-separated "converter=limit" pairs, e.g., "pdf-text=2,pillow-image=4". Overrides converter defaults.
+    CONVERTER_CONCURRENCY_LIMITS: str = Field(default="", description="Per-converter concurrency limits within a worker")
+    TASK_VISIBILITY_TIMEOUT_SECONDS: int = Field(default=3600, description="Unacknowledged tasks are redelivered after this long; the redelivered conversion may then take over its job from the presumed-dead worker")
+    CHAIN_SPOOL_MAX_BYTES: int = Field(default=64 * 1024 * 1024, description="Intermediate results of chained conversions stay in memory up to this size, then spill to TEMP_DIR (Default: 64MB)")
+    CONVERSION_COST_CACHE_SECONDS: int = Field(default=60, description="How long a worker plans with its copy of the learned per-converter costs before reading them again")
+
+    # --- Image Engine --- Memory guards for Pillow conversions ---
+    MAX_IMAGE_PIXELS: int = Field(default=178_956_970, description="Largest image (width x height) a conversion will decode")
+    IMAGE_STRIP_THRESHOLD_PIXELS: int = Field(default=32 * 1024 * 1024, description="Images larger than this are converted strip by strip without optimize passes")
+    IMAGE_ENCODE_THREADS: int = Field(default=3, description="Outputs of one multi-format image conversion encoded at once (Pillow releases the GIL while encoding)")
+
+    # --- Document Engine ---
+    PDF_PAGES_PER_CHUNK: int = Field(default=16, description="Pages extracted per pool task; smaller chunks spread one PDF over more processes")
+
+    # --- Scheduling --- Queues per job class, priorities per tier, fair share per user ---
+    # Comma-separated "tier=priority" pairs. Priorities run 0 (highest) to 9 (lowest), as on the Redis broker.
+    TIER_PRIORITIES: str = Field(default="free=6,premium=3,business=1", description="Base task priority for each user tier")
+    DEFAULT_TIER: str = Field(default="free", description="Tier assumed for users without one")
+    FAST_QUEUE_MAX_BYTES: int = Field(default=20 * 1024 * 1024, description="Inputs larger than this never use the fast queue (Default: 20MB)")
+    HEAVY_QUEUE_MAX_BYTES: int = Field(default=200 * 1024 * 1024, description="Inputs larger than this are routed to the media queue (Default: 200MB)")
+    FAIR_SHARE_FREE_JOBS: int = Field(default=10, description="In-flight jobs per user before their priority starts to drop")
+    FAIR_SHARE_STEP: int = Field(default=20, description="Additional in-flight jobs per one-step priority drop")
+
+    # --- Previews --- Thumbnails rendered by workers after each conversion, served by GET /convert/preview ---
+    PREVIEWS_ENABLED: bool = Field(default=True, description="Render thumbnails of completed conversions on the previews queue")
+    # Comma-separated edge lengths, e.g. "128,256"
+    PREVIEW_SIZES: str = Field(default="128,256", description="Thumbnail sizes in pixels (longest side) rendered for every conversion")
+    PREVIEW_QUALITY: int = Field(default=70, description="WEBP quality of thumbnails")
+    PREVIEW_CACHE_MAX_BYTES: int = Field(default=32 * 1024 * 1024, description="Thumbnails kept in memory per API process, in bytes (Default: 32MB)")
+    PREVIEW_CACHE_TTL_SECONDS: int = Field(default=600, description="How long an API process keeps a thumbnail in memory (Default: 10 minutes)")
+
     # --- Parsed Settings (available after initialization) ---
     parsed_allowed_content_types: Set[str] = set()
     parsed_supported_output_formats: Set[str] = set()
     parsed_backend_cors_origins: List[AnyHttpUrl] = []
+    parsed_converter_concurrency_limits: Dict[str, int] = {}
+    parsed_tier_priorities: Dict[str, int] = {}
+    parsed_tier_max_upload_sizes: Dict[str, int] = {}
+    parsed_preview_sizes: List[int] = []
 
     @validator("parsed_backend_cors_origins", pre=True, always=True)
     def assemble_cors_origins(cls, v, values) -> List[AnyHttpUrl]:
@@ -54,10 +130,83 @@ class Settings(BaseSettings):
         formats_str = values.get("SUPPORTED_OUTPUT_FORMATS", "")
         return {item.strip().lower() for item in formats_str.split(",") if item.strip()}
 
+    @validator("parsed_converter_concurrency_limits", pre=True, always=True)
+    def assemble_converter_concurrency_limits(cls, v, values) -> Dict[str, int]:
+        return _parse_int_mapping(values.get("CONVERTER_CONCURRENCY_LIMITS", ""), "CONVERTER_CONCURRENCY_LIMITS")
+
+    @validator("parsed_tier_priorities", pre=True, always=True)
+    def assemble_tier_priorities(cls, v, values) -> Dict[str, int]:
+        priorities = _parse_int_mapping(values.get("TIER_PRIORITIES", ""), "TIER_PRIORITIES")
+        for tier, priority in priorities.items():
+            if not 0 <= priority <= 9:
+                raise ValueError(f"TIER_PRIORITIES value for '{tier}' must be between 0 and 9")
+        return priorities
+
+    @validator("parsed_tier_max_upload_sizes", pre=True, always=True)
+    def assemble_tier_max_upload_sizes(cls, v, values) -> Dict[str, int]:
+        sizes = _parse_int_mapping(values.get("TIER_MAX_UPLOAD_SIZES", ""), "TIER_MAX_UPLOAD_SIZES")
+        for tier, size in sizes.items():
+            if size < 1:
+                raise ValueError(f"TIER_MAX_UPLOAD_SIZES value for '{tier}' must be positive")
+        return sizes
+
+    @validator("parsed_preview_sizes", pre=True, always=True)
+    def assemble_preview_sizes(cls, v, values) -> List[int]:
+        sizes = set()
+        for item in values.get("PREVIEW_SIZES", "").split(","):
+            if not item.strip():
+                continue
+            try:
+                size = int(item)
+            except ValueError:
+                raise ValueError(f"Invalid PREVIEW_SIZES entry: {item!r}")
+            if not 16 <= size <= 1024:
+                raise ValueError(f"PREVIEW_SIZES entries must be between 16 and 1024 pixels, got {size}")
+            sizes.add(size)
+        return sorted(sizes)
+
     # --- Storage Directories --- Optional defaults, ensure they exist or are created ---
     TEMP_DIR: str = Field(default="./temp_uploads", description="Directory for temporary file uploads relative to backend root.")
     CONVERTED_DIR: str = Field(default="./converted_files", description="Directory to store successfully converted files relative to backend root.")
 
+    # --- Object Storage --- Where uploads and outputs live when API and workers run on separate machines ---
+    STORAGE_BACKEND: str = Field(default="local", description="'local' (shared filesystem) or 's3' (any S3-compatible store)")
+    S3_BUCKET: str = Field(default="", description="Bucket holding uploads and outputs")
+    S3_PREFIX: str = Field(default="", description="Key prefix inside the bucket, e.g. 'converter/'")
+    S3_ENDPOINT_URL: Optional[str] = Field(default=None, description="Custom endpoint for S3-compatible stores (MinIO, R2, Tigris)")
+    S3_REGION: Optional[str] = Field(default=None, description="Bucket region")
+    S3_ACCESS_KEY_ID: Optional[str] = Field(default=None, description="Access key (Default: boto3 credential chain)")
+    S3_SECRET_ACCESS_KEY: Optional[str] = Field(default=None, description="Secret key (Default: boto3 credential chain)")
+    S3_MULTIPART_CHUNK_SIZE: int = Field(default=8 * 1024 * 1024, description="Part size for multipart uploads and downloads (Default: 8MB)")
+    S3_PRESIGNED_DOWNLOADS: bool = Field(default=True, description="Redirect downloads to presigned URLs instead of proxying bytes through the API")
+    S3_PRESIGNED_URL_EXPIRES_SECONDS: int = Field(default=300, description="Lifetime of presigned download URLs")
+
+    # --- Conversion Result Cache --- Content-addressed outputs kept in storage, indexed in Redis ---
+    RESULT_CACHE_ENABLED: bool = Field(default=True, description="Reuse prior outputs for byte-identical inputs converted with the same format/options")
+    RESULT_CACHE_MAX_BYTES: int = Field(default=1024 * 1024 * 1024, description="Size budget for cached outputs in bytes (Default: 1GB)")
+    RESULT_CACHE_TTL_SECONDS: int = Field(default=3600, description="Maximum age of a cached output in seconds (Default: 60 minutes)")
+
+    # --- Authentication --- Cache of user rows looked up for every authenticated request ---
+    USER_CACHE_ENABLED: bool = Field(default=True, description="Serve token authentication from a per-process cache of user records")
+    USER_CACHE_TTL_SECONDS: int = Field(default=30, description="Lifetime of a cached user record; bounds how long other API processes may see stale changes")
+    USER_CACHE_MAX_ENTRIES: int = Field(default=10000, description="Maximum number of cached user records per API process")
+
+    # --- Retention --- Uploads and outputs are deleted by the reaper (Celery beat) once they expire ---
+    RETENTION_SECONDS: int = Field(default=3600, description="How long a finished conversion and its output are kept (Default: 60 minutes)")
+    RETENTION_AFTER_DOWNLOAD_SECONDS: int = Field(default=600, description="Remaining lifetime of an output once downloaded, long enough to resume the download")
+    UNFINISHED_RETENTION_SECONDS: int = Field(default=24 * 3600, description="Lifetime of conversions that never finish, e.g. lost tasks (Default: 24 hours)")
+    REAPER_INTERVAL_SECONDS: int = Field(default=300, description="How often expired conversions are reaped")
+    REAPER_BATCH_SIZE: int = Field(default=500, description="Conversions deleted per transaction")
+    REAPER_MAX_BATCHES: int = Field(default=20, description="Batches per reaper run; the rest waits for the next run")
+    ORPHAN_SWEEP_INTERVAL_SECONDS: int = Field(default=3600, description="How often stored files are reconciled against the database")
+    ORPHAN_GRACE_SECONDS: int = Field(default=6 * 3600, description="Minimum age of an unreferenced stored file before the sweep deletes it")
+
+    # --- Metrics --- Prometheus exposition: GET /metrics on the API, a separate HTTP exporter per worker ---
+    METRICS_ENABLED: bool = Field(default=True, description="Expose Prometheus metrics")
+    METRICS_TOKEN: Optional[str] = Field(default=None, description="If set, GET /metrics requires 'Authorization: Bearer <token>'")
+    WORKER_METRICS_PORT: int = Field(default=9808, description="Port of each Celery worker's metrics exporter (0 disables it)")
+    WORKER_METRICS_ADDR: str = Field(default="0.0.0.0", description="Address the worker metrics exporter binds to")
+
     # --- Other potential configurations ---
     # PROJECT_NAME: str = "Universal File Converter"
     # API_V1_STR: str = "/api/v1"
@@ -1,10 +1,39 @@
 import uuid
-from fastapi_users import FastAPIUsers
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, Request
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin
 from fastapi_users.authentication import (AuthenticationBackend, BearerTransport, JWTStrategy)
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 
 from app.core.config import settings
 from app.models.user import User
 from app.db.adapters import get_user_db
+from app.services.user_cache import user_cache
+
+
+class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
+    reset_password_token_secret = settings.SECRET_KEY
+    verification_token_secret = settings.SECRET_KEY
+
+    # --- Hooks: every change to a user drops its cached record (see CachedUserDatabase) ---
+    async def on_after_update(self, user: User, update_dict: Dict[str, Any], request: Optional[Request] = None) -> None:
+        # Covers deactivation and role changes made through PATCH /users/{id}
+        user_cache.invalidate(user.id)
+
+    async def on_after_verify(self, user: User, request: Optional[Request] = None) -> None:
+        user_cache.invalidate(user.id)
+
+    async def on_after_reset_password(self, user: User, request: Optional[Request] = None) -> None:
+        user_cache.invalidate(user.id)
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None) -> None:
+        user_cache.invalidate(user.id)
+
+
+async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
+    yield UserManager(user_db)
+
 
 # Configure Bearer token transport
 bearer_transport = BearerTransport(tokenUrl="auth/jwt/login")
@@ -22,11 +51,11 @@ auth_backend = AuthenticationBackend(
 
 # Initialize FastAPIUsers
 fastapi_users = FastAPIUsers[User, uuid.UUID](
-    get_user_db,
+    get_user_manager,
     [auth_backend],
 )
 
 # Dependency for requiring an active, verified user
 current_active_verified_user = fastapi_users.current_user(active=True, verified=True)
 # Dependency for requiring an active superuser
-current_active_superuser = fastapi_users.current_user(active=True, superuser=True) 
\ No newline at end of file
+current_active_superuser = fastapi_users.current_user(active=True, superuser=True)
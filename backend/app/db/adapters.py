@@ -1,14 +1,33 @@
 import uuid
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from fastapi import Depends
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from sqlalchemy.ext.asyncio import AsyncSession
 # from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 
-async def get_user_db(session: AsyncSession = Depends(get_db)) -> SQLAlchemyUserDatabase[User, uuid.UUID]:
-    yield SQLAlchemyUserDatabase(session, User) 
\ No newline at end of file
+class CachedUserDatabase(SQLAlchemyUserDatabase[User, uuid.UUID]):
+    """Serves lookups by id, which back every token-authenticated request, from the user cache."""
+
+    async def get(self, id: uuid.UUID) -> Optional[User]:
+        if not settings.USER_CACHE_ENABLED:
+            return await super().get(id)
+        cached = user_cache.get(id)
+        if cached is None:
+            user = await super().get(id)
+            if user is not None:
+                user_cache.put(user)
+            return user
+        # Attach to this request's session without a query (returns the session's own
+        # instance if it already loaded the row), so later updates go through normally
+        return await self.session.merge(cached, load=False)
+
+
+async def get_user_db(session: AsyncSession = Depends(get_db)) -> AsyncGenerator[SQLAlchemyUserDatabase[User, uuid.UUID], None]:
+    yield CachedUserDatabase(session, User)
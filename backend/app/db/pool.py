@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# Checkouts waiting longer than this are logged: the pool is too small for the load
+SLOW_CHECKOUT_SECONDS = 1.0
+
+
+@dataclass
+class CheckoutStats:
+    checkouts: int = 0
+    failures: int = 0  # Timeouts and connection errors
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection.
+
+    The wait includes opening a new connection when the pool grows into its
+    overflow, i.e. everything between asking for a connection and getting one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_stats = CheckoutStats()
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self._checkout_stats.failures += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                stats = self._checkout_stats
+                stats.checkouts += 1
+                stats.wait_seconds_total += waited
+                stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+            if waited > SLOW_CHECKOUT_SECONDS:
+                logger.warning(
+                    f"Waited {waited:.2f}s for a database connection "
+                    f"(pool size {self.size()}, checked out {self.checkedout()}, overflow {self.overflow()})"
+                )
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            data = asdict(self._checkout_stats)
+        data["wait_seconds_avg"] = data["wait_seconds_total"] / data["checkouts"] if data["checkouts"] else 0.0
+        data.update(size=self.size(), checked_out=self.checkedout(), overflow=self.overflow())
+        return data
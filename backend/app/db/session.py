@@ -1,7 +1,10 @@
 # from sqlalchemy import create_engine
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.db.pool import TimedQueuePool
 
 # This line causes issues when imported by Alembic before the app fully loads settings
 # engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
@@ -27,13 +30,31 @@ async def get_db() -> AsyncSession:
         yield session
 
 # Function to initialize the database engine (call this during app startup)
-def init_engine():
+# The API and each worker process own one engine; the worker passes its own, smaller pool sizing
+def init_engine(pool_size: Optional[int] = None, max_overflow: Optional[int] = None):
     global engine
     if engine is None:
-        engine = create_async_engine(settings.DATABASE_URL, echo=settings.DB_ECHO_LOG, future=True, pool_pre_ping=True)
+        engine = create_async_engine(
+            settings.DATABASE_URL,
+            echo=settings.DB_ECHO_LOG,
+            future=True,
+            poolclass=TimedQueuePool,
+            pool_size=pool_size if pool_size is not None else settings.DB_POOL_SIZE,
+            max_overflow=max_overflow if max_overflow is not None else settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
         # Re-bind SessionLocal to the created engine
         SessionLocal.configure(bind=engine)
 
+
+def pool_stats() -> Optional[dict]:
+    """Checkout wait and occupancy of this process's connection pool, or None before init_engine."""
+    if engine is None:
+        return None
+    return engine.pool.stats()
+
 # Function to dispose the engine (call this during app shutdown)
 async def dispose_engine():
     global engine
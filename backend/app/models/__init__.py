@@ -5,6 +5,8 @@ from .base import Base  # Make Base accessible
 from .user import User  # Import the User model
 from .file import File  # Import the File model
 from .conversion import Conversion, ConversionStatus # Import Conversion models/enums
+from .batch import ConversionBatch # Import batch model
+from .upload import ChunkedUpload # Import resumable upload model
 
 # Example (when other models are created):
 # from .some_other_model import SomeOtherModel 
\ No newline at end of file
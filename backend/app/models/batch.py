@@ -0,0 +1,21 @@
+import uuid
+import datetime
+from sqlalchemy import String, DateTime, ForeignKey, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.session import Base
+
+class ConversionBatch(Base):
+    __tablename__ = "conversion_batches"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.id"), index=True)
+    output_format: Mapped[str] = mapped_column(String)
+    total: Mapped[int] = mapped_column(Integer) # Number of conversions in the batch
+    group_id: Mapped[str | None] = mapped_column(String) # Celery group ID
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    conversions: Mapped[list["Conversion"]] = relationship(back_populates="batch")
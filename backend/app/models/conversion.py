@@ -1,6 +1,6 @@
 import uuid
 import datetime
-from sqlalchemy import String, DateTime, ForeignKey, func, Enum as SqlEnum
+from sqlalchemy import JSON, BigInteger, Index, String, DateTime, ForeignKey, func, Enum as SqlEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 import enum
@@ -16,11 +16,23 @@ class ConversionStatus(str, enum.Enum):
 
 class Conversion(Base):
     __tablename__ = "conversions"
+    # A user's history in keyset order (ORDER BY created_at DESC, id DESC) from one index;
+    # the owner_id prefix also serves ownership checks and per-user listings
+    # A user's Idempotency-Key identifies one upload (see POST /convert/upload) until the conversion is reaped
+    __table_args__ = (
+        Index("ix_conversions_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_conversions_owner_id_idempotency_key", "owner_id", "idempotency_key", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    task_id: Mapped[str | None] = mapped_column(String, unique=True, index=True) # Celery task ID
-    original_file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("files.id"))
+    task_id: Mapped[str | None] = mapped_column(String, index=True) # Celery task ID, shared by the formats of one upload
+    original_file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("files.id"), index=True)
+    # Copied from the File row so status, download and history requests need no join
+    owner_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.id"))
+    original_filename: Mapped[str] = mapped_column(String)
+    idempotency_key: Mapped[str | None] = mapped_column(String(255)) # Client-supplied, unique per owner
     output_format: Mapped[str] = mapped_column(String)
+    options: Mapped[dict | None] = mapped_column(JSON) # Encoder preset/overrides, see ConversionOptions
     status: Mapped[ConversionStatus] = mapped_column(
         SqlEnum(ConversionStatus, name="conversion_status_enum", create_type=False),
         default=ConversionStatus.PENDING,
@@ -32,7 +44,14 @@ class Conversion(Base):
     updated_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
-    converted_file_path: Mapped[str | None] = mapped_column(String) # Path to the converted file
+    converted_file_path: Mapped[str | None] = mapped_column(String, index=True) # Storage key of the converted file
+    output_sha256: Mapped[str | None] = mapped_column(String(64)) # Strong ETag for downloads
+    output_size: Mapped[int | None] = mapped_column(BigInteger)
     error_message: Mapped[str | None] = mapped_column(String)
+    preview_sizes: Mapped[list | None] = mapped_column(JSON) # Thumbnails in storage, see app.services.previews
+    # When the reaper deletes the job, its files and (with its last conversion) the File row
+    expires_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), index=True)
+    batch_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("conversion_batches.id"), index=True)
 
-    original_file: Mapped["File"] = relationship(back_populates="conversions") 
\ No newline at end of file
+    original_file: Mapped["File"] = relationship(back_populates="conversions")
+    batch: Mapped["ConversionBatch | None"] = relationship(back_populates="conversions") 
\ No newline at end of file
@@ -1,6 +1,6 @@
 import uuid
 import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Integer, func
+from sqlalchemy import BigInteger, String, DateTime, ForeignKey, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -14,7 +14,8 @@ class File(Base):
     original_filename: Mapped[str] = mapped_column(String, index=True)
     storage_path: Mapped[str] = mapped_column(String, unique=True) # Path in temp storage or cloud
     content_type: Mapped[str | None] = mapped_column(String)
-    file_size: Mapped[int | None] = mapped_column(Integer) # Size in bytes
+    file_size: Mapped[int | None] = mapped_column(BigInteger) # Size in bytes
+    content_hash: Mapped[str | None] = mapped_column(String(64), index=True) # SHA-256 of the uploaded bytes
     uploaded_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -0,0 +1,30 @@
+import uuid
+import datetime
+from typing import Any
+from sqlalchemy import JSON, BigInteger, String, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.session import Base
+
+class ChunkedUpload(Base):
+    """A resumable upload in progress; removed when it is finalized into a File or expires."""
+    __tablename__ = "chunked_uploads"
+
+    # Becomes the File id on finalize, so the assembled object is already at its upload key
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.id"), index=True)
+    filename: Mapped[str] = mapped_column(String)
+    size: Mapped[int] = mapped_column(BigInteger) # Declared total length in bytes
+    offset: Mapped[int] = mapped_column(BigInteger, default=0) # Bytes received and verified so far
+    content_type: Mapped[str | None] = mapped_column(String) # Sniffed from the first chunk
+    output_format: Mapped[str] = mapped_column(String)
+    options: Mapped[dict[str, Any] | None] = mapped_column(JSON)
+    storage_path: Mapped[str] = mapped_column(String, unique=True)
+    storage_state: Mapped[dict[str, Any] | None] = mapped_column(JSON) # Backend bookkeeping, e.g. S3 multipart parts
+    # Held while a chunk is being written, so concurrent PATCHes cannot interleave
+    lease_expires_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), index=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
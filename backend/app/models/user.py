@@ -10,4 +10,5 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
     # Add any additional user fields here
     # Example: first_name: Mapped[str | None] = mapped_column(String(50))
     # Example: last_name: Mapped[str | None] = mapped_column(String(50))
-    pass 
\ No newline at end of file
+    # Subscription tier ("free", "premium", "business"); drives task priority
+    tier: Mapped[str] = mapped_column(String(20), default="free", server_default="free")
@@ -1,32 +1,82 @@
+import base64
+import datetime
 import uuid
 import shutil
 import logging
 from pathlib import Path
-from typing import Annotated, List
+from typing import Annotated, Any, Dict, List, Literal, Optional
+from urllib.parse import quote
 import mimetypes
 
+import anyio
 from fastapi import (
     APIRouter,
-    UploadFile,
-    File,
     Depends,
+    Header,
     HTTPException,
+    Request,
     status,
     Query,
 )
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, insert, update, func, tuple_
 
+from app.converters import registry
 from app.core.config import settings
-from app.core.security import current_active_verified_user
-from app.db.session import get_db
+from app.core.security import current_active_verified_user, current_active_superuser
+from app.db.session import get_db, pool_stats
+from app.models.batch import ConversionBatch
 from app.models.conversion import Conversion as ConversionModel, ConversionStatus
 from app.models.file import File as FileModel
+from app.models.upload import ChunkedUpload
 from app.models.user import User
+from app.schemas.conversion import (
+    PAGE_SELECTION_PATTERN,
+    ChunkedUploadCreate,
+    ConversionOptions,
+    ConversionStatusResponse,
+    EncoderPreset,
+)
+from app.services.archive import stream_zip
+from app.services.chunked_uploads import (
+    CHECKSUM_MISMATCH,
+    ChecksumMismatch,
+    lease_expiry,
+    parse_upload_checksum,
+    receive_chunk,
+    upload_expiry,
+)
+from app.services.events import format_sse, subscribe
+from app.services.metrics import UPLOAD_BYTES, UPLOAD_STAGE_SECONDS, StageTimer, converter_label
+from app.services.previews import PREVIEW_MEDIA_TYPE, CachedPreview, preview_cache, preview_etag, read_preview
+from app.services.progress import read_progress
+from app.services.ranges import (
+    RangeNotSatisfiable,
+    etag_matches,
+    http_date,
+    if_range_allows,
+    multipart_byteranges,
+    not_modified_since,
+    parse_range_header,
+)
+from app.services.ingest import (
+    IngestedFile,
+    IngestError,
+    IngestResult,
+    StreamingIngest,
+    UploadTooLarge,
+    sniff_content_type,
+)
+from app.services.result_cache import result_cache, cache_key
+from app.services.retention import expires_in, shorten_expiry
+from app.services.storage import StoredOutput, get_storage
+from app.services.user_cache import user_cache
+from app.worker.previews import schedule_previews
+from app.worker.scheduling import release_slot, reserve_slots, route_for
 from app.worker.tasks import process_file_conversion
-from fastapi.responses import FileResponse, RedirectResponse
+from celery import group as celery_group
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -36,170 +86,346 @@ TEMP_UPLOAD_DIR = Path(settings.TEMP_DIR)
 TEMP_UPLOAD_DIR.mkdir(exist_ok=True)
 
 
-@router.post(
-    "/upload",
-    status_code=status.HTTP_202_ACCEPTED,
-    summary="Upload File for Conversion",
-    response_description="Conversion task accepted",
-)
-async def upload_file(
-    # Use Annotated for clearer dependency injection and parameter metadata
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(current_active_verified_user)],
-    output_format: Annotated[
-        str, Depends(lambda output_format: output_format.lower())
-    ], # Normalize output format early
-    file: Annotated[
-        UploadFile,
-        File(
-            ...,
-            description=f"File to upload (Max: {settings.MAX_UPLOAD_SIZE / 1024 / 1024:.1f} MB, Types: {', '.join(sorted(list(settings.parsed_allowed_content_types)))})",
-        ),
-    ],
-):
-    """
-    Receives a file, validates it based on configured settings, saves it temporarily,
-    creates corresponding database records for the file and the conversion job,
-    and queues a background task to perform the actual conversion.
-    """
+def _validate_output_format(output_format: str, current_user: User) -> None:
+    """Rejects output formats disabled in settings before any upload bytes are read."""
+    if output_format not in settings.parsed_supported_output_formats:
+        logger.warning(
+            f"Upload rejected for user {current_user.id}. Invalid output format: {output_format}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported output format: '{output_format}'. Supported: {', '.join(sorted(list(settings.parsed_supported_output_formats)))}",
+        )
+
 
-    if not file.filename:
+def requested_output_formats(
+    output_format: Annotated[str, Query(description="Output format, or several separated by commas (e.g. png,webp)")],
+) -> List[str]:
+    """The distinct output formats of an upload, normalized and in request order."""
+    formats = list(dict.fromkeys(fmt.strip().lower() for fmt in output_format.split(",") if fmt.strip()))
+    if not formats:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No filename provided",
+            detail="No output format provided",
         )
+    return formats
+
 
-    # --- Input Validation ---
-    if file.content_type not in settings.parsed_allowed_content_types:
+def _validate_upload_type(content_type: str | None, output_format: str, current_user: User) -> None:
+    """Checks the sniffed content type against settings and the converter registry."""
+    if content_type not in settings.parsed_allowed_content_types:
         logger.warning(
-            f"Upload rejected for user {current_user.id}. Invalid content type: {file.content_type}"
+            f"Upload rejected for user {current_user.id}. Invalid content type: {content_type}"
         )
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail=f"Unsupported file type: '{file.content_type}'. Allowed: {', '.join(sorted(list(settings.parsed_allowed_content_types)))}",
+            detail=f"Unsupported file type: '{content_type or 'unknown'}'. Allowed: {', '.join(sorted(list(settings.parsed_allowed_content_types)))}",
         )
 
-    if output_format not in settings.parsed_supported_output_formats:
+    # Reject pairs no registered converter can handle before they take a queue slot
+    if not registry.is_supported(content_type, output_format):
+        supported_for_type = [
+            fmt for fmt in registry.output_formats_for(content_type)
+            if fmt in settings.parsed_supported_output_formats
+        ]
         logger.warning(
-            f"Upload rejected for user {current_user.id}. Invalid output format: {output_format}"
+            f"Upload rejected for user {current_user.id}. No converter for {content_type} -> {output_format}"
         )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported output format: '{output_format}'. Supported: {', '.join(sorted(list(settings.parsed_supported_output_formats)))}",
+            detail=f"Conversion from '{content_type}' to '{output_format}' is not supported. Supported for this type: {', '.join(supported_for_type) or 'none'}",
         )
 
-    # --- File Saving & DB Record Creation ---
-    stored_file_id = uuid.uuid4()
-    # Basic sanitization: only use the filename part, ignore potential paths
-    original_filename = Path(file.filename).name
-    # Using stored_file_id ensures uniqueness if filenames clash and avoids issues with weird chars
-    temp_file_path = TEMP_UPLOAD_DIR / str(stored_file_id)
-    db_file = None
-    db_conversion = None
 
+async def _ingest_or_raise(ingest: StreamingIngest, current_user: User) -> IngestResult:
+    """Runs a streaming ingest, translating ingest failures into HTTP errors."""
     try:
-        # Save the uploaded file (reading in chunks)
-        logger.debug(
-            f"Saving uploaded file '{original_filename}' to {temp_file_path}"
+        return await ingest.run()
+    except UploadTooLarge as too_large:
+        logger.warning(f"Upload rejected for user {current_user.id}: {too_large}")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(too_large),
         )
-        file_size = 0
+    except IngestError as ingest_exc:
+        logger.warning(f"Upload from user {current_user.id} aborted: {ingest_exc}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ingest_exc),
+        )
+    except HTTPException:
+        raise
+    except Exception as save_exc:
+        logger.error(f"Failed to save upload for user {current_user.id}: {save_exc}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to save uploaded file.",
+        )
+
+
+def conversion_options(
+    preset: Annotated[EncoderPreset, Query(description="Encoder preset: trade encode time against output size")] = EncoderPreset.BALANCED,
+    quality: Annotated[Optional[int], Query(ge=1, le=100, description="JPG/WEBP quality")] = None,
+    progressive: Annotated[Optional[bool], Query(description="Write a progressive JPG")] = None,
+    subsampling: Annotated[Optional[Literal["4:4:4", "4:2:2", "4:2:0"]], Query(description="JPG chroma subsampling")] = None,
+    png_compress_level: Annotated[Optional[int], Query(ge=0, le=9, description="PNG zlib level")] = None,
+    webp_method: Annotated[Optional[int], Query(ge=0, le=6, description="WEBP encoder effort")] = None,
+    lossless: Annotated[Optional[bool], Query(description="Lossless WEBP")] = None,
+    max_dimension: Annotated[Optional[int], Query(ge=1, description="Downscale to fit this many pixels per side")] = None,
+    pages: Annotated[Optional[str], Query(pattern=PAGE_SELECTION_PATTERN, description="PDF pages to extract, e.g. 1-5,8,10-")] = None,
+) -> Dict[str, Any]:
+    """Collects the option query parameters into the dict stored on each Conversion."""
+    return ConversionOptions(
+        preset=preset,
+        quality=quality,
+        progressive=progressive,
+        subsampling=subsampling,
+        png_compress_level=png_compress_level,
+        webp_method=webp_method,
+        lossless=lossless,
+        max_dimension=max_dimension,
+        pages=pages,
+    ).as_dict()
+
+
+async def _reuse_cached_output(
+    upload: IngestedFile, output_format: str, options: Dict[str, Any], conversion_uuid: uuid.UUID
+) -> StoredOutput | None:
+    """
+    Byte-identical input already converted to the same format and options: copy the cached
+    output into place (inside storage) so the job can be completed here, skipping the Celery
+    round trip entirely. Returns the stored output.
+    """
+    # Resumable uploads are not hashed as a whole, so they never match
+    if not settings.RESULT_CACHE_ENABLED or not upload.content_hash:
+        return None
+    key = cache_key(upload.content_hash, output_format, options)
+    cached_output = await result_cache.lookup(key, output_format)
+    if cached_output is None:
+        return None
+    storage = get_storage()
+    output_key = storage.output_key(conversion_uuid, output_format)
+    try:
+        await anyio.to_thread.run_sync(storage.copy, cached_output.key, output_key)
+    except Exception as copy_exc:
+        # Entry evicted between lookup and copy, or the store is unreachable; fall back to a normal conversion
+        logger.warning(f"Failed to reuse cached output {cached_output.key}: {copy_exc}")
+        await result_cache.invalidate(key, output_format)
+        return None
+    logger.info(f"Result cache hit for {upload.filename} -> {output_format} (conversion {conversion_uuid})")
+    return StoredOutput(key=output_key, sha256=cached_output.sha256, size=cached_output.size)
+
+
+def _discard_stored(*keys: str | None) -> None:
+    """Best-effort removal of stored inputs/outputs after a failed request. Blocking."""
+    storage = get_storage()
+    for key in keys:
+        if not key:
+            continue
         try:
-            with temp_file_path.open("wb") as buffer:
-                while chunk := await file.read(8192):  # Read in 8KB chunks
-                    buffer.write(chunk)
-                    file_size += len(chunk)
-
-            # Double check size against limit (FastAPI/Starlette should catch it earlier via File())
-            if file_size > settings.MAX_UPLOAD_SIZE:
-                # This should ideally not be reached if File() validation works
-                logger.error(
-                    f"File size {file_size} exceeded limit {settings.MAX_UPLOAD_SIZE} after saving (potential race condition or bug?)."
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail=f"File exceeds maximum size of {settings.MAX_UPLOAD_SIZE / 1024 / 1024:.1f} MB",
-                )
-        except Exception as save_exc:
-            logger.error(
-                f"Failed to save file {original_filename} to {temp_file_path}: {save_exc}",
-                exc_info=True,
-            )
-            # Attempt cleanup if save fails partially
-            temp_file_path.unlink(missing_ok=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to save uploaded file.",
-            )
+            storage.delete(key)
+        except Exception as delete_exc:
+            logger.warning(f"Failed to delete stored object {key}: {delete_exc}")
+
 
-        logger.info(
-            f"File '{original_filename}' (ID: {stored_file_id}) uploaded by user {current_user.id} to {temp_file_path}, size: {file_size} bytes"
+async def _fail_unqueued(db: AsyncSession, owner_id: uuid.UUID, condition) -> None:
+    """
+    Fails the still-pending conversions matching `condition` after their task could not
+    be queued, and gives back the user's fair-share slots for them. A task that did reach
+    the broker skips its failed conversion without releasing a slot; one that already
+    claimed its conversion releases the slot itself.
+    """
+    await db.rollback()
+    failed_tasks = (await db.execute(
+        update(ConversionModel)
+        .where(condition, ConversionModel.status == ConversionStatus.PENDING)
+        .values(
+            status=ConversionStatus.FAILED,
+            error_message="Failed to queue conversion task.",
+            expires_at=expires_in(settings.RETENTION_SECONDS),
         )
+        .returning(ConversionModel.task_id)
+    )).scalars().all()
+    await db.commit()
+    if failed_tasks:
+        await release_slot(owner_id, len(set(failed_tasks)))
+
+
+# --- Idempotent Uploads ---
+# A client that retries an upload (e.g. after a timeout) with the same Idempotency-Key gets
+# the first request's response back instead of a second file, conversion and task. Keys are
+# unique per user (database index) and live as long as the conversion they created.
+
+class _IdempotencyKeyTaken(Exception):
+    """A concurrent upload with the same Idempotency-Key committed first."""
+
+
+async def _find_idempotent_upload(db: AsyncSession, current_user: User, idempotency_key: str):
+    return (await db.execute(
+        select(ConversionModel.id, ConversionModel.original_file_id, ConversionModel.options)
+        .where(ConversionModel.owner_id == current_user.id, ConversionModel.idempotency_key == idempotency_key)
+    )).one_or_none()
+
+
+async def _upload_conversions(db: AsyncSession, file_id: uuid.UUID, current_user: User) -> list:
+    """The conversions an upload created for `file_id` (one per requested output format)."""
+    return (await db.execute(
+        select(ConversionModel.id, ConversionModel.task_id, ConversionModel.output_format)
+        .where(ConversionModel.original_file_id == file_id, ConversionModel.owner_id == current_user.id)
+    )).all()
+
+
+def _upload_response(conversions: list) -> dict:
+    """
+    The upload response for its conversions (rows with id, task_id and output_format), the
+    first one being the requested primary. One task converts all pending formats; `cached`
+    means every format was completed from the result cache.
+    """
+    task_id = next((conversion.task_id for conversion in conversions if conversion.task_id), None)
+    cached = task_id is None
+    return {
+        "message": "File uploaded successfully, conversion completed from cache." if cached
+        else "File uploaded successfully, conversion started.",
+        "task_id": task_id,
+        "conversion_id": conversions[0].id,
+        "cached": cached,
+        "conversions": [
+            {
+                "conversion_id": conversion.id,
+                "output_format": conversion.output_format,
+                "cached": conversion.task_id is None,
+            }
+            for conversion in conversions
+        ],
+    }
+
+
+async def _replay_upload(
+    db: AsyncSession, current_user: User, previous, output_formats: List[str], options: Dict[str, Any], response: Response
+) -> dict:
+    """The response of the upload that first used the key; the retried request body is never read."""
+    conversions = await _upload_conversions(db, previous.original_file_id, current_user)
+    by_format = {conversion.output_format: conversion for conversion in conversions}
+    if set(by_format) != set(output_formats) or (previous.options or {}) != (options or {}):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for an upload with different parameters",
+        )
+    response.headers["Idempotent-Replayed"] = "true"
+    return _upload_response([by_format[output_format] for output_format in output_formats])
+
+
+async def _register_upload(
+    db: AsyncSession,
+    current_user: User,
+    upload: IngestedFile,
+    output_formats: List[str],
+    options: Dict[str, Any],
+    timer: StageTimer,
+    idempotency_key: Optional[str] = None,
+    input_stored: bool = False,
+) -> dict:
+    """
+    Creates the File record for a saved upload and one Conversion per output format,
+    completes those it can from the result cache and queues a single background task
+    for the rest, which decodes the input once for all of them. Stage durations are
+    added to `timer`. Raises _IdempotencyKeyTaken if another request recorded
+    `idempotency_key` first. With `input_stored` the upload is already in storage
+    under its upload key (resumable uploads) and is kept if this fails.
+    """
+    temp_file_path = upload.path
+    original_filename = upload.filename
+    storage = get_storage()
+    storage_key = storage.upload_key(upload.id)
+    converted_file_paths: List[str] = []
+
+    async def discard_upload() -> None:
+        # Clean up the saved file (and any linked cached outputs) if the request fails before commit
+        if not input_stored:
+            temp_file_path.unlink(missing_ok=True)
+        await anyio.to_thread.run_sync(_discard_stored, None if input_stored else storage_key, *converted_file_paths)
+
+    try:
+        # --- Result Cache Lookup ---
+        conversion_uuids = [uuid.uuid4() for _ in output_formats]
+        cached_outputs: List[StoredOutput | None] = []
+        with timer.stage("cache_lookup"):
+            for output_format, conversion_uuid in zip(output_formats, conversion_uuids):
+                cached_output = await _reuse_cached_output(upload, output_format, options, conversion_uuid)
+                if cached_output:
+                    converted_file_paths.append(cached_output.key)
+                cached_outputs.append(cached_output)
+        all_cached = all(cached_outputs)
+        if not all_cached and not input_stored:
+            # Make the input reachable by workers on other machines (no-op for local storage)
+            with timer.stage("store_input"):
+                await anyio.to_thread.run_sync(storage.put, temp_file_path, storage_key, upload.content_type)
 
         # Create File record in DB
         db_file = FileModel(
-            id=stored_file_id,
+            id=upload.id,
             original_filename=original_filename,
-            storage_path=str(temp_file_path.resolve()),  # Store resolved path for now
-            content_type=file.content_type,
-            file_size=file_size,
+            storage_path=storage_key,
+            content_type=upload.content_type,  # Sniffed from the file's magic bytes
+            file_size=upload.size,
+            content_hash=upload.content_hash or None,
             owner_id=current_user.id,
         )
         db.add(db_file)
 
-        # Create Conversion record in DB
-        db_conversion = ConversionModel(
-            original_file_id=db_file.id,
-            output_format=output_format, # Already normalized
-            status=ConversionStatus.PENDING,
-        )
-        db.add(db_conversion)
-
-        # Flush to get the conversion ID before queuing the task
-        await db.flush()
-        conversion_uuid = db_conversion.id # Fetch the generated UUID
-        if not conversion_uuid:
-             # This should not happen with UUID default, but defensively check
-             raise SQLAlchemyError("Failed to get conversion ID after flush.")
-
-        logger.info(
-            f"Conversion job (ID: {conversion_uuid}) created for output format {output_format}"
-        )
-
-        # --- Task Queuing ---
-        logger.debug(
-            f"Queuing Celery task for conversion_id: {conversion_uuid}"
-        )
-        task = process_file_conversion.delay(
-            conversion_id=str(conversion_uuid) # Pass UUID as string
-        )
-        logger.info(
-            f"Conversion task {task.id} queued for {original_filename}"
-        )
+        # Create one Conversion record per output format; the pending ones share one task,
+        # whose id is assigned up front so it is committed before the task can start
+        task_id = str(uuid.uuid4())
+        db_conversions = []
+        for index, (output_format, conversion_uuid, cached_output) in enumerate(
+            zip(output_formats, conversion_uuids, cached_outputs)
+        ):
+            db_conversion = ConversionModel(
+                id=conversion_uuid,
+                original_file_id=db_file.id,
+                owner_id=current_user.id,
+                original_filename=original_filename,
+                output_format=output_format, # Already normalized
+                options=options,
+                # Held by the first conversion only; replays find the others through the file
+                idempotency_key=idempotency_key if index == 0 else None,
+                status=ConversionStatus.COMPLETED if cached_output else ConversionStatus.PENDING,
+                task_id=None if cached_output else task_id,
+                converted_file_path=cached_output.key if cached_output else None,
+                output_sha256=cached_output.sha256 if cached_output else None,
+                output_size=cached_output.size if cached_output else None,
+                expires_at=expires_in(
+                    settings.RETENTION_SECONDS if cached_output else settings.UNFINISHED_RETENTION_SECONDS
+                ),
+            )
+            db.add(db_conversion)
+            db_conversions.append(db_conversion)
 
-        # Update Conversion record with task_id
-        db_conversion.task_id = task.id
-        db.add(db_conversion) # Add again to mark for update
+        if all_cached:
+            with timer.stage("db_commit"):
+                await db.commit()
+            # The input is not needed once the cached outputs have been linked
+            temp_file_path.unlink(missing_ok=True)
+            for db_conversion in db_conversions:
+                schedule_previews(db_conversion.id)
+            return _upload_response(db_conversions)
 
-        # --- Final Commit ---
-        await db.commit()
+        # Commit before queuing the task: a worker only sees committed rows (and a duplicate
+        # Idempotency-Key fails here, before anything is queued)
+        with timer.stage("db_commit"):
+            await db.commit()
         logger.debug(
-            f"DB changes committed for file {db_file.id} and conversion {db_conversion.id}"
+            f"DB changes committed for file {db_file.id} and conversions {', '.join(str(c.id) for c in db_conversions)}"
         )
-
-        return {
-            "message": "File uploaded successfully, conversion started.",
-            "task_id": task.id,
-            "conversion_id": conversion_uuid, # Also return conversion ID
-        }
-
     except SQLAlchemyError as db_exc:
+        await db.rollback()
+        await discard_upload()
+        if idempotency_key and isinstance(db_exc, IntegrityError):
+            raise _IdempotencyKeyTaken()
         logger.error(
             f"Database error during file upload for {original_filename}: {db_exc}",
             exc_info=True,
         )
-        await db.rollback()
-        # Clean up the saved file if DB fails before commit
-        temp_file_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Database error during upload process.",
@@ -211,28 +437,993 @@ async def upload_file(
             exc_info=True,
         )
         await db.rollback()
-        # Clean up the saved file if error occurs before commit
-        temp_file_path.unlink(missing_ok=True)
+        await discard_upload()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process file upload: {e}",
         )
+
+    # Formats completed from the cache get their thumbnails now, the others once converted
+    for db_conversion, cached_output in zip(db_conversions, cached_outputs):
+        if cached_output:
+            schedule_previews(db_conversion.id)
+
+    pending = [c for c, cached_output in zip(db_conversions, cached_outputs) if cached_output is None]
+    logger.info(
+        f"Conversion jobs (IDs: {', '.join(str(c.id) for c in pending)}) created for output formats {', '.join(c.output_format for c in pending)}"
+    )
+
+    # --- Task Queuing ---
+    # One task for all pending formats: the worker claims the siblings sharing its task_id
+    logger.debug(
+        f"Queuing Celery task for conversion_id: {pending[0].id}"
+    )
+    # Route by converter class and input size; prioritize by tier, minus the user's fair share
+    with timer.stage("enqueue"):
+        inflight = await reserve_slots(current_user.id)
+        try:
+            plan = registry.resolve_plan(upload.content_type, pending[0].output_format)
+            route = route_for(plan[-1].spec, upload.size, current_user.tier, inflight, via=[hop.spec for hop in plan[:-1]])
+            process_file_conversion.apply_async(
+                args=[str(pending[0].id)], # Pass UUID as string
+                task_id=task_id,
+                queue=route.queue,
+                priority=route.priority,
+            )
+        except Exception as e:
+            logger.error(f"Failed to queue conversion task {task_id} for {original_filename}: {e}", exc_info=True)
+            await _fail_unqueued(db, current_user.id, ConversionModel.task_id == task_id)
+            # No worker will pick the input up
+            await anyio.to_thread.run_sync(_discard_stored, storage_key)
+            if not input_stored:
+                temp_file_path.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to queue conversion task.",
+            )
+    logger.info(
+        f"Conversion task {task_id} queued for {original_filename} on {route.queue} (priority {route.priority})"
+    )
+
+    return _upload_response(db_conversions)
+
+
+# The body is parsed by StreamingIngest rather than FastAPI's File(), so describe it for the docs
+_UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {
+                            "type": "string",
+                            "format": "binary",
+                            "description": f"File to upload (Max: {settings.MAX_UPLOAD_SIZE / 1024 / 1024:.1f} MB, Types: {', '.join(sorted(list(settings.parsed_allowed_content_types)))})",
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+@router.post(
+    "/upload",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Upload File for Conversion",
+    response_description="Conversion task accepted",
+    openapi_extra=_UPLOAD_REQUEST_BODY,
+)
+async def upload_file(
+    # Use Annotated for clearer dependency injection and parameter metadata
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+    output_formats: Annotated[List[str], Depends(requested_output_formats)], # Normalize output formats early
+    options: Annotated[Dict[str, Any], Depends(conversion_options)],
+    idempotency_key: Annotated[Optional[str], Header(
+        min_length=1, max_length=255, description="Client-chosen key; retries with the same key return the first response",
+    )] = None,
+):
+    """
+    Streams a file from the request body into temporary storage, validates it based on
+    configured settings, creates corresponding database records for the file and the
+    conversion job, and queues a background task to perform the actual conversion.
+
+    The size limit is enforced while the body is read (413 mid-stream), and the file
+    type is taken from the upload's magic bytes rather than the client's Content-Type.
+
+    Several comma-separated output formats (`output_format=png,webp,jpg`) create one
+    conversion each against the same file, listed in `conversions`. A single task
+    converts them all from one decode of the input; `conversion_id` and `cached`
+    refer to the first format and to the upload as a whole respectively.
+
+    With an `Idempotency-Key` header, a retry of an upload that was already accepted
+    returns the original response (with `Idempotent-Replayed: true`) without reading
+    the body again or queuing a second conversion.
+    """
+    # --- Input Validation (before reading the body) ---
+    for output_format in output_formats:
+        _validate_output_format(output_format, current_user)
+    if idempotency_key:
+        previous = await _find_idempotent_upload(db, current_user, idempotency_key)
+        if previous:
+            logger.info(f"Replaying upload for Idempotency-Key {idempotency_key!r} (conversion {previous.id})")
+            return await _replay_upload(db, current_user, previous, output_formats, options, response)
+        # End the lookup's transaction so no pooled connection is held while the body streams in
+        await db.commit()
+
+    def validate_upload(upload: IngestedFile) -> None:
+        # Runs as soon as the first bytes have been sniffed, aborting unsupported uploads early
+        if not upload.filename:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No filename provided",
+            )
+        if upload.declared_type and upload.declared_type != upload.sniffed_type:
+            logger.info(
+                f"Upload '{upload.filename}' declared as {upload.declared_type} but sniffed as {upload.sniffed_type}"
+            )
+        for output_format in output_formats:
+            _validate_upload_type(upload.sniffed_type, output_format, current_user)
+
+    # --- Streaming File Saving ---
+    timer = StageTimer(UPLOAD_STAGE_SECONDS)
+    ingest = StreamingIngest(
+        request,
+        TEMP_UPLOAD_DIR,
+        max_file_size=settings.MAX_UPLOAD_SIZE,
+        max_files=1,
+        validate=validate_upload,
+    )
+    with timer.stage("ingest"):
+        result = await _ingest_or_raise(ingest, current_user)
+    if not result.files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No file provided",
+        )
+    upload = result.files[0]
+    logger.info(
+        f"File '{upload.filename}' (ID: {upload.id}) uploaded by user {current_user.id} to {upload.path}, size: {upload.size} bytes, type: {upload.content_type}, sha256: {upload.content_hash}"
+    )
+
+    # --- DB Record Creation & Task Queuing ---
+    # Upload metrics are labelled with the first format: the bytes were received once
+    output_format = output_formats[0]
+    converter = converter_label(upload.content_type, output_format)
+    UPLOAD_BYTES.labels(converter=converter, output_format=output_format).inc(upload.size)
+    try:
+        return await _register_upload(db, current_user, upload, output_formats, options, timer, idempotency_key)
+    except _IdempotencyKeyTaken:
+        previous = await _find_idempotent_upload(db, current_user, idempotency_key)
+        if previous is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Database error during upload process.",
+            )
+        logger.info(f"Concurrent upload with Idempotency-Key {idempotency_key!r} lost to conversion {previous.id}")
+        return await _replay_upload(db, current_user, previous, output_formats, options, response)
+    finally:
+        # Rejected uploads (4xx during ingest) are not recorded: their timings say nothing about capacity
+        timer.observe(converter=converter, output_format=output_format)
+
+
+# --- Resumable Uploads ---
+# Large files are sent as a sequence of chunks that survives dropped connections; see
+# app.services.chunked_uploads for the protocol and how chunks are assembled in storage.
+
+_CHUNK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/offset+octet-stream": {
+                "schema": {
+                    "type": "string",
+                    "format": "binary",
+                    "description": f"The next bytes of the file (Max: {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE / 1024 / 1024:.1f} MB per chunk)",
+                },
+            },
+        },
+    },
+}
+
+_UPLOAD_COLUMNS = (
+    ChunkedUpload.id,
+    ChunkedUpload.filename,
+    ChunkedUpload.size,
+    ChunkedUpload.offset,
+    ChunkedUpload.content_type,
+    ChunkedUpload.output_format,
+    ChunkedUpload.expires_at,
+)
+
+
+def _max_chunked_upload_size(current_user: User) -> int:
+    """Largest resumable upload for the user's tier (MAX_UPLOAD_SIZE for tiers without a limit)."""
+    return settings.parsed_tier_max_upload_sizes.get(current_user.tier or settings.DEFAULT_TIER, settings.MAX_UPLOAD_SIZE)
+
+
+def _chunked_upload_body(request: Request, response: Response, upload) -> dict:
+    """Response for an upload row; the offset is also sent as a header, as tus clients expect."""
+    response.headers["Upload-Offset"] = str(upload.offset)
+    response.headers["Upload-Length"] = str(upload.size)
+    return {
+        "upload_id": upload.id,
+        "filename": upload.filename,
+        "size": upload.size,
+        "offset": upload.offset,
+        "complete": upload.offset >= upload.size,
+        "content_type": upload.content_type,
+        "output_format": upload.output_format,
+        "expires_at": upload.expires_at,
+        "finalize_url": request.app.url_path_for("finalize_chunked_upload", upload_id=str(upload.id)),
+    }
+
+
+async def _get_owned_upload(db: AsyncSession, upload_id: uuid.UUID, current_user: User, lock: bool = False):
+    """The user's unexpired upload and whether a chunk is being received for it; 404 otherwise."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = (
+        select(ChunkedUpload, (ChunkedUpload.lease_expires_at > now).label("leased"))
+        .where(
+            ChunkedUpload.id == upload_id,
+            ChunkedUpload.owner_id == current_user.id,
+            ChunkedUpload.expires_at > now,
+        )
+    )
+    if lock:
+        stmt = stmt.with_for_update(of=ChunkedUpload)
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return row.ChunkedUpload, bool(row.leased)
+
+
+def _chunk_error(exc: Exception, offset: int, current_user: User) -> HTTPException:
+    """Translates a failed chunk into the HTTP error returned to the client."""
+    headers = {"Upload-Offset": str(offset)}
+    if isinstance(exc, HTTPException):
+        exc.headers = {**(exc.headers or {}), **headers}
+        return exc
+    if isinstance(exc, ChecksumMismatch):
+        logger.warning(f"Chunk from user {current_user.id} rejected: {exc}")
+        return HTTPException(status_code=CHECKSUM_MISMATCH, detail=str(exc), headers=headers)
+    if isinstance(exc, UploadTooLarge):
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc), headers=headers)
+    if isinstance(exc, IngestError):
+        logger.warning(f"Chunk from user {current_user.id} aborted: {exc}")
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc), headers=headers)
+    logger.error(f"Failed to store chunk for user {current_user.id}: {exc}", exc_info=True)
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save uploaded chunk.", headers=headers
+    )
+
+
+@router.post(
+    "/uploads",
+    status_code=status.HTTP_201_CREATED,
+    summary="Start a Resumable Upload",
+    response_description="Upload created",
+)
+async def create_chunked_upload(
+    request: Request,
+    response: Response,
+    body: ChunkedUploadCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+    output_format: Annotated[
+        str, Depends(lambda output_format: output_format.lower())
+    ],
+    options: Annotated[Dict[str, Any], Depends(conversion_options)],
+):
+    """
+    Starts a resumable upload of `size` bytes that will be converted to `output_format`
+    with the given options. Send the file with `PATCH` requests to the returned
+    `Location`, in order and each at most `max_chunk_size` bytes, then call
+    `finalize_url`. Files up to the limit of the user's tier are accepted.
+    """
+    _validate_output_format(output_format, current_user)
+    filename = Path(body.filename).name
+    if not filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No filename provided",
+        )
+    limit = _max_chunked_upload_size(current_user)
+    if body.size > limit:
+        logger.warning(f"Resumable upload of {body.size} bytes rejected for user {current_user.id} (limit {limit})")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(UploadTooLarge(limit)),
+        )
+
+    storage = get_storage()
+    upload_id = uuid.uuid4()
+    storage_key = storage.upload_key(upload_id)
+    try:
+        state = await anyio.to_thread.run_sync(storage.begin_parts, storage_key)
+    except Exception as e:
+        logger.error(f"Failed to start resumable upload for user {current_user.id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to start upload.",
+        )
+    upload = ChunkedUpload(
+        id=upload_id,
+        owner_id=current_user.id,
+        filename=filename,
+        size=body.size,
+        offset=0,
+        output_format=output_format,
+        options=options,
+        storage_path=storage_key,
+        storage_state=state,
+        expires_at=upload_expiry(),
+    )
+    db.add(upload)
+    try:
+        await db.commit()
+    except SQLAlchemyError as db_exc:
+        await db.rollback()
+        logger.error(f"Database error creating resumable upload for user {current_user.id}: {db_exc}", exc_info=True)
+        try:
+            await anyio.to_thread.run_sync(storage.abort_parts, storage_key, state)
+        except Exception as abort_exc:
+            logger.warning(f"Failed to discard resumable upload {upload_id}: {abort_exc}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error during upload process.",
+        )
+
+    logger.info(f"Resumable upload {upload_id} of '{filename}' ({body.size} bytes) started by user {current_user.id}")
+    response.headers["Location"] = request.app.url_path_for("get_chunked_upload", upload_id=str(upload_id))
+    return {
+        **_chunked_upload_body(request, response, upload),
+        "min_chunk_size": storage.min_part_size,
+        "max_chunk_size": settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE,
+    }
+
+
+@router.get("/uploads/{upload_id}", summary="Get Resumable Upload Offset")
+async def get_chunked_upload(
+    request: Request,
+    response: Response,
+    upload_id: uuid.UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+):
+    """How many bytes of the upload were received; resume by sending the rest from `offset`."""
+    upload, _ = await _get_owned_upload(db, upload_id, current_user)
+    response.headers["Cache-Control"] = "no-store"
+    return _chunked_upload_body(request, response, upload)
+
+
+@router.patch(
+    "/uploads/{upload_id}",
+    summary="Append a Chunk to a Resumable Upload",
+    openapi_extra=_CHUNK_REQUEST_BODY,
+)
+async def append_chunked_upload(
+    request: Request,
+    response: Response,
+    upload_id: uuid.UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+    upload_offset: Annotated[int, Header(
+        ge=0, description="Offset of the chunk in the file; must equal the upload's current offset",
+    )],
+    upload_checksum: Annotated[Optional[str], Header(
+        description="'sha256 ' followed by the base64-encoded SHA-256 of the chunk",
+    )] = None,
+):
+    """
+    Streams the request body into the upload at `Upload-Offset`. The chunk is kept only
+    if it arrives completely and matches `Upload-Checksum` (460 otherwise); the offset
+    then advances and the upload's expiry is extended. A wrong offset returns 409 with
+    the current `Upload-Offset`, and a chunk sent while another is still being
+    received returns 423.
+    """
+    checksum = None
+    if upload_checksum:
+        try:
+            checksum = parse_upload_checksum(upload_checksum)
+        except IngestError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Claim the upload for this chunk in one statement; the connection is released while the body streams in
+    now = datetime.datetime.now(datetime.timezone.utc)
+    claimed = (await db.execute(
+        update(ChunkedUpload)
+        .where(
+            ChunkedUpload.id == upload_id,
+            ChunkedUpload.owner_id == current_user.id,
+            ChunkedUpload.offset == upload_offset,
+            ChunkedUpload.offset < ChunkedUpload.size,
+            ChunkedUpload.expires_at > now,
+            (ChunkedUpload.lease_expires_at.is_(None)) | (ChunkedUpload.lease_expires_at <= now),
+        )
+        .values(lease_expires_at=lease_expiry())
+        .returning(ChunkedUpload.size, ChunkedUpload.output_format, ChunkedUpload.storage_path, ChunkedUpload.storage_state)
+    )).one_or_none()
+    await db.commit()
+    if claimed is None:
+        upload, leased = await _get_owned_upload(db, upload_id, current_user)
+        headers = {"Upload-Offset": str(upload.offset)}
+        if upload.offset != upload_offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload is at offset {upload.offset}, not {upload_offset}",
+                headers=headers,
+            )
+        if upload.offset >= upload.size:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload is already complete", headers=headers)
+        raise HTTPException(
+            status_code=status.HTTP_423_LOCKED,
+            detail="Another chunk of this upload is still being received",
+            headers=headers,
+        )
+
+    validate_head = None
+    if upload_offset == 0:
+        def validate_head(head: bytes) -> None:
+            # Unsupported files are rejected on their first bytes, as with single uploads
+            _validate_upload_type(sniff_content_type(head), claimed.output_format, current_user)
+
+    storage = get_storage()
+    try:
+        chunk = await receive_chunk(
+            request,
+            storage,
+            claimed.storage_path,
+            claimed.storage_state or {},
+            upload_offset,
+            claimed.size - upload_offset,
+            checksum=checksum,
+            validate_head=validate_head,
+        )
+    except Exception as exc:
+        # Nothing was kept: release the upload so the chunk can be resent right away
+        await db.execute(update(ChunkedUpload).where(ChunkedUpload.id == upload_id).values(lease_expires_at=None))
+        await db.commit()
+        raise _chunk_error(exc, upload_offset, current_user)
+
+    values = {
+        "offset": upload_offset + chunk.size,
+        "storage_state": chunk.state,
+        "lease_expires_at": None,
+        "expires_at": upload_expiry(),
+    }
+    if upload_offset == 0:
+        values["content_type"] = sniff_content_type(chunk.head)
+    saved = (await db.execute(
+        update(ChunkedUpload)
+        .where(ChunkedUpload.id == upload_id, ChunkedUpload.offset == upload_offset)
+        .values(**values)
+        .returning(*_UPLOAD_COLUMNS)
+    )).one_or_none()
+    await db.commit()
+    if saved is None:
+        # Only possible if this request outlived its lease and another chunk took over
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload changed while the chunk was being received",
+        )
+    logger.debug(f"Resumable upload {upload_id}: {chunk.size} bytes at offset {upload_offset}")
+    return _chunked_upload_body(request, response, saved)
+
+
+@router.post(
+    "/uploads/{upload_id}/finalize",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Finish a Resumable Upload and Start Its Conversion",
+    response_description="Conversion task accepted",
+)
+async def finalize_chunked_upload(
+    upload_id: uuid.UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+):
+    """
+    Hands a completely received upload to the conversion pipeline, exactly like
+    `POST /convert/upload`, and returns the same response. Repeating the call returns
+    the conversion created by the first one.
+    """
+    try:
+        upload, leased = await _get_owned_upload(db, upload_id, current_user, lock=True)
+    except HTTPException:
+        # Finalized before: the upload became the File with the same id
+        previous = await _upload_conversions(db, upload_id, current_user)
+        if not previous:
+            raise
+        return _upload_response(previous)
+    if leased:
+        raise HTTPException(
+            status_code=status.HTTP_423_LOCKED,
+            detail="A chunk of this upload is still being received",
+        )
+    if upload.offset < upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete: {upload.offset} of {upload.size} bytes received",
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+
+    storage = get_storage()
+    try:
+        await anyio.to_thread.run_sync(storage.complete_parts, upload.storage_path, upload.storage_state or {})
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to assemble resumable upload {upload_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to assemble uploaded file.",
+        )
+
+    ingested = IngestedFile(
+        id=upload.id,
+        field_name="file",
+        filename=upload.filename,
+        path=storage.local_path(upload.storage_path) or TEMP_UPLOAD_DIR / str(upload.id),
+        declared_type=None,
+        sniffed_type=upload.content_type,
+        size=upload.size,
+    )
+    output_format, options = upload.output_format, upload.options or {}
+    # Deleted in the transaction that creates the File, so an upload is finalized only once
+    await db.delete(upload)
+    logger.info(
+        f"Resumable upload {upload_id} of '{ingested.filename}' finalized by user {current_user.id}, size: {ingested.size} bytes, type: {ingested.content_type}"
+    )
+
+    timer = StageTimer(UPLOAD_STAGE_SECONDS)
+    converter = converter_label(ingested.content_type, output_format)
+    UPLOAD_BYTES.labels(converter=converter, output_format=output_format).inc(ingested.size)
+    try:
+        return await _register_upload(db, current_user, ingested, [output_format], options, timer, input_stored=True)
     finally:
-        # Ensure the UploadFile resource is closed to release temp resources
-        await file.close()
+        timer.observe(converter=converter, output_format=output_format)
+
+
+@router.delete(
+    "/uploads/{upload_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Cancel a Resumable Upload",
+)
+async def cancel_chunked_upload(
+    upload_id: uuid.UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+):
+    """Discards an unfinished upload and the bytes received so far."""
+    upload, leased = await _get_owned_upload(db, upload_id, current_user, lock=True)
+    if leased:
+        raise HTTPException(
+            status_code=status.HTTP_423_LOCKED,
+            detail="A chunk of this upload is still being received",
+        )
+    storage = get_storage()
+    try:
+        await anyio.to_thread.run_sync(storage.abort_parts, upload.storage_path, upload.storage_state or {})
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to discard resumable upload {upload_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to discard upload.",
+        )
+    await db.delete(upload)
+    await db.commit()
+    logger.info(f"Resumable upload {upload_id} cancelled by user {current_user.id}")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+_BATCH_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": f"Files to convert (Max: {settings.MAX_BATCH_FILES} files, {settings.MAX_UPLOAD_SIZE / 1024 / 1024:.1f} MB each)",
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+@router.post(
+    "/batch",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Upload Multiple Files for Conversion",
+    response_description="Batch conversion accepted",
+    openapi_extra=_BATCH_REQUEST_BODY,
+)
+async def upload_batch(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+    output_format: Annotated[
+        str, Depends(lambda output_format: output_format.lower())
+    ],
+    options: Annotated[Dict[str, Any], Depends(conversion_options)],
+):
+    """
+    Streams N files from one request, records all File and Conversion rows with a
+    single bulk insert each, and dispatches the conversions as one Celery group.
+    Progress is tracked as an aggregate via `GET /convert/batch/{batch_id}`.
+    """
+    _validate_output_format(output_format, current_user)
+
+    def validate_upload(upload: IngestedFile) -> None:
+        if not upload.filename:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No filename provided",
+            )
+        _validate_upload_type(upload.sniffed_type, output_format, current_user)
+
+    ingest = StreamingIngest(
+        request,
+        TEMP_UPLOAD_DIR,
+        max_file_size=settings.MAX_UPLOAD_SIZE,
+        max_files=settings.MAX_BATCH_FILES,
+        validate=validate_upload,
+    )
+    result = await _ingest_or_raise(ingest, current_user)
+    if not result.files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No files provided",
+        )
+    logger.info(
+        f"Batch of {len(result.files)} files ({sum(f.size for f in result.files)} bytes) uploaded by user {current_user.id}"
+    )
+
+    batch_id = uuid.uuid4()
+    storage = get_storage()
+    file_rows = []
+    conversion_rows = []
+    queued = []  # (conversion_id, task_id, upload) for conversions that need a worker
+    cached = 0
+    try:
+        for upload in result.files:
+            conversion_uuid = uuid.uuid4()
+            storage_key = storage.upload_key(upload.id)
+            cached_output = await _reuse_cached_output(upload, output_format, options, conversion_uuid)
+            task_id = None
+            if cached_output:
+                cached += 1
+                upload.path.unlink(missing_ok=True)
+            else:
+                await anyio.to_thread.run_sync(storage.put, upload.path, storage_key, upload.content_type)
+                # Pre-assign task IDs so rows are written once, complete, before dispatch
+                task_id = str(uuid.uuid4())
+                queued.append((conversion_uuid, task_id, upload))
+            file_rows.append({
+                "id": upload.id,
+                "original_filename": upload.filename,
+                "storage_path": storage_key,
+                "content_type": upload.content_type,
+                "file_size": upload.size,
+                "content_hash": upload.content_hash,
+                "owner_id": current_user.id,
+            })
+            conversion_rows.append({
+                "id": conversion_uuid,
+                "task_id": task_id,
+                "original_file_id": upload.id,
+                "owner_id": current_user.id,
+                "original_filename": upload.filename,
+                "output_format": output_format,
+                "options": options,
+                "status": ConversionStatus.COMPLETED if cached_output else ConversionStatus.PENDING,
+                "converted_file_path": cached_output.key if cached_output else None,
+                "output_sha256": cached_output.sha256 if cached_output else None,
+                "output_size": cached_output.size if cached_output else None,
+                "expires_at": expires_in(
+                    settings.RETENTION_SECONDS if cached_output else settings.UNFINISHED_RETENTION_SECONDS
+                ),
+                "batch_id": batch_id,
+            })
+
+        db.add(ConversionBatch(
+            id=batch_id,
+            owner_id=current_user.id,
+            output_format=output_format,
+            total=len(conversion_rows),
+        ))
+        await db.flush()
+        # --- Bulk inserts: one statement per table regardless of batch size ---
+        await db.execute(insert(FileModel), file_rows)
+        await db.execute(insert(ConversionModel), conversion_rows)
+        # Commit before dispatch so workers always find their rows
+        await db.commit()
+    except Exception as exc:
+        if isinstance(exc, SQLAlchemyError):
+            logger.error(f"Database error during batch upload for user {current_user.id}: {exc}", exc_info=True)
+            detail = "Database error during upload process."
+        else:
+            logger.error(f"Failed to store batch upload for user {current_user.id}: {exc}", exc_info=True)
+            detail = "Failed to store uploaded files."
+        await db.rollback()
+        result.cleanup()
+        await anyio.to_thread.run_sync(
+            _discard_stored,
+            *(row["storage_path"] for row in file_rows),
+            *(row["converted_file_path"] for row in conversion_rows),
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=detail,
+        )
+
+    # Conversions completed from the result cache still need their thumbnails
+    for row in conversion_rows:
+        if row["converted_file_path"]:
+            schedule_previews(row["id"])
+
+    # --- Task Queuing: one group for the whole batch ---
+    group_id = None
+    if queued:
+        try:
+            # Each item counts against the user's fair share, so the tail of a large batch
+            # drops in priority instead of monopolizing workers
+            inflight = await reserve_slots(current_user.id, len(queued))
+            signatures = []
+            for position, (conversion_uuid, task_id, upload) in enumerate(queued):
+                plan = registry.resolve_plan(upload.content_type, output_format)
+                route = route_for(
+                    plan[-1].spec,
+                    upload.size,
+                    current_user.tier,
+                    inflight + position,
+                    via=[hop.spec for hop in plan[:-1]],
+                )
+                signatures.append(
+                    process_file_conversion.s(str(conversion_uuid)).set(
+                        task_id=task_id, queue=route.queue, priority=route.priority
+                    )
+                )
+            group_result = celery_group(signatures).apply_async()
+            group_id = group_result.id
+            await db.execute(
+                update(ConversionBatch).where(ConversionBatch.id == batch_id).values(group_id=group_id)
+            )
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to dispatch batch {batch_id}: {e}", exc_info=True)
+            await _fail_unqueued(db, current_user.id, ConversionModel.batch_id == batch_id)
+            # No worker will pick these inputs up
+            await anyio.to_thread.run_sync(
+                _discard_stored, *(storage.upload_key(upload.id) for _, _, upload in queued)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to queue batch conversion.",
+            )
+
+    logger.info(f"Batch {batch_id} created: {len(queued)} queued (group {group_id}), {cached} from cache")
+    return {
+        "message": "Files uploaded successfully, batch conversion started.",
+        "batch_id": batch_id,
+        "group_id": group_id,
+        "total": len(conversion_rows),
+        "cached": cached,
+        "conversions": [
+            {"conversion_id": row["id"], "original_filename": f["original_filename"], "task_id": row["task_id"]}
+            for row, f in zip(conversion_rows, file_rows)
+        ],
+    }
+
+
+async def _get_owned_batch(db: AsyncSession, batch_id: uuid.UUID, current_user: User) -> ConversionBatch:
+    batch = await db.get(ConversionBatch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    if batch.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this batch")
+    return batch
+
+
+@router.get("/batch/{batch_id}", summary="Get Batch Conversion Status")
+async def get_batch_status(
+    batch_id: uuid.UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+):
+    """Returns aggregate status counts for a batch, computed with one GROUP BY query."""
+    batch = await _get_owned_batch(db, batch_id, current_user)
+    stmt = (
+        select(ConversionModel.status, func.count())
+        .where(ConversionModel.batch_id == batch_id)
+        .group_by(ConversionModel.status)
+    )
+    counts = {conv_status.value: 0 for conv_status in ConversionStatus}
+    for conv_status, count in (await db.execute(stmt)).all():
+        counts[conv_status.value] = count
+
+    done = counts[ConversionStatus.COMPLETED.value] + counts[ConversionStatus.FAILED.value]
+    if done < batch.total:
+        batch_status = "processing"
+    elif counts[ConversionStatus.FAILED.value] == 0:
+        batch_status = "completed"
+    elif counts[ConversionStatus.COMPLETED.value] == 0:
+        batch_status = "failed"
+    else:
+        batch_status = "partially_completed"
+
+    return {
+        "batch_id": batch.id,
+        "group_id": batch.group_id,
+        "status": batch_status,
+        "output_format": batch.output_format,
+        "total": batch.total,
+        "counts": counts,
+        "progress": done / batch.total if batch.total else 1.0,
+        "created_at": batch.created_at,
+    }
+
+
+@router.get("/batch/{batch_id}/download", summary="Download Batch Results as ZIP")
+async def download_batch(
+    batch_id: uuid.UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+):
+    """Streams a ZIP of all completed outputs in the batch, assembled on the fly."""
+    await _get_owned_batch(db, batch_id, current_user)
+    stmt = (
+        select(ConversionModel.converted_file_path, ConversionModel.output_format, ConversionModel.original_filename)
+        .where(
+            ConversionModel.batch_id == batch_id,
+            ConversionModel.status == ConversionStatus.COMPLETED,
+            ConversionModel.converted_file_path.is_not(None),
+        )
+        .order_by(ConversionModel.original_filename)
+    )
+    rows = (await db.execute(stmt)).all()
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No completed conversions in this batch yet.")
+
+    # Downloaded outputs only need to outlive a retry of the download
+    await shorten_expiry(
+        db,
+        expires_in(settings.RETENTION_AFTER_DOWNLOAD_SECONDS),
+        ConversionModel.batch_id == batch_id,
+        ConversionModel.status == ConversionStatus.COMPLETED,
+    )
+    await db.commit()
+
+    entries = [
+        (f"{Path(original_filename).stem}.{output_format}", converted_file_path)
+        for converted_file_path, output_format, original_filename in rows
+    ]
+    logger.info(f"Streaming ZIP of {len(entries)} outputs for batch {batch_id}")
+    # Sync generator: Starlette iterates it in a threadpool, keeping storage reads off the event loop
+    return StreamingResponse(
+        stream_zip(entries, get_storage()),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.zip"'},
+    )
+
+
+@router.get("/cache/stats", summary="Get Result Cache Statistics")
+async def get_result_cache_stats(
+    current_user: Annotated[User, Depends(current_active_superuser)],
+):
+    """
+    Returns hit/miss/eviction counters of the result cache (shared by all API and worker processes)
+    and of this API process's user and preview caches.
+    """
+    return {
+        "enabled": settings.RESULT_CACHE_ENABLED,
+        "max_bytes": settings.RESULT_CACHE_MAX_BYTES,
+        "ttl_seconds": settings.RESULT_CACHE_TTL_SECONDS,
+        **(await result_cache.stats()),
+        "user_cache": {
+            "enabled": settings.USER_CACHE_ENABLED,
+            "ttl_seconds": settings.USER_CACHE_TTL_SECONDS,
+            **user_cache.stats(),
+        },
+        "preview_cache": {
+            "max_bytes": settings.PREVIEW_CACHE_MAX_BYTES,
+            "ttl_seconds": settings.PREVIEW_CACHE_TTL_SECONDS,
+            **preview_cache.stats(),
+        },
+    }
+
+
+@router.get("/db/stats", summary="Get Database Pool Statistics")
+async def get_db_pool_stats(
+    current_user: Annotated[User, Depends(current_active_superuser)],
+):
+    """Returns connection checkout wait times and pool occupancy of this API process."""
+    return pool_stats() or {}
+
+
+@router.get("/events", summary="Stream Conversion Status Events")
+async def stream_conversion_events(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+):
+    """
+    Server-Sent Events stream of status and progress changes for all of the current
+    user's conversions, pushed by the workers through Redis pub/sub. Replaces polling
+    `GET /convert/status/{conversion_id}`: one connection covers every in-flight job.
+    """
+    events = subscribe(current_user.id, settings.EVENTS_KEEPALIVE_SECONDS)
+    await events.__anext__()  # Subscribed: nothing published from here on can be missed
+
+    # Snapshot of in-flight jobs so clients start from the current state without polling
+    stmt = (
+        select(ConversionModel.id, ConversionModel.status, ConversionModel.output_format, ConversionModel.batch_id)
+        .where(
+            ConversionModel.owner_id == current_user.id,
+            ConversionModel.status.in_([ConversionStatus.PENDING, ConversionStatus.PROCESSING]),
+        )
+    )
+    try:
+        snapshot = (await db.execute(stmt)).all()
+        # Release the DB connection: the stream can stay open for a long time
+        await db.close()
+    except BaseException:
+        # The stream below owns the subscription only once it starts
+        await events.aclose()
+        raise
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            for conv_id, conv_status, conv_format, conv_batch_id in snapshot:
+                yield format_sse({
+                    "conversion_id": str(conv_id),
+                    "status": conv_status.value,
+                    "output_format": conv_format,
+                    "batch_id": str(conv_batch_id) if conv_batch_id else None,
+                })
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/status/{conversion_id}", summary="Get Conversion Status")
 async def get_conversion_status(
     conversion_id: uuid.UUID,
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(current_active_verified_user)],
 ):
     """Retrieves the status and details of a specific conversion job."""
-    stmt = (
-        select(ConversionModel)
-        .options(joinedload(ConversionModel.original_file)) # Eager load file details
-        .where(ConversionModel.id == conversion_id)
+    # Ownership is part of the lookup: one indexed row, no join; other users' jobs are simply not found
+    stmt = select(ConversionModel).where(
+        ConversionModel.id == conversion_id, ConversionModel.owner_id == current_user.id
     )
     result = await db.execute(stmt)
     conversion = result.scalar_one_or_none()
@@ -240,9 +1431,22 @@ async def get_conversion_status(
     if not conversion:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversion job not found")
 
-    # Ensure the user owns the original file
-    if conversion.original_file.owner_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this conversion status")
+    # Fractional progress lives in Redis (written by the worker), not in the conversions table
+    progress = None
+    eta_seconds = None
+    progress_detail = None
+    if conversion.status == ConversionStatus.COMPLETED:
+        progress = 1.0
+    elif conversion.status == ConversionStatus.PROCESSING:
+        snapshot = await read_progress(conversion.id)
+        if snapshot:
+            progress = snapshot.get("progress")
+            eta_seconds = snapshot.get("eta_seconds")
+            progress_detail = {key: snapshot.get(key) for key in ("done", "total", "unit", "updated_at")}
+        else:
+            progress = 0.0
+    elif conversion.status == ConversionStatus.PENDING:
+        progress = 0.0
 
     return {
         "conversion_id": conversion.id,
@@ -253,32 +1457,55 @@ async def get_conversion_status(
         "error_message": conversion.error_message,
         "created_at": conversion.created_at,
         "updated_at": conversion.updated_at,
-        "original_filename": conversion.original_file.original_filename,
+        "original_filename": conversion.original_filename,
+        "options": conversion.options,
+        "progress": progress,
+        "eta_seconds": eta_seconds,
+        "progress_detail": progress_detail,
+        "preview_sizes": conversion.preview_sizes,
+        "preview_url": _preview_url(request, conversion.id, conversion.preview_sizes),
     }
 
-# TODO: Decide on download strategy: FileResponse vs redirect/signed URL
+# Outputs are immutable once written (a new conversion gets a new ID), so clients may keep them
+# for a year; "private" because every download requires authentication
+DOWNLOAD_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def _content_disposition(filename: str) -> str:
+    if filename.isascii():
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
 @router.get("/download/{conversion_id}", summary="Download Converted File")
 async def download_converted_file(
     conversion_id: uuid.UUID,
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(current_active_verified_user)],
 ):
-    """Downloads the result of a completed conversion job."""
-    stmt = (
-        select(ConversionModel)
-        .options(joinedload(ConversionModel.original_file)) # Need owner_id
-        .where(ConversionModel.id == conversion_id)
-    )
-    result = await db.execute(stmt)
-    conversion = result.scalar_one_or_none()
+    """
+    Downloads the result of a completed conversion job.
+
+    Responses carry a strong ETag (the output's SHA-256) and long-lived cache headers.
+    `If-None-Match`/`If-Modified-Since` are answered with 304 from the database row alone,
+    and `Range` (including multiple ranges) with 206, honoring `If-Range`.
+    """
+    # Only the columns needed to describe the download; ownership is part of the lookup
+    stmt = select(
+        ConversionModel.status,
+        ConversionModel.output_format,
+        ConversionModel.converted_file_path,
+        ConversionModel.output_sha256,
+        ConversionModel.output_size,
+        ConversionModel.updated_at,
+        ConversionModel.original_filename,
+    ).where(ConversionModel.id == conversion_id, ConversionModel.owner_id == current_user.id)
+    conversion = (await db.execute(stmt)).one_or_none()
 
     if not conversion:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversion job not found")
 
-    # Ensure the user owns the original file
-    if conversion.original_file.owner_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to download this file")
-
     if conversion.status != ConversionStatus.COMPLETED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Conversion status is {conversion.status}, not COMPLETED.")
 
@@ -286,68 +1513,260 @@ async def download_converted_file(
         logger.error(f"Conversion {conversion_id} is COMPLETED but has no converted_file_path.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Converted file path not found.")
 
-    # --- Download Strategy --- 
-    # The strategy is to serve the file directly using FileResponse,
-    # assuming the converted_file_path is locally accessible to the API server.
-    # Ensure path is secure and within allowed directories (path traversal is prevented by Path conversion)
-    local_file_path = Path(conversion.converted_file_path)
-    if local_file_path.is_file(): # Basic check
-         # Construct a user-friendly download filename
-        base_name = Path(conversion.original_file.original_filename).stem
-        # Sanitize base_name if necessary (though Path operations are generally safe)
-        safe_base_name = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in base_name)
-        download_filename = f"{safe_base_name}_converted.{conversion.output_format}"
-        
-        # Determine appropriate media type based on output format if possible
-        # Using octet-stream is a safe default
-        media_type = mimetypes.guess_type(download_filename)[0] or "application/octet-stream"
-        
-        logger.info(f"Serving file {local_file_path} as {download_filename} with type {media_type}")
-        return FileResponse(local_file_path, media_type=media_type, filename=download_filename)
-    else:
-        # If the file path exists but isn't a file, or doesn't exist at all
-        logger.error(f"Converted file path not found or invalid on server: {conversion.converted_file_path}")
+    # --- Validators ---
+    # Rows converted before output digests were recorded have no ETag and rely on Last-Modified
+    etag = f'"{conversion.output_sha256}"' if conversion.output_sha256 else None
+    last_modified = http_date(conversion.updated_at) if conversion.updated_at else None
+    cache_headers = {"Cache-Control": DOWNLOAD_CACHE_CONTROL}
+    if etag:
+        cache_headers["ETag"] = etag
+    if last_modified:
+        cache_headers["Last-Modified"] = last_modified
+
+    if_none_match = request.headers.get("if-none-match")
+    if (etag and etag_matches(if_none_match, etag)) or (
+        not if_none_match
+        and conversion.updated_at
+        and not_modified_since(request.headers.get("if-modified-since"), conversion.updated_at)
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    # Revalidations leave the row alone; downloaded outputs only need to outlive resumed or
+    # repeated range requests
+    await shorten_expiry(db, expires_in(settings.RETENTION_AFTER_DOWNLOAD_SECONDS), ConversionModel.id == conversion_id)
+    await db.commit()
+
+    # --- Download Strategy ---
+    # Remote storage: redirect to a presigned URL so the bytes never pass through the API
+    # (the object store handles Range itself). Otherwise stream from storage here.
+    base_name = Path(conversion.original_filename).stem
+    safe_base_name = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in base_name)
+    download_filename = f"{safe_base_name}_converted.{conversion.output_format}"
+    media_type = mimetypes.guess_type(download_filename)[0] or "application/octet-stream"
+    key = conversion.converted_file_path
+    storage = get_storage()
+
+    presigned_url = await anyio.to_thread.run_sync(storage.presigned_url, key, download_filename, media_type)
+    if presigned_url:
+        logger.info(f"Redirecting download of {key} to a presigned URL")
+        return RedirectResponse(presigned_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    size = conversion.output_size
+    if size is None:
+        stored = await anyio.to_thread.run_sync(storage.stat, key)
+        size = stored.size if stored else None
+    if size is None:
+        logger.error(f"Converted file not found in storage: {key}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Converted file not available for download.")
 
+    headers = {
+        **cache_headers,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": _content_disposition(download_filename),
+    }
+    ranges = None
+    if request.headers.get("range") and if_range_allows(request.headers.get("if-range"), etag, last_modified):
+        try:
+            ranges = parse_range_header(request.headers["range"], size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**cache_headers, "Content-Range": f"bytes */{size}"},
+            )
+
+    # Sync iterators: Starlette reads them in a threadpool, keeping storage I/O off the event loop
+    if not ranges:
+        logger.info(f"Serving {key} as {download_filename} with type {media_type}")
+        return StreamingResponse(
+            storage.iter_range(key),
+            media_type=media_type,
+            headers={**headers, "Content-Length": str(size)},
+        )
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        logger.info(f"Serving bytes {start}-{end}/{size} of {key}")
+        return StreamingResponse(
+            storage.iter_range(key, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)},
+        )
+    boundary, length, body = multipart_byteranges(
+        ranges, size, media_type, lambda start, end: storage.iter_range(key, start, end)
+    )
+    logger.info(f"Serving {len(ranges)} byte ranges of {key}")
+    return StreamingResponse(
+        body,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={**headers, "Content-Length": str(length)},
+    )
+
+# Thumbnails are immutable like outputs; "private" because they require authentication
+PREVIEW_CACHE_CONTROL = DOWNLOAD_CACHE_CONTROL
+
+
+def _preview_url(request: Request, conversion_id: uuid.UUID, preview_sizes: Optional[List[int]]) -> Optional[str]:
+    """Path of the smallest stored thumbnail, or None while there is none."""
+    if not preview_sizes:
+        return None
+    path = request.app.url_path_for("get_conversion_preview", conversion_id=str(conversion_id))
+    return f"{path}?size={min(preview_sizes)}"
+
+
+@router.get("/preview/{conversion_id}", summary="Get Conversion Thumbnail")
+async def get_conversion_preview(
+    conversion_id: uuid.UUID,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(current_active_verified_user)],
+    size: Annotated[Optional[int], Query(description="Thumbnail size in pixels, one of PREVIEW_SIZES (Default: the smallest)")] = None,
+):
+    """
+    Serves a small WEBP thumbnail of a completed conversion's output (the first page
+    for documents), rendered by the workers shortly after the conversion completes.
+
+    Recently served thumbnails are answered from this process's memory without a
+    database query; `If-None-Match` is answered with 304.
+    """
+    sizes = settings.parsed_preview_sizes
+    if size is None and sizes:
+        size = sizes[0]
+    if size not in sizes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported preview size. Supported: {', '.join(map(str, sizes)) or 'none'}",
+        )
+
+    etag = preview_etag(conversion_id, size)
+    headers = {"Cache-Control": PREVIEW_CACHE_CONTROL, "ETag": etag}
+    cached = preview_cache.get(conversion_id, size)
+    if cached is not None and cached.owner_id == current_user.id:
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=cached.data, media_type=PREVIEW_MEDIA_TYPE, headers=headers)
+
+    stmt = select(ConversionModel.preview_sizes).where(
+        ConversionModel.id == conversion_id, ConversionModel.owner_id == current_user.id
+    )
+    conversion = (await db.execute(stmt)).one_or_none()
+    if not conversion:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversion job not found")
+    if size not in (conversion.preview_sizes or ()):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Preview not available")
+    # The row proves the thumbnail exists; revalidations need no storage read
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    storage = get_storage()
+    key = storage.preview_key(conversion_id, size)
+    try:
+        data = await anyio.to_thread.run_sync(read_preview, storage, key)
+    except Exception as e:
+        logger.error(f"Failed to read preview {key}: {e}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Preview not available")
+    preview_cache.put(conversion_id, size, CachedPreview(owner_id=current_user.id, data=data))
+    return Response(content=data, media_type=PREVIEW_MEDIA_TYPE, headers=headers)
+
+
 # --- Add Conversion History Endpoint ---
+def _encode_history_cursor(created_at: datetime.datetime, conversion_id: uuid.UUID) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last row on the page."""
+    raw = f"{created_at.isoformat()}|{conversion_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_history_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, conversion_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), uuid.UUID(conversion_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+def _history_query(
+    owner_id: uuid.UUID,
+    limit: int,
+    after: Optional[tuple[datetime.datetime, uuid.UUID]] = None,
+    skip: int = 0,
+):
+    """
+    One page of a user's history, newest first, starting after the (created_at, id) key
+    `after`. Served by ix_conversions_owner_id_created_at_id in index order, without a sort.
+    """
+    # Slim projection: only the columns in the response, no ORM objects
+    stmt = (
+        select(
+            ConversionModel.id,
+            ConversionModel.task_id,
+            ConversionModel.status,
+            ConversionModel.output_format,
+            ConversionModel.converted_file_path,
+            ConversionModel.error_message,
+            ConversionModel.created_at,
+            ConversionModel.updated_at,
+            ConversionModel.options,
+            ConversionModel.original_filename,
+            ConversionModel.preview_sizes,
+        )
+        .where(ConversionModel.owner_id == owner_id)
+        # id breaks ties: rows inserted in one transaction (batches) share created_at
+        .order_by(ConversionModel.created_at.desc(), ConversionModel.id.desc()) # Show newest first
+        .limit(limit)
+    )
+    if after:
+        stmt = stmt.where(tuple_(ConversionModel.created_at, ConversionModel.id) < tuple_(*after))
+    elif skip:
+        stmt = stmt.offset(skip)
+    return stmt
+
+
 @router.get("/",
     summary="Get User's Conversion History",
     response_model=List[ConversionStatusResponse] # Reuse the status response model
 )
 async def get_conversion_history(
+    request: Request,
+    response: Response,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(current_active_verified_user)],
-    skip: Annotated[int, Query(ge=0, description="Number of records to skip for pagination")] = 0,
+    cursor: Annotated[Optional[str], Query(description="Value of X-Next-Cursor from the previous page")] = None,
+    skip: Annotated[int, Query(ge=0, deprecated=True, description="Offset pagination; use cursor instead")] = 0,
     limit: Annotated[int, Query(gt=0, le=100, description="Maximum number of records to return")] = 20 # Default limit 20, max 100
 ):
-    """Retrieves a paginated list of conversion jobs initiated by the current user."""
-    stmt = (
-        select(ConversionModel)
-        .join(ConversionModel.original_file) # Join with File to filter by owner
-        .where(FileModel.owner_id == current_user.id)
-        .order_by(ConversionModel.created_at.desc()) # Show newest first
-        .offset(skip) # Apply pagination offset
-        .limit(limit)  # Apply pagination limit
-        .options(joinedload(ConversionModel.original_file)) # Eager load details needed for response
-    )
-    result = await db.execute(stmt)
-    conversions = result.scalars().all()
-    
-    # Manually construct the response data to match ConversionStatusResponse structure
-    # (Alternatively, define a Pydantic schema specifically for the list response)
+    """
+    Retrieves the current user's conversion jobs, newest first.
+
+    Paginated by keyset: when more rows exist the `X-Next-Cursor` response header holds
+    the cursor for the next page, so deep pages cost the same as the first one. Rows
+    with thumbnails carry a `preview_url` to show instead of downloading the output.
+    """
+    after = _decode_history_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    stmt = _history_query(current_user.id, limit + 1, after=after, skip=skip)
+    rows = (await db.execute(stmt)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_history_cursor(rows[-1].created_at, rows[-1].id)
+
     history = [
         {
-            "conversion_id": conv.id,
-            "task_id": conv.task_id,
-            "status": conv.status.value, # Use enum value
-            "output_format": conv.output_format,
-            "converted_file_path": conv.converted_file_path,
-            "error_message": conv.error_message,
-            "created_at": conv.created_at.isoformat(),
-            "updated_at": conv.updated_at.isoformat(),
-            "original_filename": conv.original_file.original_filename
+            "conversion_id": row.id,
+            "task_id": row.task_id,
+            "status": row.status.value, # Use enum value
+            "output_format": row.output_format,
+            "converted_file_path": row.converted_file_path,
+            "error_message": row.error_message,
+            "created_at": row.created_at.isoformat(),
+            "updated_at": row.updated_at.isoformat(),
+            "original_filename": row.original_filename,
+            "options": row.options,
+            "preview_sizes": row.preview_sizes,
+            "preview_url": _preview_url(request, row.id, row.preview_sizes),
         }
-        for conv in conversions
+        for row in rows
     ]
 
     return history
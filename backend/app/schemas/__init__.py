@@ -1,7 +1,7 @@
 # Make schemas accessible via app.schemas.*
 from .user import UserRead, UserCreate, UserUpdate
+from .conversion import ConversionStatusResponse, ConversionOptions, EncoderPreset
 
 # Example (when other schemas are created):
 # from .token import Token
 # from .file import FileRead, FileCreate
-# from .conversion import ConversionRead, ConversionCreate 
\ No newline at end of file
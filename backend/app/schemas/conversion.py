@@ -0,0 +1,58 @@
+import enum
+import uuid
+import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.conversion import ConversionStatus
+
+
+class ConversionStatusResponse(BaseModel):
+    conversion_id: uuid.UUID
+    task_id: Optional[str] = None
+    status: ConversionStatus
+    output_format: str
+    converted_file_path: Optional[str] = None
+    error_message: Optional[str] = None
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    original_filename: str
+    options: Optional[Dict[str, Any]] = None
+    preview_sizes: Optional[List[int]] = None
+    preview_url: Optional[str] = None # GET /convert/preview path of the smallest thumbnail
+
+
+# 1-based pages and ranges, open-ended ranges allowed: "1-5,8,10-"
+PAGE_SELECTION_PATTERN = r"^\d+(-\d*)?(,\d+(-\d*)?)*$"
+
+
+class EncoderPreset(str, enum.Enum):
+    FAST = "fast"          # Lowest encode CPU, larger files
+    BALANCED = "balanced"  # Default
+    SMALLEST = "smallest"  # Slowest encode, smallest files
+
+
+class ConversionOptions(BaseModel):
+    """Per-conversion settings. Encoder fields apply to image outputs and fall back to the preset."""
+    model_config = ConfigDict(extra="forbid")
+
+    preset: EncoderPreset = EncoderPreset.BALANCED
+    quality: Optional[int] = Field(default=None, ge=1, le=100, description="JPG/WEBP quality")
+    progressive: Optional[bool] = Field(default=None, description="Write a progressive JPG")
+    subsampling: Optional[Literal["4:4:4", "4:2:2", "4:2:0"]] = Field(default=None, description="JPG chroma subsampling")
+    png_compress_level: Optional[int] = Field(default=None, ge=0, le=9, description="PNG zlib level (disables the optimize pass)")
+    webp_method: Optional[int] = Field(default=None, ge=0, le=6, description="WEBP encoder effort, 0 (fast) to 6 (small)")
+    lossless: Optional[bool] = Field(default=None, description="Lossless WEBP")
+    max_dimension: Optional[int] = Field(default=None, ge=1, description="Downscale so neither side exceeds this many pixels")
+    pages: Optional[str] = Field(default=None, pattern=PAGE_SELECTION_PATTERN, description="PDF pages to extract, e.g. \"1-5,8,10-\"")
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Compact JSON form stored on the conversion and used in result cache keys."""
+        return self.model_dump(mode="json", exclude_none=True)
+
+
+class ChunkedUploadCreate(BaseModel):
+    """Body of POST /convert/uploads; the bytes follow in PATCH requests."""
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(ge=1, description="Total length of the file in bytes")
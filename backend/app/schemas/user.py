@@ -4,7 +4,7 @@ from fastapi_users import schemas
 
 class UserRead(schemas.BaseUser[uuid.UUID]):
     # Add custom fields exposed in read schema
-    pass
+    tier: str = "free"
 
 
 class UserCreate(schemas.BaseUserCreate):
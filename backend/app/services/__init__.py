@@ -0,0 +1 @@
+# Shared services used by both the API routers and the Celery worker.
@@ -0,0 +1,81 @@
+import io
+import logging
+import time
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+from app.services.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Formats that are already compressed; deflating them again only burns CPU
+_STORED_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif", "heic", "pdf", "docx", "xlsx", "pptx", "zip", "mp3", "mp4", "m4a", "ogg"}
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that the zip writer fills and the response drains."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(name: str, used: set) -> str:
+    candidate = name
+    counter = 1
+    stem, dot, suffix = name.rpartition(".")
+    while candidate in used:
+        candidate = f"{stem}_{counter}.{suffix}" if dot else f"{name}_{counter}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def stream_zip(entries: Iterable[Tuple[str, str]], storage: StorageBackend) -> Iterator[bytes]:
+    """Yields a ZIP archive of `(archive name, storage key)` entries as it is assembled.
+
+    Because the sink is not seekable, zipfile writes each member with a trailing data
+    descriptor instead of seeking back to patch its header, so neither the archive
+    nor any member is ever held whole in memory or staged on disk.
+    """
+    sink = _ZipSink()
+    used_names: set = set()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for name, key in entries:
+            stored = storage.stat(key)
+            if stored is None:
+                logger.warning(f"Skipping missing object {key} while streaming archive")
+                continue
+            extension = name.rsplit(".", 1)[-1].lower()
+            info = zipfile.ZipInfo(_unique_name(name, used_names), date_time=time.localtime(stored.modified)[:6])
+            info.compress_type = zipfile.ZIP_STORED if extension in _STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            info.file_size = stored.size  # Lets zipfile decide on ZIP64 headers up front
+            with archive.open(info, mode="w") as member:
+                for chunk in storage.iter_range(key):
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory written on close
+    data = sink.drain()
+    if data:
+        yield data
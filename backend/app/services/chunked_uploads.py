@@ -0,0 +1,136 @@
+import base64
+import binascii
+import datetime
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import anyio
+from starlette.requests import ClientDisconnect, Request
+
+from app.core.config import settings
+from app.services.ingest import SNIFF_BYTES, IngestError, UploadTooLarge
+from app.services.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# --- Resumable upload model ---
+# A client creates an upload (POST /convert/uploads) with the file's total size and the
+# conversion it wants, then sends the bytes in order as PATCH requests, each carrying the
+# offset it starts at and optionally its SHA-256. Every chunk is streamed straight into
+# the final upload object (appended to the file with local storage, sent as the next
+# multipart part with S3), so finalizing never re-reads or copies what was received.
+# After a dropped connection the client asks for the offset and resends only the rest.
+# The finalize call hands the assembled object to the normal File/Conversion flow.
+# Uploads that are neither finished nor touched for CHUNKED_UPLOAD_EXPIRY_SECONDS are
+# discarded by the maintenance task expire_chunked_uploads.
+
+# tus' status for a chunk whose body does not match its Upload-Checksum
+CHECKSUM_MISMATCH = 460
+# How long a PATCH holds an upload; a crashed API process releases it by expiry
+CHUNK_LEASE_SECONDS = 15 * 60
+
+
+class ChecksumMismatch(IngestError):
+    """The received chunk does not match its Upload-Checksum (maps to 460)."""
+
+
+class ChunkTooLarge(UploadTooLarge):
+    """The chunk runs past the declared length or the chunk size limit (maps to 413)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        IngestError.__init__(self, f"Chunk is larger than {limit} bytes, the most this upload accepts at its offset")
+
+
+def upload_expiry() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY_SECONDS)
+
+
+def lease_expiry() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=CHUNK_LEASE_SECONDS)
+
+
+def parse_upload_checksum(header: str) -> bytes:
+    """The digest of an `Upload-Checksum: sha256 <base64 digest>` header (the tus format)."""
+    algorithm, _, encoded = header.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise IngestError(f"Unsupported checksum algorithm '{algorithm}'. Supported: sha256")
+    try:
+        digest = base64.b64decode(encoded.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        digest = b""
+    if len(digest) != hashlib.sha256().digest_size:
+        raise IngestError("Upload-Checksum must be 'sha256 ' followed by the base64-encoded digest")
+    return digest
+
+
+@dataclass
+class ReceivedChunk:
+    size: int
+    state: Dict[str, Any]  # Assembly state after the chunk was committed
+    head: bytes  # Leading bytes of the chunk, for sniffing the first one
+
+
+async def receive_chunk(
+    request: Request,
+    storage: StorageBackend,
+    key: str,
+    state: Dict[str, Any],
+    offset: int,
+    remaining: int,
+    checksum: Optional[bytes] = None,
+    validate_head: Optional[Callable[[bytes], None]] = None,
+) -> ReceivedChunk:
+    """
+    Streams the request body into storage as the part starting at `offset`. The chunk is
+    committed only once it is complete, within the `remaining` bytes of the upload,
+    large enough for the backend and matching `checksum`; otherwise the part is
+    discarded and the object is left as it was. `validate_head` is called with the
+    first bytes of the chunk as soon as they arrive.
+    """
+    limit = min(remaining, settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise ChunkTooLarge(limit)
+
+    writer = await anyio.to_thread.run_sync(storage.open_part, key, state, offset)
+    hasher = hashlib.sha256()
+    head = bytearray()
+    pending = bytearray()
+    size = 0
+    try:
+        async for data in request.stream():
+            size += len(data)
+            if size > limit:
+                raise ChunkTooLarge(limit)
+            if validate_head is not None and len(head) < SNIFF_BYTES:
+                head += data[: SNIFF_BYTES - len(head)]
+                if len(head) >= SNIFF_BYTES:
+                    validate_head(bytes(head))
+            pending += data
+            if len(pending) >= settings.UPLOAD_WRITE_BUFFER_SIZE:
+                block = bytes(pending)
+                pending.clear()
+                hasher.update(block)
+                await anyio.to_thread.run_sync(writer.write, block)
+        if pending:
+            hasher.update(pending)
+            await anyio.to_thread.run_sync(writer.write, bytes(pending))
+        if validate_head is not None and len(head) < SNIFF_BYTES:
+            validate_head(bytes(head))
+        if size < remaining and size < storage.min_part_size:
+            raise IngestError(f"Chunks other than the last must be at least {storage.min_part_size} bytes")
+        if checksum is not None and hasher.digest() != checksum:
+            raise ChecksumMismatch("Chunk does not match its Upload-Checksum")
+    except ClientDisconnect:
+        writer.discard()
+        raise IngestError("Client disconnected during upload.")
+    except BaseException:
+        # Inline rather than in a thread: it may run while the request is being cancelled
+        writer.discard()
+        raise
+
+    new_state = await anyio.to_thread.run_sync(writer.commit)
+    return ReceivedChunk(size=size, state=new_state, head=bytes(head))
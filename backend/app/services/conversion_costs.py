@@ -0,0 +1,79 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from app.converters import Hop
+from app.core.config import settings
+from app.services.events import get_redis
+
+logger = logging.getLogger(__name__)
+
+# --- Learned conversion costs ---
+# Workers record how long each converter took per MiB of input for every (input type,
+# output format) edge it ran, as an exponentially weighted average in one Redis hash
+# shared by all workers. The planner ranks chained conversions by these estimates; edges
+# that never ran use a prior for their job class. Concurrent updates may drop a sample,
+# which the average tolerates.
+
+COSTS_KEY = "conversion-costs"
+# Weight of the newest sample in the running average
+_SAMPLE_WEIGHT = 0.2
+# Fixed cost of a hop (process hand-off, encoder setup), so shorter chains win ties
+_HOP_OVERHEAD_SECONDS = 0.05
+_PRIOR_SECONDS_PER_MIB = {"image": 0.2, "document": 1.0, "media": 5.0}
+_MIB = 1024 * 1024
+
+
+def edge_key(hop: Hop) -> str:
+    return f"{hop.spec.name}:{hop.content_type}:{hop.output_format}"
+
+
+@dataclass
+class CostTable:
+    seconds_per_mib: Dict[str, float] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def estimate(self, hop: Hop, input_bytes: int) -> float:
+        """Expected seconds for `hop` on an input of `input_bytes`."""
+        rate = self.seconds_per_mib.get(edge_key(hop))
+        if rate is None:
+            rate = _PRIOR_SECONDS_PER_MIB.get(hop.spec.job_class, 1.0)
+        return _HOP_OVERHEAD_SECONDS + rate * max(input_bytes, 1) / _MIB
+
+
+_cached: Optional[CostTable] = None
+
+
+async def load_costs() -> CostTable:
+    """The learned costs, re-read from Redis at most every CONVERSION_COST_CACHE_SECONDS."""
+    global _cached
+    if _cached is not None and time.monotonic() - _cached.loaded_at < settings.CONVERSION_COST_CACHE_SECONDS:
+        return _cached
+    try:
+        raw = await get_redis().hgetall(COSTS_KEY)
+        rates = {key: float(value) for key, value in raw.items()}
+    except Exception as e:
+        # Planning still works on the priors (or the last copy) without Redis
+        logger.warning(f"Failed to load conversion costs: {e}")
+        rates = _cached.seconds_per_mib if _cached is not None else {}
+    _cached = CostTable(seconds_per_mib=rates, loaded_at=time.monotonic())
+    return _cached
+
+
+async def record_cost(hop: Hop, input_bytes: int, seconds: float) -> None:
+    """Folds one measured run of `hop` into its average cost."""
+    if input_bytes <= 0 or seconds <= 0:
+        return
+    sample = max(seconds - _HOP_OVERHEAD_SECONDS, 0.0) / (input_bytes / _MIB)
+    key = edge_key(hop)
+    try:
+        redis = get_redis()
+        previous = await redis.hget(COSTS_KEY, key)
+        rate = sample if previous is None else (1 - _SAMPLE_WEIGHT) * float(previous) + _SAMPLE_WEIGHT * sample
+        await redis.hset(COSTS_KEY, key, rate)
+    except Exception as e:
+        logger.warning(f"Failed to record conversion cost of {key}: {e}")
+        return
+    if _cached is not None:
+        _cached.seconds_per_mib[key] = rate
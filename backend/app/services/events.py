@@ -0,0 +1,87 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# One channel per user: a single subscription multiplexes all of a user's conversions
+CHANNEL_PREFIX = "conversion-events:"
+
+_client: Optional[aioredis.Redis] = None
+
+
+def channel_for(owner_id: uuid.UUID | str) -> str:
+    return f"{CHANNEL_PREFIX}{owner_id}"
+
+
+def get_redis() -> aioredis.Redis:
+    """Returns this process's asyncio Redis client (API loop or worker orchestration loop)."""
+    global _client
+    if _client is None:
+        _client = aioredis.Redis.from_url(settings.events_redis_url, decode_responses=True)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def build_event(conversion_id: uuid.UUID | str, status: str, **fields: Any) -> Dict[str, Any]:
+    event = {"conversion_id": str(conversion_id), "status": status}
+    event.update({key: value for key, value in fields.items() if value is not None})
+    return event
+
+
+async def publish_conversion_event(
+    owner_id: uuid.UUID | str,
+    conversion_id: uuid.UUID | str,
+    status: str,
+    **fields: Any,
+) -> None:
+    """Publishes a status/progress event to the owner's channel. Never raises: events are best effort."""
+    event = build_event(conversion_id, status, **fields)
+    try:
+        await get_redis().publish(channel_for(owner_id), json.dumps(event, default=str))
+    except Exception as e:
+        logger.warning(f"Failed to publish event for conversion {conversion_id}: {e}")
+
+
+def format_sse(data: Dict[str, Any], event: str = "conversion") -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def subscribe(owner_id: uuid.UUID | str, keepalive_seconds: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """Yields events for `owner_id` as they arrive.
+
+    None is yielded once as soon as the subscription is active (so callers can take a
+    state snapshot without missing events) and then after every `keepalive_seconds`
+    of silence.
+    """
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(channel_for(owner_id))
+    try:
+        yield None
+        while True:
+            message = await pubsub.get_message(timeout=keepalive_seconds)
+            if message is None:
+                yield None
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError):
+                logger.warning(f"Dropping malformed event on {channel_for(owner_id)}: {message!r}")
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing event subscription: {e}")
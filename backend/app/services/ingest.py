@@ -0,0 +1,308 @@
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import anyio
+from starlette.requests import ClientDisconnect, Request
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Number of leading bytes kept for content sniffing
+SNIFF_BYTES = 512
+# Plain form fields (e.g. output_format) are tiny; anything bigger is abuse
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class IngestError(Exception):
+    """Malformed or aborted upload body (maps to 400)."""
+
+
+class UploadTooLarge(IngestError):
+    """Upload exceeded the configured size limit (maps to 413)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"File exceeds maximum size of {limit / 1024 / 1024:.1f} MB")
+
+
+# --- Content Sniffing ---
+# (offset, signature, MIME type); checked in order against the first bytes of the upload
+_MAGIC_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+]
+# RIFF containers: the form type lives at offset 8
+_RIFF_TYPES = {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}
+# ISO-BMFF containers: the major brand follows "ftyp" at offset 4
+_FTYP_BRANDS = {
+    b"heic": "image/heic", b"heix": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif",
+    b"avif": "image/avif", b"qt  ": "video/quicktime",
+    b"isom": "video/mp4", b"iso2": "video/mp4", b"mp41": "video/mp4", b"mp42": "video/mp4", b"M4V ": "video/mp4",
+    b"M4A ": "audio/mp4",
+}
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Identifies the upload type from its leading bytes; returns None when unknown."""
+    for offset, signature, content_type in _MAGIC_SIGNATURES:
+        if head.startswith(signature, offset):
+            return content_type
+    if head.startswith(b"RIFF") and len(head) >= 12:
+        return _RIFF_TYPES.get(head[8:12])
+    if head[4:8] == b"ftyp" and len(head) >= 12:
+        return _FTYP_BRANDS.get(head[8:12])
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "audio/mpeg"  # MPEG audio frame sync without an ID3 tag
+    if head and b"\x00" not in head:
+        try:
+            head.decode("utf-8")
+            return "text/plain"
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off by the sniff window is still text
+            if e.start >= len(head) - 3:
+                return "text/plain"
+    return None
+
+
+@dataclass
+class IngestedFile:
+    id: uuid.UUID
+    field_name: str
+    filename: str
+    path: Path
+    declared_type: Optional[str]
+    sniffed_type: Optional[str] = None
+    size: int = 0
+    content_hash: str = ""
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.sniffed_type
+
+
+@dataclass(eq=False)
+class _Target:
+    file: IngestedFile
+    hasher: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    head: bytearray = field(default_factory=bytearray)
+    pending: bytearray = field(default_factory=bytearray)
+    handle: Optional[object] = None
+    sniffed: bool = False
+
+
+@dataclass
+class IngestResult:
+    files: List[IngestedFile]
+    fields: Dict[str, str]
+
+    def cleanup(self) -> None:
+        for ingested in self.files:
+            ingested.path.unlink(missing_ok=True)
+
+
+class StreamingIngest:
+    """Parses a multipart request body straight off the socket into `dest_dir`.
+
+    Unlike `request.form()`/`UploadFile`, the body is never spooled to a temporary
+    file first: each file part is hashed, size-checked and sniffed as it arrives and
+    written exactly once to its final location, in large blocks off the event loop.
+    `validate` is called with each file as soon as its leading bytes have been
+    sniffed, so unsupported uploads are aborted before the rest is read.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        dest_dir: Path,
+        max_file_size: int,
+        max_files: int = 1,
+        validate: Optional[Callable[[IngestedFile], None]] = None,
+        write_buffer_size: Optional[int] = None,
+    ):
+        self.request = request
+        self.dest_dir = dest_dir
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.validate = validate
+        self.write_buffer_size = write_buffer_size or settings.UPLOAD_WRITE_BUFFER_SIZE
+
+        self._targets: List[_Target] = []
+        self._current: Optional[_Target] = None
+        self._fields: Dict[str, str] = {}
+        self._field_name = ""
+        self._field_data = bytearray()
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._part_content_type = b""
+        self._finished: List[_Target] = []
+
+    # --- Parser callbacks (synchronous, run inside parser.write) ---
+    def _on_part_begin(self) -> None:
+        self._current = None
+        self._field_data = bytearray()
+        self._disposition = b""
+        self._part_content_type = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        name = self._header_name.lower()
+        if name == b"content-disposition":
+            self._disposition = self._header_value
+        elif name == b"content-type":
+            self._part_content_type = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise IngestError('The Content-Disposition header field "name" must be provided.')
+        self._field_name = options[b"name"].decode("utf-8", errors="replace")
+        if b"filename" not in options:
+            return
+        if len(self._targets) >= self.max_files:
+            raise IngestError(f"Too many files. Maximum number of files is {self.max_files}.")
+        file_id = uuid.uuid4()
+        ingested = IngestedFile(
+            id=file_id,
+            field_name=self._field_name,
+            filename=Path(options[b"filename"].decode("utf-8", errors="replace")).name,
+            path=self.dest_dir / str(file_id),
+            declared_type=self._part_content_type.decode("latin-1").strip().lower() or None,
+        )
+        self._current = _Target(file=ingested)
+        self._targets.append(self._current)
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        target = self._current
+        if target is None:
+            self._field_data += data[start:end]
+            if len(self._field_data) > MAX_FIELD_SIZE:
+                raise IngestError(f"Form field '{self._field_name}' is too large.")
+            return
+        chunk = data[start:end]
+        target.file.size += len(chunk)
+        # Enforce the limit incrementally: abort mid-stream instead of after the full write
+        if target.file.size > self.max_file_size:
+            raise UploadTooLarge(self.max_file_size)
+        target.pending += chunk
+        if not target.sniffed:
+            target.head += chunk[: SNIFF_BYTES - len(target.head)]
+            if len(target.head) >= SNIFF_BYTES:
+                self._sniff(target)
+
+    def _on_part_end(self) -> None:
+        target = self._current
+        if target is None:
+            self._fields[self._field_name] = self._field_data.decode("utf-8", errors="replace")
+            return
+        if not target.sniffed:
+            self._sniff(target)
+        self._finished.append(target)
+        self._current = None
+
+    def _sniff(self, target: _Target) -> None:
+        target.sniffed = True
+        target.file.sniffed_type = sniff_content_type(bytes(target.head))
+        if self.validate is not None:
+            self.validate(target.file)
+
+    # --- Blocking file I/O (runs in a worker thread) ---
+    @staticmethod
+    def _write_pending(target: _Target, close: bool) -> None:
+        if target.handle is None:
+            # Unbuffered: we already hand the OS large blocks
+            target.handle = open(target.file.path, "wb", buffering=0)
+        if target.pending:
+            data = bytes(target.pending)
+            target.pending.clear()
+            target.hasher.update(data)
+            target.handle.write(data)
+        if close:
+            target.handle.close()
+            target.file.content_hash = target.hasher.hexdigest()
+
+    async def _flush(self) -> None:
+        for target in self._targets:
+            if target in self._finished:
+                continue
+            if len(target.pending) >= self.write_buffer_size:
+                await anyio.to_thread.run_sync(self._write_pending, target, False)
+        while self._finished:
+            await anyio.to_thread.run_sync(self._write_pending, self._finished.pop(0), True)
+
+    def _abort(self) -> None:
+        for target in self._targets:
+            if target.handle is not None:
+                target.handle.close()
+            target.file.path.unlink(missing_ok=True)
+
+    async def run(self) -> IngestResult:
+        content_type = self.request.headers.get("content-type", "")
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not content_type.startswith("multipart/form-data") or not boundary:
+            raise IngestError("Expected a multipart/form-data request body.")
+
+        # Cheap rejection before reading anything: the whole body is already too big
+        content_length = self.request.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            # Allow for multipart framing overhead (boundaries, part headers)
+            if int(content_length) > self.max_file_size * self.max_files + MAX_FIELD_SIZE:
+                raise UploadTooLarge(self.max_file_size)
+
+        callbacks = {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        }
+        parser = multipart.MultipartParser(boundary, callbacks)
+        try:
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+                await self._flush()
+            parser.finalize()
+            await self._flush()
+        except ClientDisconnect:
+            self._abort()
+            raise IngestError("Client disconnected during upload.")
+        except BaseException:
+            self._abort()
+            raise
+
+        if self._current is not None or any(t.handle is None or not t.handle.closed for t in self._targets):
+            self._abort()
+            raise IngestError("Incomplete multipart body.")
+        return IngestResult(files=[t.file for t in self._targets], fields=self._fields)
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.converters import plan_label, registry
+from app.db.session import pool_stats
+
+logger = logging.getLogger(__name__)
+
+# --- Metrics model ---
+# Every process keeps its own registry: the API serves it on GET /metrics, each Celery
+# worker on its own port (see start_exporter). Stage histograms are labelled with the
+# converter and output format, so latency and size distributions can be compared per
+# conversion pair. Values read from elsewhere (DB pool, broker queues) are collected
+# at scrape time instead of being tracked on every request.
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+UNKNOWN = "unknown"
+
+# From a cache hit on a small image up to a long document or media job
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# 16 MiB .. 4 GiB
+MEMORY_BUCKETS = tuple(float(2 ** n * 1024 * 1024) for n in range(4, 13))
+
+UPLOAD_STAGE_SECONDS = Histogram(
+    "file_converter_upload_stage_seconds",
+    "Time spent in each stage of an upload request",
+    ["stage", "converter", "output_format"],
+    buckets=STAGE_BUCKETS,
+)
+UPLOAD_BYTES = Counter(
+    "file_converter_upload_bytes",
+    "Bytes received by accepted uploads",
+    ["converter", "output_format"],
+)
+CONVERSION_STAGE_SECONDS = Histogram(
+    "file_converter_conversion_stage_seconds",
+    "Time spent in each stage of a conversion job, from queue wait to the final status update",
+    ["stage", "converter", "output_format"],
+    buckets=STAGE_BUCKETS,
+)
+CONVERSIONS = Counter(
+    "file_converter_conversions",
+    "Conversion jobs finished by this worker",
+    ["converter", "output_format", "outcome"],
+)
+CONVERSIONS_IN_PROGRESS = Gauge(
+    "file_converter_conversions_in_progress",
+    "Conversion jobs currently running in this worker",
+    ["converter"],
+)
+CONVERSION_INPUT_BYTES = Counter(
+    "file_converter_conversion_input_bytes",
+    "Input bytes of conversion jobs",
+    ["converter", "output_format"],
+)
+CONVERSION_OUTPUT_BYTES = Counter(
+    "file_converter_conversion_output_bytes",
+    "Output bytes written by successful conversion jobs",
+    ["converter", "output_format"],
+)
+CONVERSION_PEAK_RSS_BYTES = Histogram(
+    "file_converter_conversion_peak_rss_bytes",
+    "Peak resident memory of the pool process during one job",
+    ["converter"],
+    buckets=MEMORY_BUCKETS,
+)
+
+
+def converter_label(content_type: Optional[str], output_format: Optional[str]) -> str:
+    plan = registry.plan(content_type, output_format) if output_format else None
+    return plan_label(plan) if plan else UNKNOWN
+
+
+class StageTimer:
+    """Accumulates the stage durations of one upload or job and records them once its labels are known."""
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self._durations[name] = self._durations.get(name, 0.0) + max(seconds, 0.0)
+
+    def observe(self, **labels: str) -> None:
+        for name, seconds in self._durations.items():
+            self._histogram.labels(stage=name, **labels).observe(seconds)
+        self._durations.clear()
+
+
+class DatabasePoolCollector:
+    """Occupancy and checkout waits of this process's connection pool (see app.db.pool)."""
+
+    def describe(self):
+        # Without describe() the registry would call collect() on registration
+        return []
+
+    def collect(self):
+        stats = pool_stats()
+        if not stats:
+            return
+        yield GaugeMetricFamily("file_converter_db_pool_size", "Connections kept open by the pool", value=stats["size"])
+        yield GaugeMetricFamily("file_converter_db_pool_checked_out", "Connections currently in use", value=stats["checked_out"])
+        yield GaugeMetricFamily("file_converter_db_pool_overflow", "Connections opened beyond the pool size", value=max(stats["overflow"], 0))
+        yield CounterMetricFamily("file_converter_db_pool_checkouts", "Connection checkouts", value=stats["checkouts"])
+        yield CounterMetricFamily("file_converter_db_pool_checkout_failures", "Checkouts that timed out or failed to connect", value=stats["failures"])
+        yield CounterMetricFamily(
+            "file_converter_db_pool_checkout_wait_seconds", "Total time spent waiting for a connection",
+            value=stats["wait_seconds_total"],
+        )
+
+
+class QueueDepthCollector:
+    """Messages waiting in each Celery queue, summed over priority levels. Read from the broker on every scrape."""
+
+    def describe(self):
+        # Without describe() the registry would call collect() on registration
+        return []
+
+    def collect(self):
+        try:
+            depths = queue_depths()
+        except Exception as e:
+            logger.warning(f"Failed to read queue depths from the broker: {e}")
+            return
+        family = GaugeMetricFamily("file_converter_queue_depth", "Messages waiting in a Celery queue", labels=["queue"])
+        for queue, depth in depths.items():
+            family.add_metric([queue], depth)
+        yield family
+
+
+def queue_depths() -> Dict[str, int]:
+    # Imported here: the worker's task modules import this module through celery_app
+    from app.core.celery_app import celery_app
+
+    with celery_app.connection_for_read() as conn:
+        conn.ensure_connection(max_retries=1, interval_start=0, interval_step=0)
+        channel = conn.default_channel
+        # A (non-passive) declare reports the count without failing for queues that were never used
+        return {queue.name: channel.queue_declare(queue=queue.name).message_count for queue in celery_app.conf.task_queues}
+
+
+REGISTRY.register(DatabasePoolCollector())
+
+_api_collectors_registered = False
+_api_collectors_lock = threading.Lock()
+
+
+def register_api_collectors() -> None:
+    """Adds the collectors only the API exports (one copy of the queue depths, not one per worker)."""
+    global _api_collectors_registered
+    with _api_collectors_lock:
+        if not _api_collectors_registered:
+            REGISTRY.register(QueueDepthCollector())
+            _api_collectors_registered = True
+
+
+def render() -> bytes:
+    """Serializes the registry in the Prometheus text format. Blocking (collectors may query the broker)."""
+    return generate_latest(REGISTRY)
+
+
+def start_exporter(port: int, addr: str) -> None:
+    """Serves this process's metrics over HTTP from a daemon thread (used by Celery workers)."""
+    try:
+        start_http_server(port, addr=addr)
+    except OSError as e:
+        # e.g. several workers on one host: only the first gets the port
+        logger.warning(f"Failed to start metrics exporter on {addr}:{port}: {e}")
+        return
+    logger.info(f"Serving worker metrics on {addr}:{port}")
@@ -0,0 +1,183 @@
+import io
+import logging
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.services.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# --- Preview model ---
+# After a conversion completes, a low-priority task (app.worker.previews) renders WEBP
+# thumbnails of its output in every PREVIEW_SIZES size and records the sizes on the
+# row. They are derived assets: stored under storage.preview_key(), never referenced
+# by key in the database, deleted by the reaper together with their conversion and
+# by the orphan sweep once the conversion is gone. API processes keep recently served
+# thumbnails in memory (PreviewCache), so a history page costs one small response per
+# row and no storage reads once warm.
+
+PREVIEW_MEDIA_TYPE = "image/webp"
+
+# Output formats Pillow can open; "txt" outputs are drawn as a page of text instead
+_IMAGE_FORMATS = {"png", "jpg", "jpeg", "webp", "gif", "bmp", "tiff"}
+# The first page of a text output (pages end with a form feed, see app.converters.pdf)
+_PAGE_SEPARATOR = "\f"
+_TEXT_PAGE_SIZE = (612, 792)  # US Letter, one pixel per point
+_TEXT_PAGE_MARGIN = 48
+_TEXT_LINE_HEIGHT = 12
+_TEXT_MAX_CHARS = 16 * 1024
+
+
+def preview_etag(conversion_id: uuid.UUID, size: int) -> str:
+    """A thumbnail never changes once rendered, so its identity is enough (weak: re-encodes may differ)."""
+    return f'W/"{conversion_id}-{size}"'
+
+
+def preview_conversion_id(key: str) -> Optional[uuid.UUID]:
+    """The conversion a stored preview belongs to, or None if `key` is not a preview key."""
+    stem, _, size = Path(key).name.removesuffix(".webp").rpartition("_")
+    if not stem or not size.isdigit() or not key.endswith(".webp"):
+        return None
+    try:
+        return uuid.UUID(stem)
+    except ValueError:
+        return None
+
+
+def _text_page(source: Path):
+    """Draws the first page of a text output onto a blank page."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    with open(source, encoding="utf-8", errors="replace") as f:
+        text = f.read(_TEXT_MAX_CHARS)
+    page = Image.new("RGB", _TEXT_PAGE_SIZE, "white")
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default()
+    height = _TEXT_PAGE_SIZE[1]
+    y = _TEXT_PAGE_MARGIN
+    for line in text.split(_PAGE_SEPARATOR, 1)[0].splitlines():
+        if y + _TEXT_LINE_HEIGHT > height - _TEXT_PAGE_MARGIN:
+            break
+        draw.text((_TEXT_PAGE_MARGIN, y), line, fill=(40, 40, 40), font=font)
+        y += _TEXT_LINE_HEIGHT
+    return page
+
+
+def _image_frame(source: Path, size: int):
+    """The first frame of an image output, scaled to fit `size`."""
+    from PIL import Image
+
+    with Image.open(source) as img:
+        # JPEG decodes at 1/2, 1/4 or 1/8 scale directly; other formats ignore this
+        img.draft("RGB", (size, size))
+        if img.mode not in ("RGB", "RGBA"):
+            has_alpha = img.mode in ("LA", "La", "PA", "RGBA", "RGBa") or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+        img.thumbnail((size, size), reducing_gap=3.0)
+        return img
+
+
+def render_previews(source: Path, output_format: str, sizes: Sequence[int], quality: int) -> Dict[int, bytes]:
+    """
+    WEBP thumbnails of a conversion output, one per size (longest side in pixels, never
+    upscaled). Returns {} for outputs that cannot be previewed. Blocking and CPU-bound.
+    """
+    if not sizes:
+        return {}
+    if output_format in _IMAGE_FORMATS:
+        base = _image_frame(source, max(sizes))
+    elif output_format == "txt":
+        base = _text_page(source)
+    else:
+        return {}
+
+    previews = {}
+    # Largest first, each downscaled from the previous one: the source is resampled only once
+    for size in sorted(sizes, reverse=True):
+        base.thumbnail((size, size), reducing_gap=3.0)
+        buffer = io.BytesIO()
+        base.save(buffer, "WEBP", quality=quality, method=4)
+        previews[size] = buffer.getvalue()
+    return previews
+
+
+def store_previews(
+    storage: StorageBackend, conversion_id: uuid.UUID, source: Path, output_format: str, sizes: Sequence[int]
+) -> List[int]:
+    """Renders the thumbnails of `source` and moves them into storage; returns the sizes stored. Blocking."""
+    previews = render_previews(source, output_format, sizes, settings.PREVIEW_QUALITY)
+    scratch = Path(settings.TEMP_DIR)
+    scratch.mkdir(parents=True, exist_ok=True)
+    for size, data in previews.items():
+        path = scratch / f"preview-{conversion_id}_{size}.webp"
+        path.write_bytes(data)
+        try:
+            storage.put(path, storage.preview_key(conversion_id, size), PREVIEW_MEDIA_TYPE)
+        finally:
+            path.unlink(missing_ok=True)
+    return sorted(previews)
+
+
+def read_preview(storage: StorageBackend, key: str) -> bytes:
+    """Reads a stored thumbnail into memory (they are a few kilobytes). Blocking."""
+    return b"".join(storage.iter_range(key))
+
+
+@dataclass(frozen=True)
+class CachedPreview:
+    owner_id: uuid.UUID
+    data: bytes
+
+
+@dataclass
+class PreviewCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class PreviewCache:
+    """Per-process LRU of served thumbnails, bounded by total bytes and by age.
+
+    Entries carry the owner, so a hit is authorized without a database query. A
+    conversion deleted by the reaper can still be served to its owner from here for
+    at most `ttl_seconds`.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self._entries: TTLCache = TTLCache(
+            maxsize=max_bytes, ttl=ttl_seconds, getsizeof=lambda entry: len(entry.data)
+        )
+        self._stats = PreviewCacheStats()
+
+    def get(self, conversion_id: uuid.UUID, size: int) -> Optional[CachedPreview]:
+        entry = self._entries.get((conversion_id, size))
+        if entry is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+        return entry
+
+    def put(self, conversion_id: uuid.UUID, size: int, preview: CachedPreview) -> None:
+        if len(preview.data) > self._entries.maxsize:
+            return
+        self._entries[(conversion_id, size)] = preview
+
+    def stats(self) -> dict:
+        data = asdict(self._stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = data["hits"] / lookups if lookups else 0.0
+        data["size"] = len(self._entries)
+        data["bytes"] = self._entries.currsize
+        return data
+
+
+# Used only from the API's event loop thread, so no locking is needed
+preview_cache = PreviewCache(
+    max_bytes=settings.PREVIEW_CACHE_MAX_BYTES,
+    ttl_seconds=settings.PREVIEW_CACHE_TTL_SECONDS,
+)
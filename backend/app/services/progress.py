@@ -0,0 +1,114 @@
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import redis
+
+from app.core.config import settings
+from app.services.events import channel_for, build_event, get_redis
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY_PREFIX = "conversion-progress:"
+
+# Synchronous client for converter processes, created lazily once per process
+_sync_client: Optional[redis.Redis] = None
+
+
+def progress_key(conversion_id: uuid.UUID | str) -> str:
+    return f"{PROGRESS_KEY_PREFIX}{conversion_id}"
+
+
+def _get_sync_redis() -> redis.Redis:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(settings.events_redis_url, decode_responses=True)
+    return _sync_client
+
+
+@dataclass
+class ProgressReporter:
+    """Throttled progress sink handed to converters (it is pickled into the pool process).
+
+    Converters may call `report()` as often as they like; updates are coalesced so
+    that at most one write per `min_interval` seconds reaches Redis (a hash read by
+    the status endpoint, plus an event on the owner's channel). Nothing is written
+    to the database.
+    """
+    conversion_id: str
+    owner_id: str
+    output_format: Optional[str] = None
+    batch_id: Optional[str] = None
+    min_interval: float = field(default_factory=lambda: settings.PROGRESS_MIN_INTERVAL_SECONDS)
+    started_at: float = field(default_factory=time.time)
+    _last_sent: float = field(default=0.0, repr=False)
+    _pending: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    def report(self, done: float, total: Optional[float] = None, unit: str = "steps") -> None:
+        """Records `done` units of work out of `total` (or a 0..1 fraction when total is None)."""
+        fraction = done / total if total else done
+        fraction = max(0.0, min(1.0, fraction))
+        now = time.time()
+        elapsed = now - self.started_at
+        eta = elapsed / fraction - elapsed if fraction > 0 else None
+        self._pending = {
+            "progress": round(fraction, 4),
+            "done": done,
+            "total": total,
+            "unit": unit,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "started_at": self.started_at,
+            "updated_at": now,
+        }
+        if fraction >= 1.0 or now - self._last_sent >= self.min_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the latest coalesced update, if any. Failures are logged, never raised."""
+        if self._pending is None:
+            return
+        update, self._pending = self._pending, None
+        self._last_sent = update["updated_at"]
+        mapping = {key: json.dumps(value) for key, value in update.items()}
+        event = build_event(
+            self.conversion_id, "processing",
+            output_format=self.output_format, batch_id=self.batch_id,
+            progress=update["progress"], eta_seconds=update["eta_seconds"],
+        )
+        try:
+            client = _get_sync_redis()
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(progress_key(self.conversion_id), mapping=mapping)
+            pipe.expire(progress_key(self.conversion_id), settings.PROGRESS_TTL_SECONDS)
+            pipe.publish(channel_for(self.owner_id), json.dumps(event, default=str))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to record progress for conversion {self.conversion_id}: {e}")
+
+    def __getstate__(self):
+        # Throttle state is per process; a fresh copy starts unthrottled
+        state = dict(self.__dict__)
+        state["_pending"] = None
+        return state
+
+
+async def read_progress(conversion_id: uuid.UUID | str) -> Optional[Dict[str, Any]]:
+    """Returns the latest progress snapshot for a conversion, or None if none was reported."""
+    try:
+        raw = await get_redis().hgetall(progress_key(conversion_id))
+    except Exception as e:
+        logger.warning(f"Failed to read progress for conversion {conversion_id}: {e}")
+        return None
+    if not raw:
+        return None
+    return {key: json.loads(value) for key, value in raw.items()}
+
+
+async def clear_progress(conversion_id: uuid.UUID | str) -> None:
+    try:
+        await get_redis().delete(progress_key(conversion_id))
+    except Exception as e:
+        logger.debug(f"Failed to clear progress for conversion {conversion_id}: {e}")
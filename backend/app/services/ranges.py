@@ -0,0 +1,141 @@
+import datetime
+import secrets
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+ByteRange = Tuple[int, int]  # Inclusive start and end offsets
+
+# More ranges than this in one request are answered with the full body instead
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    """None of the requested ranges overlap the representation; answered with 416."""
+
+
+def http_date(value: datetime.datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(value.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for this header)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified_since(header: Optional[str], last_modified: datetime.datetime) -> bool:
+    """If-Modified-Since: True if the representation has not changed since the client's date."""
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=datetime.timezone.utc)
+    # HTTP dates have one-second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def if_range_allows(header: Optional[str], etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """If-Range: honor the Range header only if the client's validator is still current."""
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        # Strong comparison: weak tags never match
+        return etag is not None and not header.startswith("W/") and header == etag
+    return last_modified is not None and header == last_modified
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[List[ByteRange]]:
+    """
+    Parses "bytes=0-99,200-,-50" into inclusive ranges clipped to `size`.
+
+    Returns None when the header should be ignored (absent, malformed, another unit or
+    too many ranges) and raises RangeNotSatisfiable when no range overlaps the body.
+    Overlapping or adjacent ranges are merged.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges: List[ByteRange] = []
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+    for part in parts:
+        first, dash, last = part.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if not first:
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(first)
+                if last and int(last) < start:
+                    return None
+                end = min(int(last), size - 1) if last else size - 1
+        except ValueError:
+            return None
+        if start < size and start <= end:
+            ranges.append((start, end))
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def multipart_byteranges(
+    ranges: List[ByteRange],
+    size: int,
+    content_type: str,
+    read: Callable[[int, int], Iterator[bytes]],
+) -> Tuple[str, int, Iterator[bytes]]:
+    """
+    Builds a multipart/byteranges body for several ranges.
+
+    Returns (boundary, content length, body iterator); `read(start, end)` yields the
+    bytes of one range, so the parts are streamed from storage one after another.
+    """
+    boundary = secrets.token_hex(16)
+    headers = [
+        (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    # Every part after the first is preceded by CRLF
+    length = sum(len(h) for h in headers) + sum(end - start + 1 for start, end in ranges)
+    length += 2 * (len(ranges) - 1) + len(closing)
+
+    def body() -> Iterator[bytes]:
+        for index, ((start, end), header) in enumerate(zip(ranges, headers)):
+            yield (b"\r\n" if index else b"") + header
+            yield from read(start, end)
+        yield closing
+
+    return boundary, length, body()
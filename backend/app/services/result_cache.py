@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Mapping, Optional
+
+from app.core.config import settings
+from app.services.events import get_redis
+from app.services.storage import StoredOutput, get_storage
+
+logger = logging.getLogger(__name__)
+
+# --- Shared index ---
+# Entries are objects in the storage backend (StorageBackend.result_cache_key), so the API
+# can reuse outputs that workers on other machines stored. Their index lives in Redis,
+# shared by every process:
+#   ENTRIES_KEY  hash  entry -> JSON {key, sha256, size, created}
+#   LRU_KEY      zset  entry -> last access time (eviction order)
+#   CREATED_KEY  zset  entry -> creation time (TTL)
+#   BYTES_KEY    total size of the indexed entries
+#   STATS_KEY    hash of hit/miss/store/eviction counters
+# An entry is removed by whichever process deletes it from ENTRIES_KEY first. A store racing
+# that removal can leave an index entry without its object; reusing it fails and drops it.
+
+ENTRIES_KEY = "result-cache:entries"
+LRU_KEY = "result-cache:lru"
+CREATED_KEY = "result-cache:created"
+BYTES_KEY = "result-cache:bytes"
+STATS_KEY = "result-cache:stats"
+COUNTERS = ("hits", "misses", "stores", "evictions", "expired", "invalidated", "bytes_evicted")
+
+
+def cache_key(content_hash: str, output_format: str, options: Optional[Mapping[str, Any]] = None) -> str:
+    """Builds the content address for an output: input hash + output format + canonical options."""
+    canonical_options = json.dumps(dict(options or {}), sort_keys=True, separators=(",", ":"))
+    material = f"{content_hash}:{output_format.lower()}:{canonical_options}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _entry_name(key: str, output_format: str) -> str:
+    return f"{key}.{output_format.lower()}"
+
+
+class ResultCache:
+    """Content-addressed cache of conversion outputs with TTL, LRU eviction and a size budget.
+
+    Workers store outputs after a conversion, the API looks them up on upload; both
+    copy objects inside storage (a hard link on local disk, a server-side copy on S3).
+    Redis errors are logged and treated as misses: the conversion then runs normally.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    async def lookup(self, key: str, output_format: str) -> Optional[StoredOutput]:
+        """Returns the cached output for `key`, or None on a miss (expired entries count as misses)."""
+        name = _entry_name(key, output_format)
+        try:
+            redis = get_redis()
+            raw = await redis.hget(ENTRIES_KEY, name)
+            if raw is not None:
+                entry = json.loads(raw)
+                if time.time() - entry["created"] <= self.ttl_seconds:
+                    async with redis.pipeline(transaction=False) as pipe:
+                        pipe.zadd(LRU_KEY, {name: time.time()}, xx=True)
+                        pipe.hincrby(STATS_KEY, "hits", 1)
+                        await pipe.execute()
+                    return StoredOutput(key=entry["key"], sha256=entry["sha256"], size=entry["size"])
+                await self._remove(name, "expired")
+            await redis.hincrby(STATS_KEY, "misses", 1)
+        except Exception as e:
+            logger.warning(f"Result cache lookup of {name} failed: {e}")
+        return None
+
+    async def store(self, key: str, output_format: str, stored: StoredOutput) -> None:
+        """Copies a freshly stored output into the cache, then enforces the TTL and size budget."""
+        name = _entry_name(key, output_format)
+        storage = get_storage()
+        entry_key = storage.result_cache_key(key, output_format.lower())
+        try:
+            redis = get_redis()
+            if await redis.hexists(ENTRIES_KEY, name):
+                return  # Stored by a concurrent conversion of the same input
+            await asyncio.to_thread(storage.copy, stored.key, entry_key)
+            now = time.time()
+            entry = json.dumps({"key": entry_key, "sha256": stored.sha256, "size": stored.size, "created": now})
+            if not await redis.hsetnx(ENTRIES_KEY, name, entry):
+                return  # Same key, so the other store wrote identical bytes to the same object
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.incrby(BYTES_KEY, stored.size)
+                pipe.zadd(LRU_KEY, {name: now})
+                pipe.zadd(CREATED_KEY, {name: now})
+                pipe.hincrby(STATS_KEY, "stores", 1)
+                await pipe.execute()
+            await self.evict()
+        except Exception as e:
+            logger.warning(f"Failed to store {stored.key} in result cache: {e}")
+
+    async def invalidate(self, key: str, output_format: str) -> None:
+        """Drops an entry whose object could not be reused."""
+        name = _entry_name(key, output_format)
+        try:
+            await self._remove(name, "invalidated")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate result cache entry {name}: {e}")
+
+    async def evict(self) -> None:
+        """Drops expired entries, then least recently used ones until the cache fits its budget."""
+        redis = get_redis()
+        for name in await redis.zrangebyscore(CREATED_KEY, "-inf", time.time() - self.ttl_seconds):
+            await self._remove(name, "expired")
+        while int(await redis.get(BYTES_KEY) or 0) > self.max_bytes:
+            oldest = await redis.zrange(LRU_KEY, 0, 0)
+            if not oldest:
+                break
+            await self._remove(oldest[0], "evictions")
+
+    async def _remove(self, name: str, counter: str) -> None:
+        redis = get_redis()
+        raw = await redis.hget(ENTRIES_KEY, name)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(ENTRIES_KEY, name)
+            pipe.zrem(LRU_KEY, name)
+            pipe.zrem(CREATED_KEY, name)
+            removed, *_ = await pipe.execute()
+        if raw is None or not removed:
+            return  # Removed by another process
+        entry = json.loads(raw)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.decrby(BYTES_KEY, entry["size"])
+            pipe.hincrby(STATS_KEY, counter, 1)
+            pipe.hincrby(STATS_KEY, "bytes_evicted", entry["size"])
+            await pipe.execute()
+        await asyncio.to_thread(get_storage().delete, entry["key"])
+
+    async def stats(self) -> dict:
+        """Counters of all API and worker processes, with the current size of the cache."""
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(STATS_KEY)
+            pipe.hlen(ENTRIES_KEY)
+            pipe.get(BYTES_KEY)
+            counters, entries, size = await pipe.execute()
+        data = {name: int(counters.get(name, 0)) for name in COUNTERS}
+        data["entries"] = entries
+        data["bytes"] = int(size or 0)
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = data["hits"] / lookups if lookups else 0.0
+        return data
+
+
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
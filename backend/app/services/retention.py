@@ -0,0 +1,245 @@
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import List
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import SessionLocal
+from app.models.batch import ConversionBatch
+from app.models.conversion import Conversion, ConversionStatus
+from app.models.file import File
+from app.models.upload import ChunkedUpload
+from app.services.previews import preview_conversion_id
+from app.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# --- Retention model ---
+# Every conversion carries an indexed `expires_at`: UNFINISHED_RETENTION_SECONDS from
+# creation, reset to RETENTION_SECONDS when the job finishes and shortened to
+# RETENTION_AFTER_DOWNLOAD_SECONDS once it is downloaded. The reaper walks that index
+# in bounded batches, so its cost follows the number of expired rows, not the size of
+# the history. File rows and batches are removed together with their last conversion.
+# Stored files that no row references (crashed requests, lost tasks) are found by
+# the orphan sweep, which reconciles the storage listing against the database.
+# Preview thumbnails follow their conversion: reaped with it, swept once it is gone.
+# Resumable uploads that were never finalized expire CHUNKED_UPLOAD_EXPIRY_SECONDS
+# after their last chunk; expire_chunked_uploads discards them and their parts.
+
+
+def expires_in(seconds: int) -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+
+
+async def shorten_expiry(db: AsyncSession, deadline: datetime.datetime, *criteria) -> None:
+    """Moves `expires_at` of the matching conversions forward to `deadline`, never extending it."""
+    await db.execute(
+        update(Conversion)
+        .where(*criteria, (Conversion.expires_at.is_(None)) | (Conversion.expires_at > deadline))
+        # Keep updated_at: it is the download's Last-Modified, and the output did not change
+        .values(expires_at=deadline, updated_at=Conversion.updated_at)
+    )
+
+
+@dataclass
+class ReapReport:
+    conversions: int = 0
+    files: int = 0
+    batches: int = 0
+    uploads: int = 0
+    objects: int = 0
+    bytes_reclaimed: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+async def _reap_batch(batch_size: int, now: datetime.datetime, report: ReapReport) -> int:
+    """Deletes up to `batch_size` expired conversions with their files in one transaction."""
+    storage = get_storage()
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(
+                Conversion.id,
+                Conversion.status,
+                Conversion.converted_file_path,
+                Conversion.output_size,
+                Conversion.original_file_id,
+                Conversion.batch_id,
+                Conversion.preview_sizes,
+                File.storage_path,
+                File.file_size,
+            )
+            .join(Conversion.original_file)
+            .where(Conversion.expires_at <= now)
+            .order_by(Conversion.expires_at)
+            .limit(batch_size)
+            # Concurrent reapers (several beat-triggered runs overlapping) take disjoint batches
+            .with_for_update(of=Conversion, skip_locked=True)
+        )).all()
+        if not rows:
+            return 0
+
+        await db.execute(delete(Conversion).where(Conversion.id.in_([row.id for row in rows])))
+        deleted_files = (await db.execute(
+            delete(File)
+            .where(
+                File.id.in_({row.original_file_id for row in rows}),
+                ~exists().where(Conversion.original_file_id == File.id),
+            )
+            .returning(File.id)
+        )).scalars().all()
+        batch_ids = {row.batch_id for row in rows if row.batch_id}
+        deleted_batches = 0
+        if batch_ids:
+            deleted_batches = (await db.execute(
+                delete(ConversionBatch).where(
+                    ConversionBatch.id.in_(batch_ids),
+                    ~exists().where(Conversion.batch_id == ConversionBatch.id),
+                )
+            )).rowcount
+
+        # Workers remove inputs when a job finishes, so only unfinished jobs still hold theirs
+        deleted_file_ids = set(deleted_files)
+        unfinished = (ConversionStatus.PENDING, ConversionStatus.PROCESSING)
+        keys: List[str] = []
+        reclaimed = 0
+        for row in rows:
+            if row.converted_file_path:
+                keys.append(row.converted_file_path)
+                reclaimed += row.output_size or 0
+            keys.extend(storage.preview_key(row.id, size) for size in row.preview_sizes or ())
+            if row.original_file_id in deleted_file_ids:
+                deleted_file_ids.discard(row.original_file_id)
+                keys.append(row.storage_path)
+                if row.status in unfinished:
+                    reclaimed += row.file_size or 0
+
+        # Blobs go before the commit: if deleting them fails the rows stay and the next run retries
+        await asyncio.to_thread(storage.delete_many, keys)
+        await db.commit()
+
+    report.conversions += len(rows)
+    report.files += len(deleted_files)
+    report.batches += deleted_batches
+    report.objects += len(keys)
+    report.bytes_reclaimed += reclaimed
+    return len(rows)
+
+
+async def reap_expired(batch_size: int, max_batches: int) -> ReapReport:
+    """Deletes expired conversions, their files and emptied batches, `batch_size` rows at a time."""
+    started = time.monotonic()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    report = ReapReport()
+    for _ in range(max_batches):
+        if await _reap_batch(batch_size, now, report) < batch_size:
+            break
+    else:
+        logger.warning(f"Reaper stopped after {max_batches} batches; remaining expired conversions wait for the next run")
+    logger.info(
+        f"Reaped {report.conversions} conversions, {report.files} files, {report.batches} batches; "
+        f"deleted {report.objects} stored objects, reclaimed {report.bytes_reclaimed / (1024 * 1024):.1f} MiB "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return report
+
+
+async def _expire_uploads_batch(batch_size: int, now: datetime.datetime, report: ReapReport) -> int:
+    """Discards up to `batch_size` expired resumable uploads in one transaction."""
+    storage = get_storage()
+    async with SessionLocal() as db:
+        uploads = (await db.execute(
+            select(ChunkedUpload.id, ChunkedUpload.offset, ChunkedUpload.storage_path, ChunkedUpload.storage_state)
+            .where(
+                ChunkedUpload.expires_at <= now,
+                # A chunk still being received extends the expiry when it is done
+                (ChunkedUpload.lease_expires_at.is_(None)) | (ChunkedUpload.lease_expires_at <= now),
+            )
+            .order_by(ChunkedUpload.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not uploads:
+            return 0
+        # Parts go before the commit: if discarding them fails the rows stay and the next run retries
+        for upload in uploads:
+            await asyncio.to_thread(storage.abort_parts, upload.storage_path, upload.storage_state or {})
+        await db.execute(delete(ChunkedUpload).where(ChunkedUpload.id.in_([upload.id for upload in uploads])))
+        await db.commit()
+
+    report.uploads += len(uploads)
+    report.objects += len(uploads)
+    report.bytes_reclaimed += sum(upload.offset for upload in uploads)
+    return len(uploads)
+
+
+async def expire_uploads(batch_size: int, max_batches: int) -> ReapReport:
+    """Discards resumable uploads that expired before being finalized, `batch_size` at a time."""
+    started = time.monotonic()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    report = ReapReport()
+    for _ in range(max_batches):
+        if await _expire_uploads_batch(batch_size, now, report) < batch_size:
+            break
+    else:
+        logger.warning(f"Stopped after {max_batches} batches; remaining expired uploads wait for the next run")
+    logger.info(
+        f"Expired {report.uploads} unfinished uploads, reclaimed {report.bytes_reclaimed / (1024 * 1024):.1f} MiB "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return report
+
+
+async def _referenced_keys(keys: List[str]) -> set:
+    # Previews are not recorded by key: they are referenced while their conversion exists
+    previews = {key: preview_conversion_id(key) for key in keys}
+    previews = {key: conversion_id for key, conversion_id in previews.items() if conversion_id}
+    async with SessionLocal() as db:
+        inputs = (await db.execute(select(File.storage_path).where(File.storage_path.in_(keys)))).scalars().all()
+        outputs = (await db.execute(
+            select(Conversion.converted_file_path).where(Conversion.converted_file_path.in_(keys))
+        )).scalars().all()
+        # Resumable uploads still receiving chunks (local storage appends to the upload key)
+        partial = (await db.execute(
+            select(ChunkedUpload.storage_path).where(ChunkedUpload.storage_path.in_(keys))
+        )).scalars().all()
+        live = set()
+        if previews:
+            live = set((await db.execute(
+                select(Conversion.id).where(Conversion.id.in_(set(previews.values())))
+            )).scalars().all())
+    return set(inputs) | set(outputs) | set(partial) | {key for key, conversion_id in previews.items() if conversion_id in live}
+
+
+async def sweep_orphans(grace_seconds: int, batch_size: int) -> ReapReport:
+    """
+    Deletes stored uploads, outputs and previews that no database row references. Only objects older
+    than `grace_seconds` are considered, so uploads still being written and outputs of
+    running jobs (not yet recorded) are left alone.
+    """
+    started = time.monotonic()
+    storage = get_storage()
+    cutoff = time.time() - grace_seconds
+    candidates = await asyncio.to_thread(
+        lambda: [obj for obj in storage.list_objects() if obj.modified < cutoff]
+    )
+    report = ReapReport()
+    for start in range(0, len(candidates), batch_size):
+        chunk = candidates[start:start + batch_size]
+        referenced = await _referenced_keys([obj.key for obj in chunk])
+        orphans = [obj for obj in chunk if obj.key not in referenced]
+        if not orphans:
+            continue
+        await asyncio.to_thread(storage.delete_many, [obj.key for obj in orphans])
+        report.objects += len(orphans)
+        report.bytes_reclaimed += sum(obj.size for obj in orphans)
+    logger.info(
+        f"Orphan sweep checked {len(candidates)} stored objects, deleted {report.objects}, "
+        f"reclaimed {report.bytes_reclaimed / (1024 * 1024):.1f} MiB in {time.monotonic() - started:.2f}s"
+    )
+    return report
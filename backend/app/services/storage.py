@@ -0,0 +1,531 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class StorageError(Exception):
+    """Raised when the storage backend cannot be configured or reached."""
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    size: int
+    modified: float  # Unix timestamp
+    etag: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class StoredOutput:
+    """A conversion output handed to storage, with the validators used for HTTP caching."""
+    key: str
+    sha256: str
+    size: int
+
+
+def digest_file(path: Path) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of a local file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def store_output(storage: "StorageBackend", src: Path, key: str, content_type: Optional[str] = None) -> StoredOutput:
+    """Hashes the local output `src` and moves it into storage under `key`. Blocking."""
+    sha256, size = digest_file(src)
+    storage.put(src, key, content_type)
+    return StoredOutput(key=key, sha256=sha256, size=size)
+
+
+class PartWriter(ABC):
+    """Receives one part of an object being assembled (see StorageBackend.open_part). Blocking."""
+
+    @abstractmethod
+    def write(self, data: bytes) -> None:
+        """Appends `data` to the part."""
+
+    @abstractmethod
+    def commit(self) -> Dict[str, Any]:
+        """Keeps the part; returns the assembly state to store for the next part."""
+
+    @abstractmethod
+    def discard(self) -> None:
+        """Drops the part, leaving the object as it was before open_part."""
+
+
+class StorageBackend(ABC):
+    """Where uploads and converted outputs live, shared by the API and the workers.
+
+    Objects are addressed by string keys, stored as-is in `File.storage_path` and
+    `Conversion.converted_file_path`. All methods are blocking; call them from a
+    thread (anyio.to_thread / asyncio.to_thread) when on an event loop.
+    """
+
+    @abstractmethod
+    def upload_key(self, file_id: uuid.UUID) -> str:
+        """Key for an uploaded input file."""
+
+    @abstractmethod
+    def output_key(self, conversion_id: uuid.UUID, output_format: str) -> str:
+        """Key for a conversion's output file."""
+
+    @abstractmethod
+    def preview_key(self, conversion_id: uuid.UUID, size: int) -> str:
+        """Key for a conversion's thumbnail of `size` pixels (see app.services.previews)."""
+
+    @abstractmethod
+    def result_cache_key(self, entry: str, output_format: str) -> str:
+        """Key for a result cache entry (see app.services.result_cache); not listed by list_objects."""
+
+    @abstractmethod
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path of the object on this machine's disk, or None if it is stored remotely."""
+
+    @abstractmethod
+    def put(self, src: Path, key: str, content_type: Optional[str] = None) -> None:
+        """Moves the local file `src` into storage under `key`."""
+
+    @abstractmethod
+    def fetch(self, key: str, dest: Path) -> Path:
+        """Returns a local path holding the object: the stored file itself, or a copy written to `dest`."""
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[StoredObject]:
+        """Size and modification time of the object, or None if it does not exist."""
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yields bytes `start`..`end` (inclusive; None means to the end) of the object in chunks."""
+
+    @abstractmethod
+    def copy(self, src_key: str, dest_key: str) -> None:
+        """Copies the object `src_key` to `dest_key` within storage (a hard link or server-side copy where possible)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Removes the object; missing objects are ignored."""
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Removes several objects; backends override this with a bulk call where one exists."""
+        for key in keys:
+            self.delete(key)
+
+    @abstractmethod
+    def list_objects(self) -> Iterator[StoredObject]:
+        """Yields every stored upload, output and preview, keyed as in the database (for orphan reconciliation)."""
+
+    def presigned_url(self, key: str, filename: str, content_type: Optional[str] = None) -> Optional[str]:
+        """Time-limited direct download URL, or None if clients must be served through the API."""
+        return None
+
+    # --- Assembly from parts (resumable uploads, see app.services.chunked_uploads) ---
+    # Parts are written in order straight into the object; nothing is re-read or copied
+    # when it is completed. The state is JSON and lives in the database between parts.
+
+    # Smallest part the backend accepts, except for the last one
+    min_part_size: int = 1
+
+    @abstractmethod
+    def begin_parts(self, key: str) -> Dict[str, Any]:
+        """Starts assembling the object `key`; returns the initial assembly state."""
+
+    @abstractmethod
+    def open_part(self, key: str, state: Dict[str, Any], offset: int) -> PartWriter:
+        """Opens the part starting at byte `offset` (the length of all committed parts)."""
+
+    @abstractmethod
+    def complete_parts(self, key: str, state: Dict[str, Any]) -> None:
+        """Makes the assembled object readable under `key`. Safe to repeat."""
+
+    @abstractmethod
+    def abort_parts(self, key: str, state: Dict[str, Any]) -> None:
+        """Discards an unfinished assembly and its parts. Safe to repeat."""
+
+
+class LocalStorage(StorageBackend):
+    """Keys are filesystem paths under TEMP_DIR/CONVERTED_DIR; API and workers must share the disk."""
+
+    def __init__(self, upload_dir: Path, output_dir: Path):
+        self.upload_dir = upload_dir
+        self.output_dir = output_dir
+
+    def upload_key(self, file_id: uuid.UUID) -> str:
+        return str((self.upload_dir / str(file_id)).resolve())
+
+    def output_key(self, conversion_id: uuid.UUID, output_format: str) -> str:
+        return str(self.output_dir / f"{conversion_id}.{output_format}")
+
+    def preview_key(self, conversion_id: uuid.UUID, size: int) -> str:
+        return str(self.output_dir / "previews" / f"{conversion_id}_{size}.webp")
+
+    def result_cache_key(self, entry: str, output_format: str) -> str:
+        return str(self.output_dir / "cache" / entry[:2] / f"{entry}.{output_format}")
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return Path(key)
+
+    def put(self, src: Path, key: str, content_type: Optional[str] = None) -> None:
+        dest = Path(key)
+        if src.resolve() == dest.resolve():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, dest)
+
+    def fetch(self, key: str, dest: Path) -> Path:
+        return Path(key)
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            st = Path(key).stat()
+        except FileNotFoundError:
+            return None
+        return StoredObject(key=key, size=st.st_size, modified=st.st_mtime)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(key, "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def copy(self, src_key: str, dest_key: str) -> None:
+        # Outputs are never modified in place, so a hard link is as good as a copy
+        dest = Path(dest_key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            try:
+                os.link(src_key, tmp_path)
+            except OSError:
+                shutil.copyfile(src_key, tmp_path)  # Across filesystems
+            os.replace(tmp_path, dest)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def delete(self, key: str) -> None:
+        Path(key).unlink(missing_ok=True)
+
+    def list_objects(self) -> Iterator[StoredObject]:
+        # Only top-level files (and previews): CONVERTED_DIR/cache belongs to the result cache
+        preview_dir = self.output_dir / "previews"
+        for directory, to_key in (
+            (self.upload_dir, lambda path: str(path.resolve())),
+            (self.output_dir, lambda path: str(self.output_dir / path.name)),
+            (preview_dir, lambda path: str(preview_dir / path.name)),
+        ):
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(key=to_key(Path(entry.path)), size=st.st_size, modified=st.st_mtime)
+
+    def begin_parts(self, key: str) -> Dict[str, Any]:
+        path = Path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        return {}
+
+    def open_part(self, key: str, state: Dict[str, Any], offset: int) -> PartWriter:
+        return _LocalPartWriter(Path(key), state, offset)
+
+    def complete_parts(self, key: str, state: Dict[str, Any]) -> None:
+        # Parts were appended to the file itself
+        if not Path(key).exists():
+            raise StorageError(f"Assembled upload {key} is missing")
+
+    def abort_parts(self, key: str, state: Dict[str, Any]) -> None:
+        self.delete(key)
+
+
+class _LocalPartWriter(PartWriter):
+    """Appends the part to the file in place; discarding truncates it back."""
+
+    def __init__(self, path: Path, state: Dict[str, Any], offset: int):
+        self.state = state
+        self.offset = offset
+        # Unbuffered: callers hand over large blocks
+        self.handle = open(path, "r+b", buffering=0)
+        # Drop whatever a failed earlier attempt left past the committed length
+        self.handle.truncate(offset)
+        self.handle.seek(offset)
+
+    def write(self, data: bytes) -> None:
+        self.handle.write(data)
+
+    def commit(self) -> Dict[str, Any]:
+        self.handle.close()
+        return self.state
+
+    def discard(self) -> None:
+        try:
+            self.handle.truncate(self.offset)
+        finally:
+            self.handle.close()
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage. Requires boto3, which is only imported when this backend is selected."""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        chunk_size: int = 8 * 1024 * 1024,
+        presigned_downloads: bool = True,
+        presigned_expires: int = 300,
+    ):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise StorageError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        if not bucket:
+            raise StorageError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.presigned_downloads = presigned_downloads
+        self.presigned_expires = presigned_expires
+        # boto3 clients are thread-safe; one is shared by all request and task threads
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(signature_version="s3v4", max_pool_connections=32),
+        )
+        # Files above one chunk are sent as multipart uploads, streamed from disk part by part
+        self.transfer_config = TransferConfig(
+            multipart_threshold=chunk_size, multipart_chunksize=chunk_size, max_concurrency=4
+        )
+
+    def upload_key(self, file_id: uuid.UUID) -> str:
+        return f"{self.prefix}uploads/{file_id}"
+
+    def output_key(self, conversion_id: uuid.UUID, output_format: str) -> str:
+        return f"{self.prefix}outputs/{conversion_id}.{output_format}"
+
+    def preview_key(self, conversion_id: uuid.UUID, size: int) -> str:
+        return f"{self.prefix}previews/{conversion_id}_{size}.webp"
+
+    def result_cache_key(self, entry: str, output_format: str) -> str:
+        return f"{self.prefix}cache/{entry}.{output_format}"
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    def put(self, src: Path, key: str, content_type: Optional[str] = None) -> None:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(str(src), self.bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+        src.unlink(missing_ok=True)
+
+    def fetch(self, key: str, dest: Path) -> Path:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        self.client.download_file(self.bucket, key, str(dest), Config=self.transfer_config)
+        return dest
+
+    def stat(self, key: str) -> Optional[StoredObject]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(
+            key=key,
+            size=head["ContentLength"],
+            modified=head["LastModified"].timestamp(),
+            etag=head.get("ETag", "").strip('"') or None,
+        )
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=byte_range)
+        body = response["Body"]
+        try:
+            yield from body.iter_chunks(self.chunk_size)
+        finally:
+            body.close()
+
+    def copy(self, src_key: str, dest_key: str) -> None:
+        # Server-side copy; objects above one chunk are copied part by part (UploadPartCopy)
+        self.client.copy(
+            {"Bucket": self.bucket, "Key": src_key}, self.bucket, dest_key, Config=self.transfer_config
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True},
+            )
+            errors = response.get("Errors") or []
+            if errors:
+                raise StorageError(f"Failed to delete {len(errors)} objects, first: {errors[0].get('Key')} ({errors[0].get('Code')})")
+
+    def list_objects(self) -> Iterator[StoredObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for prefix in (f"{self.prefix}uploads/", f"{self.prefix}outputs/", f"{self.prefix}previews/"):
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                for item in page.get("Contents", []):
+                    yield StoredObject(
+                        key=item["Key"],
+                        size=item["Size"],
+                        modified=item["LastModified"].timestamp(),
+                        etag=item.get("ETag", "").strip('"') or None,
+                    )
+
+    def presigned_url(self, key: str, filename: str, content_type: Optional[str] = None) -> Optional[str]:
+        if not self.presigned_downloads:
+            return None
+        params = {
+            "Bucket": self.bucket,
+            "Key": key,
+            "ResponseContentDisposition": f'attachment; filename="{filename}"',
+        }
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.presigned_expires)
+
+    # S3 multipart uploads: every part but the last must be at least 5 MiB
+    min_part_size = 5 * 1024 * 1024
+
+    def begin_parts(self, key: str) -> Dict[str, Any]:
+        response = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)
+        return {"upload_id": response["UploadId"], "parts": []}
+
+    def open_part(self, key: str, state: Dict[str, Any], offset: int) -> PartWriter:
+        return _S3PartWriter(self, key, state)
+
+    def complete_parts(self, key: str, state: Dict[str, Any]) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=state["upload_id"], MultipartUpload={"Parts": state["parts"]}
+            )
+        except ClientError as e:
+            # Completed by an earlier attempt whose caller failed afterwards
+            if e.response.get("Error", {}).get("Code") == "NoSuchUpload" and self.stat(key) is not None:
+                return
+            raise
+
+    def abort_parts(self, key: str, state: Dict[str, Any]) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=state["upload_id"])
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                raise
+
+
+class _S3PartWriter(PartWriter):
+    """Spools the part to a local temporary file, then sends it as the next multipart part."""
+
+    def __init__(self, storage: S3Storage, key: str, state: Dict[str, Any]):
+        self.storage = storage
+        self.key = key
+        self.state = state
+        # Re-sending a part number whose earlier upload was never recorded replaces it
+        self.part_number = len(state["parts"]) + 1
+        Path(settings.TEMP_DIR).mkdir(parents=True, exist_ok=True)
+        self.spool = tempfile.TemporaryFile(dir=settings.TEMP_DIR)
+
+    def write(self, data: bytes) -> None:
+        self.spool.write(data)
+
+    def commit(self) -> Dict[str, Any]:
+        try:
+            size = self.spool.tell()
+            self.spool.seek(0)
+            response = self.storage.client.upload_part(
+                Bucket=self.storage.bucket,
+                Key=self.key,
+                UploadId=self.state["upload_id"],
+                PartNumber=self.part_number,
+                Body=self.spool,
+                ContentLength=size,
+            )
+        finally:
+            self.spool.close()
+        parts = self.state["parts"] + [{"PartNumber": self.part_number, "ETag": response["ETag"]}]
+        return {**self.state, "parts": parts}
+
+    def discard(self) -> None:
+        self.spool.close()
+
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """Returns the configured storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = settings.STORAGE_BACKEND.lower()
+                if backend == "local":
+                    _storage = LocalStorage(Path(settings.TEMP_DIR), Path(settings.CONVERTED_DIR))
+                elif backend == "s3":
+                    _storage = S3Storage(
+                        bucket=settings.S3_BUCKET,
+                        prefix=settings.S3_PREFIX,
+                        endpoint_url=settings.S3_ENDPOINT_URL,
+                        region=settings.S3_REGION,
+                        access_key_id=settings.S3_ACCESS_KEY_ID,
+                        secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                        chunk_size=settings.S3_MULTIPART_CHUNK_SIZE,
+                        presigned_downloads=settings.S3_PRESIGNED_DOWNLOADS,
+                        presigned_expires=settings.S3_PRESIGNED_URL_EXPIRES_SECONDS,
+                    )
+                else:
+                    raise StorageError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}'")
+                logger.info(f"Using {type(_storage).__name__} for uploads and outputs")
+    return _storage
@@ -0,0 +1,70 @@
+import logging
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UserCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+
+class UserCache:
+    """Short-lived, bounded per-process cache of user rows for token authentication.
+
+    Stores column snapshots, never ORM instances: every hit builds a fresh detached
+    `User`, so a request can attach it to its own session (e.g. PATCH /users/me)
+    without sharing state with other requests. Changes made through the user
+    manager invalidate the entry (see UserManager hooks); other API processes
+    see them after at most `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._entries: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._stats = UserCacheStats()
+        self._columns = [attr.key for attr in inspect(User).column_attrs]
+
+    def get(self, user_id: uuid.UUID) -> Optional[User]:
+        snapshot: Optional[Dict[str, Any]] = self._entries.get(user_id)
+        if snapshot is None:
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        user = User(**snapshot)
+        make_transient_to_detached(user)  # Persistent identity, no session: UPDATEs, never INSERTs
+        return user
+
+    def put(self, user: User) -> None:
+        self._entries[user.id] = {key: getattr(user, key) for key in self._columns}
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        data = asdict(self._stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = data["hits"] / lookups if lookups else 0.0
+        data["size"] = len(self._entries)
+        return data
+
+
+# Used only from the API's event loop thread, so no locking is needed
+user_cache = UserCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
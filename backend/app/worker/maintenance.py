@@ -0,0 +1,32 @@
+import logging
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.services.retention import expire_uploads, reap_expired, sweep_orphans
+from app.worker.runtime import run_async
+
+logger = logging.getLogger(__name__)
+
+# Scheduled by Celery beat (see celery_app.beat_schedule) on the maintenance queue.
+# All are safe to run concurrently with conversions and with each other.
+
+
+@celery_app.task
+def reap_expired_conversions() -> dict:
+    """Deletes expired conversions, their stored files and emptied batches."""
+    report = run_async(reap_expired(settings.REAPER_BATCH_SIZE, settings.REAPER_MAX_BATCHES))
+    return report.as_dict()
+
+
+@celery_app.task
+def sweep_orphaned_files() -> dict:
+    """Deletes stored uploads, outputs and previews that no conversion or file row references."""
+    report = run_async(sweep_orphans(settings.ORPHAN_GRACE_SECONDS, settings.REAPER_BATCH_SIZE))
+    return report.as_dict()
+
+
+@celery_app.task
+def expire_chunked_uploads() -> dict:
+    """Discards resumable uploads that were never finalized and their received bytes."""
+    report = run_async(expire_uploads(settings.REAPER_BATCH_SIZE, settings.REAPER_MAX_BATCHES))
+    return report.as_dict()
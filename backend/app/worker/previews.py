@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.conversion import Conversion, ConversionStatus
+from app.services.events import publish_conversion_event
+from app.services.previews import store_previews
+from app.services.storage import get_storage
+from app.worker.runtime import run_async
+from app.worker.scheduling import LOWEST_PRIORITY
+
+logger = logging.getLogger(__name__)
+
+# Routed to the previews queue (see celery_app.task_routes). A lost or failed preview
+# only means the history shows no thumbnail, so these tasks never retry.
+
+
+def schedule_previews(conversion_id: uuid.UUID) -> None:
+    """Queues thumbnail rendering for a completed conversion. Never raises."""
+    if not settings.PREVIEWS_ENABLED or not settings.parsed_preview_sizes:
+        return
+    try:
+        generate_previews.apply_async(args=[str(conversion_id)], priority=LOWEST_PRIORITY)
+    except Exception as e:
+        logger.warning(f"Failed to queue previews for conversion {conversion_id}: {e}")
+
+
+@celery_app.task
+def generate_previews(conversion_id_str: str) -> dict:
+    """Renders and stores the thumbnails of a completed conversion."""
+    return run_async(_generate_previews(uuid.UUID(conversion_id_str)))
+
+
+async def _generate_previews(conversion_id: uuid.UUID) -> dict:
+    async with SessionLocal() as db:
+        job = (await db.execute(
+            select(Conversion.status, Conversion.output_format, Conversion.converted_file_path, Conversion.owner_id)
+            .where(Conversion.id == conversion_id)
+        )).one_or_none()
+    if job is None or job.status != ConversionStatus.COMPLETED or not job.converted_file_path:
+        logger.info(f"Skipping previews for conversion {conversion_id}: not found or not completed")
+        return {"status": "skipped"}
+
+    storage = get_storage()
+    key = job.converted_file_path
+    sizes = settings.parsed_preview_sizes
+    source = None
+    try:
+        source = await asyncio.to_thread(
+            storage.fetch, key, Path(settings.TEMP_DIR) / f"preview-source-{conversion_id}.{job.output_format}"
+        )
+        stored = await asyncio.to_thread(store_previews, storage, conversion_id, source, job.output_format, sizes)
+    except Exception as e:
+        logger.warning(f"Failed to render previews for conversion {conversion_id}: {e}", exc_info=True)
+        return {"status": "error", "detail": str(e)}
+    finally:
+        # Remote storage: drop the downloaded copy (local storage hands out the stored file itself)
+        if source is not None and storage.local_path(key) is None:
+            source.unlink(missing_ok=True)
+    if not stored:
+        return {"status": "skipped"}
+
+    async with SessionLocal() as db:
+        result = await db.execute(
+            update(Conversion)
+            .where(Conversion.id == conversion_id, Conversion.status == ConversionStatus.COMPLETED)
+            # Keep updated_at: it is the download's Last-Modified, and the output did not change
+            .values(preview_sizes=stored, updated_at=Conversion.updated_at)
+        )
+        await db.commit()
+    if result.rowcount == 0:
+        # Reaped while rendering: nothing will reference these
+        await asyncio.to_thread(storage.delete_many, [storage.preview_key(conversion_id, size) for size in stored])
+        return {"status": "skipped"}
+
+    # A second "completed" event tells open pages the thumbnails are ready
+    await publish_conversion_event(
+        job.owner_id, conversion_id, ConversionStatus.COMPLETED.value,
+        output_format=job.output_format, preview_sizes=stored,
+    )
+    logger.info(f"Stored {len(stored)} previews for conversion {conversion_id}")
+    return {"status": "success", "sizes": stored}
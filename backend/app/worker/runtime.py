@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from celery.signals import worker_ready, worker_shutdown
+
+from app.converters import ConverterSpec, Hop, plan_label, registry
+from app.core.config import settings
+from app.db.session import init_engine, dispose_engine, pool_stats
+from app.services.events import close_redis
+from app.services.metrics import CONVERSION_PEAK_RSS_BYTES, start_exporter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# --- Execution model ---
+# Celery runs tasks on a thread pool (see celery_app). Each task thread hands its
+# async orchestration (DB status updates) to one shared event loop running in a
+# background thread, and the CPU-bound converter work is pushed from that loop to a
+# bounded process pool. Per-converter semaphores on the loop keep one slow class
+# of jobs from occupying every process in the pool. Converters with a parallel
+# entry point (e.g. PDF page ranges) split one job over several pool processes;
+# those with a multi-output entry point (images) encode several formats from one decode.
+# A chained conversion (planned by the registry) runs all its hops in one pool process.
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+def pool_size() -> int:
+    return settings.CONVERSION_POOL_SIZE or os.cpu_count() or 1
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the worker's orchestration loop, starting it (and the DB engine) on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                # One engine per worker process, created once and reused by every task
+                init_engine(pool_size=settings.WORKER_DB_POOL_SIZE, max_overflow=settings.WORKER_DB_MAX_OVERFLOW)
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="conversion-orchestrator", daemon=True)
+                thread.start()
+                _loop = loop
+                logger.info("Started worker orchestration event loop")
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Runs `coro` on the orchestration loop and blocks the calling task thread until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: the worker process is multi-threaded, so forking it is unsafe
+                _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Started conversion process pool with {pool_size()} workers")
+    return _pool
+
+
+def _reset_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _converter_limit(spec: ConverterSpec) -> asyncio.Semaphore:
+    # Only ever called from the orchestration loop thread, so no lock is needed
+    semaphore = _limits.get(spec.name)
+    if semaphore is None:
+        limit = settings.parsed_converter_concurrency_limits.get(spec.name) or spec.max_concurrency or pool_size()
+        semaphore = _limits[spec.name] = asyncio.Semaphore(min(limit, pool_size()))
+    return semaphore
+
+
+def _reset_peak_rss() -> None:
+    # Linux only: resets VmHWM so the next reading covers just the current job
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource  # Not available on Windows
+    except ImportError:
+        return None
+    # Lifetime peak of the pool process, reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _run_converter_in_child(spec_name: str, args: tuple, kwargs: dict, multi: bool = False) -> Tuple[Any, Optional[int]]:
+    """Entry point inside a pool process: the backend is imported there on first use.
+
+    Returns the converter's result together with the process's peak RSS during the job.
+    """
+    spec = registry.by_name(spec_name)
+    converter = registry.load_multi(spec) if multi else registry.load(spec)
+    _reset_peak_rss()
+    result = converter(*args, **kwargs)
+    return result, _peak_rss_bytes()
+
+
+async def _run_in_pool(spec: ConverterSpec, func: Callable[..., T], *args: Any) -> T:
+    """Runs `func(*args)` in the process pool under `spec`'s concurrency limit."""
+    return await _run_in_pool_limited((spec,), func, *args)
+
+
+async def _run_in_pool_limited(specs: Sequence[ConverterSpec], func: Callable[..., T], *args: Any) -> T:
+    """Runs `func(*args)` in the process pool holding the concurrency limit of every spec."""
+    async with contextlib.AsyncExitStack() as limits:
+        # Always taken in name order, so two chains never wait on each other's limits
+        for spec in sorted(set(specs), key=lambda spec: spec.name):
+            await limits.enter_async_context(_converter_limit(spec))
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(get_process_pool(), func, *args)
+        except BrokenProcessPool:
+            # A child died (e.g. killed for memory); replace the pool so later jobs can run
+            logger.error(f"Conversion process pool broke while running '{', '.join(spec.name for spec in specs)}', restarting it")
+            _reset_process_pool()
+            raise
+
+
+async def run_converter(spec: ConverterSpec, *args: Any, **kwargs: Any) -> Any:
+    """Runs the converter for `spec` in the process pool, respecting its concurrency limit."""
+    parallel = registry.load_parallel(spec)
+    if parallel is not None:
+        # Fan-out converters run here on the loop and take one pool slot per chunk,
+        # so they must not hold a slot themselves while waiting for their chunks
+        return await parallel(*args, submit=functools.partial(_run_in_pool, spec), **kwargs)
+
+    result, peak_rss = await _run_in_pool(spec, _run_converter_in_child, spec.name, args, kwargs)
+    _observe_peak_rss(spec, peak_rss)
+    return result
+
+
+async def run_converter_many(
+    spec: ConverterSpec, input_path: Any, outputs: List[Tuple[Any, str, Any]], **kwargs: Any
+) -> List[Optional[str]]:
+    """
+    Converts one input to several (output_path, output_format, progress) targets with the
+    multi-output entry point of `spec`: one pool task that decodes the input once and
+    takes a single slot. Returns the error message of each output, None on success.
+    """
+    if registry.load_multi(spec) is None:
+        raise ValueError(f"Converter '{spec.name}' cannot produce several outputs in one run")
+    result, peak_rss = await _run_in_pool(spec, _run_converter_in_child, spec.name, (input_path, outputs), kwargs, True)
+    _observe_peak_rss(spec, peak_rss)
+    return result
+
+
+def _run_chain_in_child(steps: list, args: tuple, kwargs: dict) -> Tuple[Any, Optional[int]]:
+    from app.converters.chain import run_chain
+
+    _reset_peak_rss()
+    result = run_chain(steps, *args, **kwargs)
+    return result, _peak_rss_bytes()
+
+
+async def run_converter_chain(plan: List[Hop], *args: Any, **kwargs: Any) -> List[Tuple[int, float]]:
+    """
+    Runs a chained conversion plan in one pool process, holding the concurrency limit of
+    each converter in it; intermediates never leave that process (see
+    app.converters.chain). Returns the input size and duration of every hop.
+    """
+    steps = [(hop.spec.name, hop.content_type, hop.output_format) for hop in plan]
+    specs = [hop.spec for hop in plan]
+    result, peak_rss = await _run_in_pool_limited(specs, _run_chain_in_child, steps, args, kwargs)
+    if peak_rss is not None:
+        CONVERSION_PEAK_RSS_BYTES.labels(converter=plan_label(plan)).observe(peak_rss)
+        logger.info(f"Chain '{plan_label(plan)}' finished with peak RSS {peak_rss / (1024 * 1024):.1f} MiB")
+    return result
+
+
+def _observe_peak_rss(spec: ConverterSpec, peak_rss: Optional[int]) -> None:
+    if peak_rss is not None:
+        CONVERSION_PEAK_RSS_BYTES.labels(converter=spec.name).observe(peak_rss)
+        logger.info(f"Converter '{spec.name}' finished with peak RSS {peak_rss / (1024 * 1024):.1f} MiB")
+
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs) -> None:
+    if settings.METRICS_ENABLED and settings.WORKER_METRICS_PORT:
+        start_exporter(settings.WORKER_METRICS_PORT, settings.WORKER_METRICS_ADDR)
+
+
+@worker_shutdown.connect
+def shutdown_runtime(**kwargs) -> None:
+    global _loop
+    _reset_process_pool()
+    if _loop is not None:
+        stats = pool_stats()
+        if stats:
+            logger.info(f"Database pool on shutdown: {stats}")
+        try:
+            asyncio.run_coroutine_threadsafe(dispose_engine(), _loop).result(timeout=10)
+            asyncio.run_coroutine_threadsafe(close_redis(), _loop).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"Failed to release worker connections on shutdown: {e}")
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
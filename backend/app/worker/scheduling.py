@@ -0,0 +1,105 @@
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from kombu import Queue
+
+from app.converters import ConverterSpec
+from app.core.config import settings
+from app.services.events import get_redis
+
+logger = logging.getLogger(__name__)
+
+# --- Queues ---
+# One queue per job class so small, fast jobs never sit behind long ones. Run
+# dedicated workers per queue (see fly.toml) to isolate them completely.
+FAST_QUEUE = "convert.fast"
+HEAVY_QUEUE = "convert.heavy"
+MEDIA_QUEUE = "convert.media"
+CONVERSION_QUEUES = (FAST_QUEUE, HEAVY_QUEUE, MEDIA_QUEUE)
+# Periodic housekeeping (retention reaper), kept apart so it never queues behind conversions
+MAINTENANCE_QUEUE = "maintenance"
+# Thumbnails of finished conversions; list it last in -Q so it only runs when conversions are drained
+PREVIEW_QUEUE = "previews"
+
+_JOB_CLASS_QUEUES = {"image": FAST_QUEUE, "document": HEAVY_QUEUE, "media": MEDIA_QUEUE}
+# Order used when a large input bumps a job to a heavier queue
+_QUEUE_WEIGHT = {FAST_QUEUE: 0, HEAVY_QUEUE: 1, MEDIA_QUEUE: 2}
+
+# Redis broker priorities: 0 is the highest, 9 the lowest
+LOWEST_PRIORITY = 9
+
+INFLIGHT_KEY_PREFIX = "conversion-inflight:"
+# Safety net so a counter never drifts forever if a worker dies mid-job
+INFLIGHT_TTL_SECONDS = 6 * 3600
+
+
+def celery_queues() -> list:
+    return [Queue(name, routing_key=name) for name in (*CONVERSION_QUEUES, MAINTENANCE_QUEUE, PREVIEW_QUEUE)]
+
+
+@dataclass(frozen=True)
+class Route:
+    queue: str
+    priority: int
+
+
+def queue_for(spec: ConverterSpec, file_size: Optional[int]) -> str:
+    """Picks the queue from the converter's job class, bumped to a heavier queue for large inputs."""
+    queue = _JOB_CLASS_QUEUES.get(spec.job_class, HEAVY_QUEUE)
+    size = file_size or 0
+    if size > settings.HEAVY_QUEUE_MAX_BYTES:
+        size_queue = MEDIA_QUEUE
+    elif size > settings.FAST_QUEUE_MAX_BYTES:
+        size_queue = HEAVY_QUEUE
+    else:
+        size_queue = FAST_QUEUE
+    return max(queue, size_queue, key=_QUEUE_WEIGHT.__getitem__)
+
+
+def priority_for(tier: Optional[str], inflight: int) -> int:
+    """Tier base priority, lowered one step per FAIR_SHARE_STEP jobs the user already has in flight."""
+    tiers = settings.parsed_tier_priorities
+    base = tiers.get(tier or settings.DEFAULT_TIER, tiers.get(settings.DEFAULT_TIER, LOWEST_PRIORITY))
+    excess = inflight - settings.FAIR_SHARE_FREE_JOBS
+    penalty = 0 if excess < 0 else 1 + excess // max(settings.FAIR_SHARE_STEP, 1)
+    return min(base + penalty, LOWEST_PRIORITY)
+
+
+def route_for(
+    spec: ConverterSpec, file_size: Optional[int], tier: Optional[str], inflight: int, via: Sequence[ConverterSpec] = ()
+) -> Route:
+    """`via` are the other converters of a chained conversion; the heaviest queue among them all wins."""
+    queue = max((queue_for(s, file_size) for s in (spec, *via)), key=_QUEUE_WEIGHT.__getitem__)
+    return Route(queue=queue, priority=priority_for(tier, inflight))
+
+
+def _inflight_key(owner_id: uuid.UUID | str) -> str:
+    return f"{INFLIGHT_KEY_PREFIX}{owner_id}"
+
+
+async def reserve_slots(owner_id: uuid.UUID | str, count: int = 1) -> int:
+    """Counts `count` new jobs against the user's fair share; returns how many were already in flight."""
+    key = _inflight_key(owner_id)
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.incrby(key, count)
+        pipe.expire(key, INFLIGHT_TTL_SECONDS)
+        total, _ = await pipe.execute()
+        return max(int(total) - count, 0)
+    except Exception as e:
+        # Scheduling still works without Redis, just without fair share
+        logger.warning(f"Failed to reserve fair-share slots for user {owner_id}: {e}")
+        return 0
+
+
+async def release_slot(owner_id: uuid.UUID | str, count: int = 1) -> None:
+    """Marks `count` of the user's jobs as finished (or never queued)."""
+    key = _inflight_key(owner_id)
+    try:
+        remaining = await get_redis().decrby(key, count)
+        if remaining <= 0:
+            await get_redis().delete(key)
+    except Exception as e:
+        logger.warning(f"Failed to release fair-share slot for user {owner_id}: {e}")
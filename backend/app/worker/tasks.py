@@ -1,19 +1,45 @@
-import time
 from app.core.celery_app import celery_app
+from app.core.config import settings
+import asyncio
+import datetime
+import json
 import logging
+import mimetypes
+import time
+from dataclasses import dataclass
 from pathlib import Path
 import os
 import uuid
-
-# --- Conversion Library Imports (Add as needed) ---
-from PIL import Image # Import Pillow
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+# --- Conversion Registry (backends are imported lazily) ---
+from app.converters import Hop, plan_label, registry
+from app.services.conversion_costs import load_costs, record_cost
+from app.services.events import publish_conversion_event
+from app.services.metrics import (
+    CONVERSION_INPUT_BYTES,
+    CONVERSION_OUTPUT_BYTES,
+    CONVERSION_STAGE_SECONDS,
+    CONVERSIONS,
+    CONVERSIONS_IN_PROGRESS,
+    UNKNOWN,
+    StageTimer,
+)
+from app.services.progress import ProgressReporter, clear_progress
+from app.services.result_cache import result_cache, cache_key
+from app.services.retention import expires_in
+from app.services.storage import get_storage, store_output
+from app.worker.previews import schedule_previews
+from app.worker.runtime import run_async, run_converter, run_converter_chain, run_converter_many
+from app.worker.scheduling import release_slot
 
 # --- Database Imports ---
 from app.db.session import SessionLocal # Import session factory
 from app.models.conversion import Conversion, ConversionStatus
 from app.models.file import File # Assuming File model needed for path
-from sqlalchemy.orm import joinedload # To fetch related File object
-from sqlalchemy import select, update
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
@@ -33,174 +59,405 @@ async def update_db_status(conversion_id: uuid.UUID, status: ConversionStatus, *
             await db.rollback()
             logger.error(f"Failed to update DB for conversion {conversion_id}: {e}", exc_info=True)
 
+# Columns the worker needs from a claimed job
+_CLAIM_COLUMNS = (
+    Conversion.output_format,
+    Conversion.options,
+    Conversion.original_filename,
+    Conversion.owner_id,
+    Conversion.batch_id,
+    Conversion.task_id,
+)
+_CLAIM_FILE_COLUMNS = (File.id, File.storage_path, File.content_type, File.content_hash, File.file_size)
+_UNFINISHED = (ConversionStatus.PENDING, ConversionStatus.PROCESSING)
+
+
+def _claimable():
+    """Jobs that may be claimed: pending, or PROCESSING under a claim that outlived the visibility timeout."""
+    stale_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=settings.TASK_VISIBILITY_TIMEOUT_SECONDS
+    )
+    return (Conversion.status == ConversionStatus.PENDING) | (
+        (Conversion.status == ConversionStatus.PROCESSING) & (Conversion.updated_at < stale_before)
+    )
+
+
+async def _claim_job(db: AsyncSession, conversion_id: uuid.UUID):
+    """
+    Marks the job PROCESSING and returns its details and input file, or None if it cannot
+    be claimed: missing, already finished, or running elsewhere. `queued_for` is the time
+    since the conversion was created.
+
+    The status check makes duplicate deliveries of the same task (acks_late redelivery)
+    no-ops. A PROCESSING job is only taken over once its claim is older than the broker's
+    visibility timeout, i.e. when the message was redelivered because its worker died.
+    """
+    claim = (
+        update(Conversion)
+        .where(Conversion.id == conversion_id, _claimable())
+        .values(status=ConversionStatus.PROCESSING)
+    )
+    if db.bind.dialect.name == "postgresql":
+        # One statement: UPDATE ... FROM files ... RETURNING
+        stmt = claim.where(Conversion.original_file_id == File.id).returning(
+            *_CLAIM_COLUMNS,
+            *_CLAIM_FILE_COLUMNS,
+            # Measured on the database clock, so worker clock skew does not distort it
+            (func.now() - Conversion.created_at).label("queued_for"),
+        )
+        return (await db.execute(stmt)).one_or_none()
+
+    # SQLite (local development) cannot return columns of the FROM table: read the file separately
+    claimed = (await db.execute(
+        claim.where(exists().where(File.id == Conversion.original_file_id))
+        .returning(*_CLAIM_COLUMNS, Conversion.original_file_id, Conversion.created_at)
+    )).one_or_none()
+    if claimed is None:
+        return None
+    input_file = (await db.execute(
+        select(*_CLAIM_FILE_COLUMNS).where(File.id == claimed.original_file_id)
+    )).one()
+    created_at = claimed.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+    return SimpleNamespace(
+        **claimed._mapping,
+        **input_file._mapping,
+        queued_for=datetime.datetime.now(datetime.timezone.utc) - created_at,
+    )
+
+
+async def _claim_siblings(db: AsyncSession, conversion_id: uuid.UUID, file_id: uuid.UUID, task_id: Optional[str]):
+    """
+    Claims the other conversions of a multi-format upload: same input file, queued under
+    the same task. The upload queues one task for all of them, so the input is fetched
+    and decoded once. Uses the same status check as _claim_job.
+    """
+    if not task_id:
+        return []
+    return (await db.execute(
+        update(Conversion)
+        .where(
+            Conversion.original_file_id == file_id,
+            Conversion.task_id == task_id,
+            Conversion.id != conversion_id,
+            _claimable(),
+        )
+        .values(status=ConversionStatus.PROCESSING)
+        .returning(Conversion.id, *_CLAIM_COLUMNS)
+    )).all()
+
+
+@dataclass
+class _Output:
+    """One conversion produced from the claimed input: the task's own job or a sibling."""
+    conversion_id: uuid.UUID
+    output_format: str
+    options: Optional[dict]
+    batch_id: Optional[uuid.UUID]
+    path: Optional[Path] = None
+    converter: str = UNKNOWN
+    error: Optional[Exception] = None
+
+
+def _reporter(owner_id: uuid.UUID, output: _Output) -> ProgressReporter:
+    # Throttled reporter: converters report fine-grained progress, Redis sees at most ~1 write/sec
+    return ProgressReporter(
+        conversion_id=str(output.conversion_id),
+        owner_id=str(owner_id),
+        output_format=output.output_format,
+        batch_id=str(output.batch_id) if output.batch_id else None,
+    )
+
+
+async def _convert_outputs(
+    content_type: str, input_path: Path, input_size: int, outputs: List[_Output], owner_id: uuid.UUID
+) -> None:
+    """
+    Runs the converters for all outputs of one input, setting `error` on those that fail.
+    Outputs with the same converter and options go to its multi-output entry point if it
+    has one, so the input is decoded once for all of them. Formats no single converter
+    produces run as a chain of converters, the cheapest by the learned costs. Every run
+    feeds its duration back into those costs.
+    """
+    costs = await load_costs()
+    groups: Dict[Tuple[str, str], List[_Output]] = {}
+    chains: List[Tuple[_Output, List[Hop]]] = []
+    for output in outputs:
+        try:
+            # Direct pairs are an O(1) lookup; the backend modules are imported on first use.
+            # Intermediate sizes are unknown before the run, so every hop is costed at the input size.
+            plan = registry.resolve_plan(content_type, output.output_format, cost=lambda hop: costs.estimate(hop, input_size))
+        except Exception as e:
+            output.error = e
+            continue
+        output.converter = plan_label(plan)
+        if len(plan) > 1:
+            chains.append((output, plan))
+            continue
+        groups.setdefault((plan[0].spec.name, json.dumps(output.options or {}, sort_keys=True)), []).append(output)
+
+    for (name, _), group in groups.items():
+        spec = registry.by_name(name)
+        logger.info(f"Using converter '{spec.name}' ({spec.job_class}) for {', '.join(o.output_format for o in group)}")
+        if len(group) > 1 and spec.multi_target:
+            targets = [(o.path, o.output_format, _reporter(owner_id, o)) for o in group]
+            started = time.perf_counter()
+            try:
+                errors = await run_converter_many(spec, input_path, targets, options=group[0].options)
+            except Exception as e:
+                # The input itself could not be decoded: every output fails with the same error
+                errors = [e] * len(group)
+            # One decode shared by all outputs: each is charged an equal share of the run
+            share = (time.perf_counter() - started) / len(group)
+            for output, error in zip(group, errors):
+                if error is not None:
+                    output.error = error if isinstance(error, Exception) else ValueError(error)
+                else:
+                    await record_cost(Hop(spec, content_type, output.output_format), input_size, share)
+            continue
+        for output in group:
+            started = time.perf_counter()
+            try:
+                await run_converter(
+                    spec, input_path, output.path, output.output_format,
+                    progress=_reporter(owner_id, output), options=output.options,
+                )
+            except Exception as e:
+                output.error = e
+                continue
+            await record_cost(Hop(spec, content_type, output.output_format), input_size, time.perf_counter() - started)
+
+    for output, plan in chains:
+        logger.info(
+            f"Converting {content_type} to {output.output_format} through "
+            f"{' -> '.join(f'{hop.spec.name} ({hop.output_format})' for hop in plan)}"
+        )
+        try:
+            timings = await run_converter_chain(
+                plan, input_path, output.path, progress=_reporter(owner_id, output), options=output.options,
+            )
+        except Exception as e:
+            output.error = e
+            continue
+        for hop, (hop_input_size, seconds) in zip(plan, timings):
+            await record_cost(hop, hop_input_size, seconds)
+
+
 @celery_app.task(acks_late=True)
-async def process_file_conversion(conversion_id_str: str):
+def process_file_conversion(conversion_id_str: str):
     """Performs file conversion based on DB record, updates status, and cleans up."""
-
     conversion_id = uuid.UUID(conversion_id_str) # Convert string back to UUID
-    logger.info(f"Starting conversion task for conversion_id: {conversion_id}")
+    # DB orchestration runs on the worker's event loop; the conversion itself in the process pool
+    return run_async(_process_file_conversion(conversion_id))
 
-    output_file_path = "" # Placeholder
-    conversion = None
-    input_path = None
 
-    # --- Fetch Conversion Job Details from DB ---
-    async with SessionLocal() as db:
-        try:
-            # Fetch Conversion and related File eagerly
-            stmt = (
-                select(Conversion)
-                .options(joinedload(Conversion.original_file))
-                .where(Conversion.id == conversion_id)
-            )
-            result = await db.execute(stmt)
-            conversion = result.scalar_one_or_none()
+async def _process_file_conversion(conversion_id: uuid.UUID):
+    logger.info(f"Starting conversion task for conversion_id: {conversion_id}")
 
-            if not conversion or not conversion.original_file:
-                logger.error(f"Conversion record {conversion_id} or associated file not found.")
-                # Cannot proceed without job details
-                return {"status": "error", "detail": "Conversion job or file not found"}
+    input_path = None
+    timer = StageTimer(CONVERSION_STAGE_SECONDS)
+    converter = UNKNOWN
 
-            # Mark as processing
-            conversion.status = ConversionStatus.PROCESSING
-            db.add(conversion)
-            await db.commit()
-            logger.info(f"Marked conversion {conversion_id} as PROCESSING")
+    # --- Claim the Job: mark it PROCESSING and read its details in one statement ---
+    with timer.stage("claim"):
+        async with SessionLocal() as db:
+            try:
+                job = await _claim_job(db, conversion_id)
+                siblings = await _claim_siblings(db, conversion_id, job.id, job.task_id) if job else []
+                await db.commit()
+
+                if job is None:
+                    current = (await db.execute(
+                        select(Conversion.status).where(Conversion.id == conversion_id)
+                    )).scalar_one_or_none()
+                    if current not in (None, ConversionStatus.PENDING):
+                        # Duplicate or redelivered message: another run owns or finished this job
+                        logger.warning(f"Conversion {conversion_id} is already {current.value}; skipping duplicate task")
+                        return {"status": "skipped", "detail": f"Conversion already {current.value}"}
+                    logger.error(f"Conversion record {conversion_id} or associated file not found.")
+                    # Cannot proceed without job details
+                    return {"status": "error", "detail": "Conversion job or file not found"}
+                logger.info(f"Marked conversion {conversion_id} as PROCESSING")
+                if siblings:
+                    logger.info(f"Also claimed {len(siblings)} sibling conversions of file {job.id}")
+
+                # Get details needed for conversion
+                input_key = job.storage_path # Storage key (a local path with local storage)
+                input_file_id = job.id
+                input_content_type = job.content_type
+                output_format = job.output_format
+                original_filename = job.original_filename
+                content_hash = job.content_hash
+                owner_id = job.owner_id
+                input_size = job.file_size or 0
+                outputs = [_Output(conversion_id, job.output_format, job.options, job.batch_id)] + [
+                    _Output(row.id, row.output_format, row.options, row.batch_id) for row in siblings
+                ]
+                timer.record("queue_wait", job.queued_for.total_seconds())
+
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to fetch/update conversion {conversion_id} from DB: {e}", exc_info=True)
+                # We might retry later, or just fail
+                # For now, just return error status
+                return {"status": "error", "detail": f"Database error fetching job {conversion_id}"}
+
+    for output in outputs:
+        await publish_conversion_event(
+            owner_id, output.conversion_id, ConversionStatus.PROCESSING.value,
+            output_format=output.output_format, batch_id=output.batch_id, progress=0.0,
+        )
 
-            # Get details needed for conversion
-            input_path = Path(conversion.original_file.storage_path)
-            output_format = conversion.output_format
-            original_filename = conversion.original_file.original_filename
-
-        except Exception as e:
-            await db.rollback()
-            logger.error(f"Failed to fetch/update conversion {conversion_id} from DB: {e}", exc_info=True)
-            # We might retry later, or just fail
-            # For now, just return error status
-            return {"status": "error", "detail": f"Database error fetching job {conversion_id}"}
+    storage = get_storage()
 
     # --- Perform Conversion ---
     try:
-        logger.info(f"Performing conversion for '{original_filename}' to {output_format}")
+        # Labels of the task's own metrics; siblings are counted under their own converter
+        converter = plan_label(registry.resolve_plan(input_content_type, output_format))
+        CONVERSIONS_IN_PROGRESS.labels(converter=converter).inc()
+
+        logger.info(f"Performing conversion for '{original_filename}' to {', '.join(o.output_format for o in outputs)}")
+        # Remote storage: download the input to local scratch space for the converter
+        with timer.stage("fetch"):
+            input_path = await asyncio.to_thread(storage.fetch, input_key, Path(settings.TEMP_DIR) / str(input_file_id))
         logger.info(f"Input file path: {input_path}")
 
         # Use configured directory for converted files
         output_dir = Path(settings.CONVERTED_DIR)
         output_dir.mkdir(exist_ok=True)
-        # Use conversion ID to ensure unique output filename
-        output_file_path = str(output_dir / f"{conversion_id}.{output_format}")
-
-        # --- Select Conversion Library based on input/output formats --- 
-        # Example using hypothetical conversion functions:
-        try:
-            input_content_type = conversion.original_file.content_type
-            logger.info(f"Starting conversion: {input_content_type} -> {output_format}")
-
-            if input_content_type.startswith("image/") and output_format in ["png", "jpg", "webp"]:
-                # --- Pillow Image Conversion Example ---
-                # NOTE: This is UNTESTED code. May require debugging and refinement.
-                # It also doesn't handle all potential image modes or errors.
-                logger.info(f"Attempting image conversion to {output_format} using Pillow...")
-                try:
-                    # Import inside try to avoid issues if Pillow isn't installed/needed
-                    from PIL import Image, UnidentifiedImageError
-
-                    img = Image.open(input_path)
-
-                    # Handle different image modes for compatibility
-                    current_mode = img.mode
-                    logger.info(f"Opened image '{original_filename}' with mode: {current_mode}")
-
-                    # Convert palettes to RGB/RGBA first
-                    if current_mode in ('P', 'PA'):
-                        logger.info(f"Converting image mode {current_mode} to RGBA")
-                        img = img.convert('RGBA')
-                        current_mode = img.mode # Update mode after conversion
-
-                    # Ensure RGB for JPG output (strips transparency)
-                    if output_format == 'jpg' and current_mode not in ('RGB', 'L'): # L is grayscale
-                        logger.info(f"Converting image mode {current_mode} to RGB for JPG output")
-                        img = img.convert('RGB')
-                    # Preserve transparency for PNG/WEBP if present
-                    elif output_format in ('png', 'webp') and current_mode == 'RGBA':
-                         logger.info(f"Preserving RGBA mode for {output_format.upper()} output")
-                    # Default conversion for other cases if needed (might not be necessary)
-                    # elif current_mode not in ('RGB', 'RGBA', 'L'):
-                    #     logger.warning(f"Unexpected image mode {current_mode}, attempting generic RGBA conversion.")
-                    #     img = img.convert('RGBA')
-
-                    # Pillow determines format from file extension for save,
-                    # but we specify explicitly for clarity and potentially unsupported extensions
-                    save_kwargs = {'format': output_format.upper()}
-                    if output_format == 'jpg':
-                        save_kwargs['quality'] = 85 # Example quality setting
-                        save_kwargs['optimize'] = True
-                    elif output_format == 'png':
-                         save_kwargs['optimize'] = True
-                    elif output_format == 'webp':
-                        save_kwargs['quality'] = 85 # Example quality setting
-                        # Add lossless=True or method=6 for different webp options if desired
-
-                    img.save(output_file_path, **save_kwargs)
-                    logger.info(f"Pillow conversion successful to {output_file_path}")
-
-                except UnidentifiedImageError as img_err:
-                    logger.error(f"Pillow could not identify image file: {img_err}", exc_info=True)
-                    raise ValueError(f"Invalid or unsupported image file: {original_filename}")
-                except (OSError, IOError) as io_err: # Catch file system related errors during open/save
-                    logger.error(f"Pillow I/O error during conversion: {io_err}", exc_info=True)
-                    raise ValueError(f"Error processing image file: {io_err}")
-                except Exception as img_exc: # Catch other potential Pillow errors
-                    logger.error(f"Pillow conversion failed unexpectedly: {img_exc}", exc_info=True)
-                    raise ValueError(f"Image conversion failed: {img_exc}") # Raise specific error
-                # --- End Pillow Example ---
-            elif input_content_type == "application/pdf" and output_format == "txt":
-                # from conversion_libs import pdf_converter
-                # pdf_converter.to_text(str(input_path), output_file_path)
-                logger.info("Simulating PDF to TXT conversion...")
-                time.sleep(10) # Simulate PDF conversion time
-            # Add more conditions for other supported conversions (audio, video, documents...)
-            else:
-                raise NotImplementedError(f"Conversion from {input_content_type} to {output_format} not supported.")
-
-            # --- TODO: If storing results in cloud storage, upload output_file_path here --- 
-            # Example: cloud_url = upload_to_s3(output_file_path)
-            # Example: output_file_path = cloud_url # Update path to the cloud URL
-
-            logger.info(f"Successfully converted to {output_file_path}")
-
-        except Exception as conversion_error:
-            logger.error(f"Actual conversion failed: {conversion_error}", exc_info=True)
-            # Re-raise the error to be caught by the outer try/except
-            raise conversion_error
-        # --- End Conversion Logic ---
-
-        logger.info(f"Conversion successful for {original_filename}. Output: {output_file_path}")
-
-        # Update DB status to COMPLETED
-        await update_db_status(
-            conversion_id, ConversionStatus.COMPLETED, converted_file_path=output_file_path
-        )
-
-        return {"status": "success", "output_path": output_file_path}
+        for output in outputs:
+            # Use conversion ID to ensure unique output filename
+            output.path = output_dir / f"{output.conversion_id}.{output.output_format}"
 
+        logger.info(f"Starting conversion: {input_content_type} -> {', '.join(o.output_format for o in outputs)}")
+        with timer.stage("convert"):
+            await _convert_outputs(input_content_type, input_path, input_size, outputs, owner_id)
     except Exception as e:
-        error_message = f"Conversion failed for {original_filename}: {e}"
-        logger.error(error_message, exc_info=True)
+        # Nothing was converted: unsupported pair or unreachable input
+        for output in outputs:
+            output.error = output.error or e
 
-        # Update DB status to FAILED
-        await update_db_status(
-            conversion_id, ConversionStatus.FAILED, error_message=str(e)
-        )
-
-        raise # Reraise exception for Celery to mark task as failed
+    try:
+        stored_key = None
+        for output in outputs:
+            if output.error is None:
+                try:
+                    stored = await _complete_output(storage, output, content_hash, owner_id, input_size, timer)
+                except Exception as e:
+                    output.error = e
+                else:
+                    if output.conversion_id == conversion_id:
+                        stored_key = stored.key
+                    continue
+            await _fail_output(output, original_filename, owner_id, input_size, timer)
+
+        failed = [output for output in outputs if output.error is not None]
+        if failed:
+            # Reraise for Celery to mark the task as failed
+            raise failed[0].error
+        return {"status": "success", "output_path": stored_key}
 
     finally:
+        if converter != UNKNOWN:
+            CONVERSIONS_IN_PROGRESS.labels(converter=converter).dec()
+        timer.observe(converter=converter, output_format=output_format)
+
+        # Job finished either way: give the user's fair-share slot back
+        await release_slot(owner_id)
+
         # --- Cleanup Input File ---
-        # Cleanup only if input_path was successfully retrieved
-        if input_path and input_path.exists():
+        # A conversion of the same file that this task did not claim still needs the input
+        keep_input = await _input_still_needed(input_file_id)
+        if keep_input:
+            logger.info(f"Keeping input of file {input_file_id}: other conversions of it are unfinished")
+        stored_locally = storage.local_path(input_key) is not None
+        # Cleanup only if input_path was successfully retrieved; with local storage it is the stored input itself
+        if input_path and input_path.exists() and not (keep_input and stored_locally):
             try:
                 input_path.unlink()
                 logger.info(f"Cleaned up temporary input file: {input_path}")
             except OSError as unlink_error:
-                logger.error(f"Error cleaning up temporary file {input_path}: {unlink_error}") 
\ No newline at end of file
+                logger.error(f"Error cleaning up temporary file {input_path}: {unlink_error}")
+        if not stored_locally and not keep_input:
+            try:
+                await asyncio.to_thread(storage.delete, input_key)
+            except Exception as delete_error:
+                logger.error(f"Error deleting stored input {input_key}: {delete_error}")
+
+
+async def _input_still_needed(file_id: uuid.UUID) -> bool:
+    async with SessionLocal() as db:
+        try:
+            return (await db.execute(
+                select(exists().where(Conversion.original_file_id == file_id, Conversion.status.in_(_UNFINISHED)))
+            )).scalar()
+        except Exception as e:
+            # Unknown: keep the input, the reaper removes it with its last conversion
+            logger.error(f"Failed to check pending conversions of file {file_id}: {e}", exc_info=True)
+            return True
+
+
+async def _complete_output(
+    storage, output: _Output, content_hash: Optional[str], owner_id: uuid.UUID, input_size: int, timer: StageTimer
+):
+    """Stores a converted output, marks its conversion COMPLETED and returns the stored object."""
+    logger.info(f"Successfully converted to {output.path}")
+
+    # Hash the output (download ETag) and hand it to storage (a multipart upload with S3; a no-op on local disk)
+    with timer.stage("store_output"):
+        stored = await asyncio.to_thread(
+            store_output,
+            storage,
+            output.path,
+            storage.output_key(output.conversion_id, output.output_format),
+            mimetypes.guess_type(str(output.path))[0],
+        )
+
+    # Update DB status to COMPLETED
+    with timer.stage("finalize"):
+        await update_db_status(
+            output.conversion_id,
+            ConversionStatus.COMPLETED,
+            converted_file_path=stored.key,
+            output_sha256=stored.sha256,
+            output_size=stored.size,
+            expires_at=expires_in(settings.RETENTION_SECONDS),
+        )
+        await publish_conversion_event(
+            owner_id, output.conversion_id, ConversionStatus.COMPLETED.value,
+            output_format=output.output_format, batch_id=output.batch_id, progress=1.0,
+        )
+        await clear_progress(output.conversion_id)
+    # Make the output reusable for later uploads of byte-identical input (a copy inside storage)
+    if settings.RESULT_CACHE_ENABLED and content_hash:
+        with timer.stage("cache_store"):
+            key = cache_key(content_hash, output.output_format, output.options)
+            await result_cache.store(key, output.output_format, stored)
+    # Thumbnails for the history are a separate, low-priority job
+    schedule_previews(output.conversion_id)
+
+    CONVERSIONS.labels(converter=output.converter, output_format=output.output_format, outcome="success").inc()
+    CONVERSION_INPUT_BYTES.labels(converter=output.converter, output_format=output.output_format).inc(input_size)
+    CONVERSION_OUTPUT_BYTES.labels(converter=output.converter, output_format=output.output_format).inc(stored.size)
+    return stored
+
+
+async def _fail_output(output: _Output, original_filename: str, owner_id: uuid.UUID, input_size: int, timer: StageTimer) -> None:
+    error = output.error
+    logger.error(f"Conversion failed for {original_filename} to {output.output_format}: {error}", exc_info=error)
+
+    # Update DB status to FAILED
+    with timer.stage("finalize"):
+        await update_db_status(
+            output.conversion_id, ConversionStatus.FAILED, error_message=str(error),
+            expires_at=expires_in(settings.RETENTION_SECONDS),
+        )
+        await publish_conversion_event(
+            owner_id, output.conversion_id, ConversionStatus.FAILED.value,
+            output_format=output.output_format, batch_id=output.batch_id, error_message=str(error),
+        )
+        await clear_progress(output.conversion_id)
+
+    CONVERSIONS.labels(converter=output.converter, output_format=output.output_format, outcome="failure").inc()
+    CONVERSION_INPUT_BYTES.labels(converter=output.converter, output_format=output.output_format).inc(input_size)
@@ -0,0 +1,6 @@
+# Standalone performance benchmarks. Run from the backend directory, e.g.:
+#   python -m benchmarks.converters      # raw converter throughput per (input type, output format)
+#   python -m benchmarks.end_to_end      # upload -> status -> download latency at a given concurrency
+#   python -m benchmarks.image_presets   # encode time vs. output size per encoder preset
+#   python -m benchmarks.compare baseline.json candidate.json   # fail on regressions
+# Inputs come from a fixed, generated corpus (benchmarks.corpus); results are JSON (benchmarks.report).
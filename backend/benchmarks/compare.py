@@ -0,0 +1,82 @@
+"""
+Compares two benchmark result files and exits non-zero if the candidate regressed.
+
+Usage (from the backend directory):
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+
+Both files must come from the same benchmark (converters or end_to_end). A result
+regresses when its time is more than `threshold` (relative) above the baseline.
+Results present in only one file are listed but never fail the comparison.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Per benchmark: how to identify a result and which of its times to compare
+_KEYS = {
+    "converters": lambda r: (r["converter"], r["input"]["name"], r["output_format"]),
+    "end_to_end": lambda r: (r["input"], r["output_format"]),
+}
+_METRICS = {
+    "converters": {"median_seconds": lambda r: r["median_seconds"]},
+    "end_to_end": {
+        "total_p50": lambda r: r["total_seconds"].get("p50"),
+        "total_p90": lambda r: r["total_seconds"].get("p90"),
+        "processing_p50": lambda r: r["processing_seconds"].get("p50"),
+    },
+}
+
+
+def _load(path: Path) -> dict:
+    document = json.loads(path.read_text())
+    if document.get("benchmark") not in _KEYS:
+        sys.exit(f"{path}: unknown benchmark {document.get('benchmark')!r}")
+    return document
+
+
+def _index(document: dict) -> Dict[Tuple, dict]:
+    key = _KEYS[document["benchmark"]]
+    return {key(result): result for result in document["results"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    if baseline["benchmark"] != candidate["benchmark"]:
+        sys.exit(f"Cannot compare {baseline['benchmark']} results with {candidate['benchmark']} results")
+    if baseline["environment"].get("cpu_count") != candidate["environment"].get("cpu_count"):
+        print("Warning: the results come from machines with different CPU counts", file=sys.stderr)
+
+    metrics = _METRICS[baseline["benchmark"]]
+    before, after = _index(baseline), _index(candidate)
+    regressions = 0
+    print(f"{'result':<50} {'metric':<15} {'baseline':>9} {'candidate':>10} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        for name, read in metrics.items():
+            old, new = read(before[key]), read(after[key])
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            regressed = change > args.threshold
+            regressions += regressed
+            label = " / ".join(str(part) for part in key)
+            print(f"{label:<50} {name:<15} {old:>9.4f} {new:>10.4f} {change:>+7.1%}{'  REGRESSED' if regressed else ''}")
+    for key in sorted(before.keys() - after.keys()):
+        print(f"Only in baseline: {' / '.join(map(str, key))}")
+    for key in sorted(after.keys() - before.keys()):
+        print(f"Only in candidate: {' / '.join(map(str, key))}")
+
+    if regressions:
+        print(f"\n{regressions} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Raw converter throughput for every registered (input type, output format) pair.
+
+Each converter runs in this process on one core, without the worker's process pool,
+Celery or the database, so the numbers isolate the conversion code itself. PDF
+converters report pages/sec, image converters images/sec and megapixels/sec; all
+report input MB/sec.
+
+Usage (from the backend directory):
+    python -m benchmarks.converters [--sizes small,medium] [--repeat 5] [--output results.json]
+    python -m benchmarks.converters --converter pillow-image --formats webp
+
+The corpus is generated on first use (see benchmarks.corpus) and reused afterwards.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# The converters import app settings; benchmarks don't need a real database or secret
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+
+from app.converters import registry  # noqa: E402
+from benchmarks.corpus import build_corpus  # noqa: E402
+from benchmarks.report import write_report  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small,medium", help="Corpus size classes: small, medium, large")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per input and output format")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs first (imports, caches)")
+    parser.add_argument("--converter", help="Only benchmark this converter (see app.converters)")
+    parser.add_argument("--formats", help="Comma-separated output formats to benchmark (default: all)")
+    parser.add_argument("--corpus", type=Path, default=Path(tempfile.gettempdir()) / "file-converter-corpus")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    sizes = args.sizes.split(",")
+    formats = set(args.formats.split(",")) if args.formats else None
+    corpus = build_corpus(args.corpus, sizes)
+    results = []
+
+    print(f"{'converter':<13} {'input':<24} {'->':<4} {'median s':>9} {'items/s':>8} {'MB/s':>7} {'pages/s':>8}", file=sys.stderr)
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in registry.specs():
+            if args.converter and spec.name != args.converter:
+                continue
+            convert = registry.load(spec)
+            for item in corpus:
+                if item.content_type not in spec.input_types:
+                    continue
+                for output_format in sorted(spec.output_formats):
+                    if formats and output_format not in formats:
+                        continue
+                    output_path = Path(tmp) / f"out.{output_format}"
+                    timings = []
+                    for run in range(args.warmup + args.repeat):
+                        started = time.perf_counter()
+                        convert(item.path, output_path, output_format)
+                        elapsed = time.perf_counter() - started
+                        if run >= args.warmup:
+                            timings.append(elapsed)
+                    median = statistics.median(timings)
+                    result = {
+                        "converter": spec.name,
+                        "input": item.as_dict(),
+                        "output_format": output_format,
+                        "output_bytes": output_path.stat().st_size,
+                        "seconds": timings,
+                        "median_seconds": median,
+                        "items_per_second": 1 / median,
+                        "input_mb_per_second": item.bytes / MB / median,
+                    }
+                    if item.pixels:
+                        result["megapixels_per_second"] = item.pixels / 1e6 / median
+                    if item.content_type == "application/pdf":
+                        result["pages_per_second"] = item.pages / median
+                    results.append(result)
+                    pages_per_second = result.get("pages_per_second")
+                    print(
+                        f"{spec.name:<13} {item.name:<24} {output_format:<4} {median:>9.3f} {1 / median:>8.1f} "
+                        f"{result['input_mb_per_second']:>7.1f} {f'{pages_per_second:.1f}' if pages_per_second else '-':>8}",
+                        file=sys.stderr,
+                    )
+
+    write_report(
+        "converters",
+        {"sizes": sizes, "repeat": args.repeat, "warmup": args.warmup, "converter": args.converter, "formats": args.formats},
+        results,
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
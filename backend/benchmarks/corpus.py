@@ -0,0 +1,139 @@
+"""
+Fixed corpus of generated benchmark inputs.
+
+Every input is derived from a seed, so two runs (or two machines) benchmark byte-identical
+files. Files are written once into the corpus directory and reused by later runs.
+"""
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from PIL import Image, ImageChops
+
+SEED = 20240501
+
+IMAGE_SIZES: Dict[str, Tuple[int, int]] = {
+    "small": (640, 480),
+    "medium": (1920, 1080),
+    "large": (4000, 3000),
+}
+PDF_PAGES: Dict[str, int] = {"small": 10, "medium": 100, "large": 500}
+
+# Pillow format name, MIME type and file extension of each generated image input
+IMAGE_FORMATS: Sequence[Tuple[str, str, str]] = (
+    ("PNG", "image/png", "png"),
+    ("JPEG", "image/jpeg", "jpg"),
+    ("WEBP", "image/webp", "webp"),
+    ("GIF", "image/gif", "gif"),
+    ("BMP", "image/bmp", "bmp"),
+    ("TIFF", "image/tiff", "tiff"),
+)
+
+_WORDS = (
+    "conversion queue worker storage latency throughput document page image encoder "
+    "request response database index cache batch upload download format quality"
+).split()
+
+
+@dataclass(frozen=True)
+class CorpusItem:
+    name: str
+    path: Path
+    content_type: str
+    size_class: str
+    bytes: int
+    pages: int = 1  # Documents only
+    pixels: int = 0  # Images only
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["path"] = str(self.path)
+        return data
+
+
+def synthetic_image(width: int, height: int, seed: int = SEED) -> Image.Image:
+    """Photo-like RGB image (gradients plus noise); flat colors compress unrealistically well."""
+    noise = Image.frombytes("L", (width, height), random.Random(seed).randbytes(width * height))
+    # Soften the noise to film-grain strength
+    noise = ImageChops.blend(Image.new("L", (width, height), 128), noise, 0.12)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    red = ImageChops.add(gradient, noise, scale=1.3)
+    green = gradient.transpose(Image.Transpose.ROTATE_90).resize((width, height))
+    blue = Image.radial_gradient("L").resize((width, height))
+    return Image.merge("RGB", (red, ImageChops.blend(green, noise, 0.3), blue))
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(path: Path, pages: int, seed: int = SEED) -> None:
+    """Writes a text PDF with `pages` pages of 50 lines each (Helvetica, no compression)."""
+    rng = random.Random(seed)
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for number in range(1, pages + 1):
+        lines = [f"Page {number}"] + [" ".join(rng.choices(_WORDS, k=12)) for _ in range(49)]
+        text = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({_pdf_string(line)}) '" for line in lines) + " ET"
+        content = text.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids),
+    )
+
+    body = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(body))
+
+
+def build_corpus(directory: Path, size_classes: Sequence[str] = ("small", "medium"), kinds: Sequence[str] = ("image", "pdf")) -> List[CorpusItem]:
+    """Generates (or reuses) the inputs for `size_classes` and returns them in a stable order."""
+    directory.mkdir(parents=True, exist_ok=True)
+    items: List[CorpusItem] = []
+    for size_class in size_classes:
+        if "image" in kinds:
+            width, height = IMAGE_SIZES[size_class]
+            source = None
+            for pillow_format, content_type, extension in IMAGE_FORMATS:
+                path = directory / f"{size_class}-{width}x{height}.{extension}"
+                if not path.exists():
+                    if source is None:
+                        source = synthetic_image(width, height)
+                    image = source.convert("P", palette=Image.Palette.ADAPTIVE) if pillow_format == "GIF" else source
+                    # Write to a temporary name first so an interrupted run never leaves a truncated input
+                    partial = path.with_suffix(".partial")
+                    image.save(partial, pillow_format)
+                    partial.replace(path)
+                items.append(CorpusItem(
+                    name=path.name, path=path, content_type=content_type, size_class=size_class,
+                    bytes=path.stat().st_size, pixels=width * height,
+                ))
+        if "pdf" in kinds:
+            pages = PDF_PAGES[size_class]
+            path = directory / f"{size_class}-{pages}p.pdf"
+            if not path.exists():
+                partial = path.with_suffix(".partial")
+                synthetic_pdf(partial, pages)
+                partial.replace(path)
+            items.append(CorpusItem(
+                name=path.name, path=path, content_type="application/pdf", size_class=size_class,
+                bytes=path.stat().st_size, pages=pages,
+            ))
+    return items
@@ -0,0 +1,323 @@
+"""
+End-to-end latency: POST /convert/upload -> poll GET /convert/status -> GET /convert/download.
+
+Runs the FastAPI app in this process (httpx over ASGI, no network) against the database
+in DATABASE_URL, with the conversion job executed one of two ways:
+
+  --worker inline   (default) the job runs on this process's event loop as soon as it is
+                    queued: the real task code and process pool, without Celery or a broker
+  --worker celery   jobs go through the configured broker; start a worker with the same
+                    settings first (celery -A app.core.celery_app worker -Q convert.fast,...)
+
+Redis (events, progress, fair share) is an in-memory fakeredis server by default
+(`pip install fakeredis`); --redis configured uses EVENTS_REDIS_URL / CELERY_BROKER_URL.
+With --base-url the requests go to a running API instead; the benchmark user is still
+created directly in DATABASE_URL, which must be that API's database.
+
+Usage (from the backend directory):
+    python -m benchmarks.end_to_end [--requests 50] [--concurrency 4] [--sizes small] [--output results.json]
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.end_to_end --kinds image,pdf
+
+Settings come from environment variables only (the working directory changes, so no
+.env file is read). Without DATABASE_URL a fresh SQLite database is created in the working directory
+(a temporary one unless --workdir is given). Postgres databases must already be migrated
+(alembic upgrade head). The result cache is disabled unless --result-cache is passed,
+since the corpus repeats the same inputs.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_OUTPUT_FORMATS = {"application/pdf": "txt"}
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Measured upload -> download round trips")
+    parser.add_argument("--concurrency", type=int, default=4, help="Round trips in flight at once")
+    parser.add_argument("--warmup", type=int, default=4, help="Unmeasured round trips first (pool start-up, imports)")
+    parser.add_argument("--sizes", default="small", help="Corpus size classes: small, medium, large")
+    parser.add_argument("--kinds", default="image", help="Corpus kinds: image, pdf")
+    parser.add_argument("--image-format", default="jpg", help="Output format requested for image inputs")
+    parser.add_argument("--worker", choices=("inline", "celery"), default="inline")
+    parser.add_argument("--redis", choices=("fake", "configured"), default="fake")
+    parser.add_argument("--base-url", help="Benchmark a running API instead of an in-process app")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Seconds between status polls")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up on a job after this many seconds")
+    parser.add_argument("--result-cache", action="store_true", help="Leave the result cache enabled")
+    parser.add_argument("--workdir", type=Path, help="Working directory for uploads, outputs and SQLite (default: temporary)")
+    parser.add_argument("--corpus", type=Path, default=Path(tempfile.gettempdir()) / "file-converter-corpus")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logging")
+    args = parser.parse_args()
+    if args.base_url and args.worker == "inline":
+        parser.error("--base-url needs --worker celery (the API behind it queues jobs on its broker)")
+    if args.worker == "celery" and args.redis == "fake":
+        parser.error("--worker celery needs --redis configured (the worker cannot reach the in-process Redis)")
+    return args
+
+
+def start_fake_redis() -> str:
+    """Serves an in-memory Redis on a free local port; pool processes inherit its URL through the environment."""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit("--redis fake needs fakeredis (pip install fakeredis), or use --redis configured")
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    server.daemon_threads = True  # Open client connections must not keep the benchmark from exiting
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+def prepare_environment(args: argparse.Namespace) -> None:
+    """Sets defaults for the app's settings. Must run before anything from `app` is imported."""
+    # Settings paths (uploads, outputs, SQLite) are relative to the working directory
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="file-converter-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+    os.environ.setdefault("STORAGE_BACKEND", "local")
+    if not args.result_cache:
+        os.environ["RESULT_CACHE_ENABLED"] = "false"
+    if args.redis == "fake":
+        os.environ["EVENTS_REDIS_URL"] = start_fake_redis()
+    if args.worker == "inline":
+        # Thumbnails are a separate Celery job, outside the measured round trip
+        os.environ.setdefault("PREVIEWS_ENABLED", "false")
+    print(f"Working directory: {workdir}", file=sys.stderr)
+
+
+class _InlineTask:
+    def __init__(self):
+        self.id = f"inline-{uuid.uuid4()}"
+
+
+def run_jobs_inline() -> List[asyncio.Task]:
+    """Replaces Celery dispatch with running the task body on the current event loop."""
+    from app.worker import tasks
+
+    running: List[asyncio.Task] = []
+
+    def apply_async(args=None, **options):
+        running.append(asyncio.ensure_future(tasks._process_file_conversion(uuid.UUID(args[0]))))
+        return _InlineTask()
+
+    tasks.process_file_conversion.apply_async = apply_async
+    return running
+
+
+async def create_user() -> str:
+    """Creates a verified benchmark user and returns a bearer token for it."""
+    from app.core.security import get_jwt_strategy
+    from app.db import session as db_session
+    from app.models import Base, User
+
+    if db_session.engine.dialect.name == "sqlite":
+        async with db_session.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    async with db_session.SessionLocal() as db:
+        user = User(
+            id=uuid.uuid4(),
+            email=f"benchmark-{uuid.uuid4().hex[:12]}@example.com",
+            hashed_password="!",  # Never used to log in: the token is issued below
+            is_active=True,
+            is_verified=True,
+        )
+        db.add(user)
+        await db.commit()
+    return await get_jwt_strategy().write_token(user)
+
+
+async def round_trip(client, item, content: bytes, output_format: str, args: argparse.Namespace) -> Dict[str, Any]:
+    sample: Dict[str, Any] = {"input": item.name, "output_format": output_format}
+    started = time.perf_counter()
+    response = await client.post(
+        "/convert/upload",
+        params={"output_format": output_format},
+        files={"file": (item.name, content, item.content_type)},
+    )
+    uploaded = time.perf_counter()
+    sample["upload_seconds"] = uploaded - started
+    if response.status_code != 202:
+        sample.update(status=f"upload {response.status_code}", total_seconds=uploaded - started)
+        return sample
+    conversion_id = response.json()["conversion_id"]
+
+    status = None
+    while time.perf_counter() - uploaded < args.timeout:
+        status = (await client.get(f"/convert/status/{conversion_id}")).json().get("status")
+        if status in TERMINAL_STATUSES:
+            break
+        await asyncio.sleep(args.poll_interval)
+    converted = time.perf_counter()
+    sample.update(status=status if status in TERMINAL_STATUSES else "timeout", processing_seconds=converted - uploaded)
+    if status != "completed":
+        sample["total_seconds"] = converted - started
+        return sample
+
+    output_bytes = 0
+    async with client.stream("GET", f"/convert/download/{conversion_id}") as download:
+        async for chunk in download.aiter_bytes():
+            output_bytes += len(chunk)
+    finished = time.perf_counter()
+    sample.update(download_seconds=finished - converted, total_seconds=finished - started, output_bytes=output_bytes)
+    return sample
+
+
+async def run_load(client, jobs: list, concurrency: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(job):
+        async with semaphore:
+            return await round_trip(client, *job, args)
+
+    return await asyncio.gather(*(one(job) for job in jobs))
+
+
+def aggregate(samples: List[Dict[str, Any]], wall_seconds: float) -> List[Dict[str, Any]]:
+    from benchmarks.report import summarize
+
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for sample in samples:
+        groups[(sample["input"], sample["output_format"])].append(sample)
+    groups[("all", "all")] = samples
+
+    results = []
+    for (input_name, output_format), group in groups.items():
+        completed = [s for s in group if s["status"] == "completed"]
+        result = {
+            "input": input_name,
+            "output_format": output_format,
+            "requests": len(group),
+            "completed": len(completed),
+            "failed": len(group) - len(completed),
+        }
+        for metric in ("upload_seconds", "processing_seconds", "download_seconds", "total_seconds"):
+            result[metric] = summarize([s[metric] for s in completed])
+        if input_name == "all":
+            result["wall_seconds"] = wall_seconds
+            result["completed_per_second"] = len(completed) / wall_seconds if wall_seconds else 0.0
+        results.append(result)
+    return results
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+
+    from app.db import session as db_session
+    from app.services.events import close_redis
+    from benchmarks.corpus import build_corpus
+    from benchmarks.report import write_report
+
+    from app.converters import registry
+    from app.core.config import settings
+
+    corpus = []
+    for item in build_corpus(args.corpus, args.sizes.split(","), args.kinds.split(",")):
+        output_format = DEFAULT_OUTPUT_FORMATS.get(item.content_type, args.image_format)
+        # Benchmark what this deployment accepts (ALLOWED_CONTENT_TYPES, SUPPORTED_OUTPUT_FORMATS)
+        if (
+            item.content_type in settings.parsed_allowed_content_types
+            and output_format in settings.parsed_supported_output_formats
+            and registry.is_supported(item.content_type, output_format)
+        ):
+            corpus.append(item)
+        else:
+            print(f"Skipping {item.name}: {item.content_type} -> {output_format} is not enabled", file=sys.stderr)
+    if not corpus:
+        sys.exit("No corpus input is accepted by this configuration")
+    contents = {item.name: item.path.read_bytes() for item in corpus}
+    output_formats = {item.name: DEFAULT_OUTPUT_FORMATS.get(item.content_type, args.image_format) for item in corpus}
+
+    db_session.init_engine()
+    database = db_session.engine.dialect.name
+    token = await create_user()
+    inline_jobs = run_jobs_inline() if args.worker == "inline" else None
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        from main import app
+
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)  # main configures INFO logging on import
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout)
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    def jobs(count: int) -> list:
+        return [
+            (item, contents[item.name], output_formats[item.name])
+            for item in (corpus[index % len(corpus)] for index in range(count))
+        ]
+
+    try:
+        async with client:
+            if args.warmup:
+                await run_load(client, jobs(args.warmup), args.concurrency, args)
+            started = time.perf_counter()
+            samples = await run_load(client, jobs(args.requests), args.concurrency, args)
+            wall_seconds = time.perf_counter() - started
+    finally:
+        if inline_jobs:
+            await asyncio.gather(*inline_jobs, return_exceptions=True)
+        from app.worker.runtime import shutdown_runtime
+
+        shutdown_runtime()  # Stops the conversion process pool
+        await db_session.dispose_engine()
+        await close_redis()
+
+    results = aggregate(samples, wall_seconds)
+    overall = results[-1]
+    print(
+        f"{overall['completed']}/{overall['requests']} completed at concurrency {args.concurrency} in {wall_seconds:.1f}s "
+        f"({overall['completed_per_second']:.1f}/s); total p50 {overall['total_seconds'].get('p50', 0):.3f}s "
+        f"p99 {overall['total_seconds'].get('p99', 0):.3f}s",
+        file=sys.stderr,
+    )
+    write_report(
+        "end_to_end",
+        {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "sizes": args.sizes,
+            "kinds": args.kinds,
+            "image_format": args.image_format,
+            "worker": args.worker,
+            "redis": args.redis,
+            "base_url": args.base_url,
+            "poll_interval": args.poll_interval,
+            "result_cache": args.result_cache,
+            "database": database,
+        },
+        results,
+        args.output,
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    if args.output:
+        args.output = args.output.resolve()  # Before changing into the working directory
+    args.corpus = args.corpus.resolve()
+    prepare_environment(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Encode time vs. output size for each image encoder preset.
+
+Usage (from the backend directory):
+    python -m benchmarks.image_presets [--size 3000x2000] [--repeat 3] [--input photo.jpg]
+
+Without --input a synthetic photo-like image (gradients plus noise) is generated,
+since flat colors compress unrealistically well.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# The converter imports app settings; benchmarks don't need a real database or secret
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+
+from PIL import Image  # noqa: E402
+
+from app.converters.image import ENCODER_PRESETS, convert  # noqa: E402
+from benchmarks.corpus import synthetic_image  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="3000x2000", help="Synthetic image size, WIDTHxHEIGHT")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per preset/format; the median is reported")
+    parser.add_argument("--input", type=Path, help="Benchmark this image instead of a synthetic one")
+    parser.add_argument("--formats", default="jpg,png,webp", help="Comma-separated output formats")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        source = args.input
+        if source is None:
+            width, height = (int(v) for v in args.size.lower().split("x"))
+            source = tmp_dir / "source.png"
+            synthetic_image(width, height).save(source, compress_level=1)
+        with Image.open(source) as img:
+            print(f"Source: {source.name} {img.size[0]}x{img.size[1]} {img.mode}, {source.stat().st_size / 1024:.0f} KiB\n")
+
+        print(f"{'format':<6} {'preset':<9} {'median s':>9} {'size KiB':>10} {'vs balanced':>12}")
+        for output_format in args.formats.split(","):
+            rows = []
+            for preset in ENCODER_PRESETS:
+                output_path = tmp_dir / f"out-{preset}.{output_format}"
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    convert(source, output_path, output_format, options={"preset": preset})
+                    timings.append(time.perf_counter() - started)
+                rows.append((preset, statistics.median(timings), output_path.stat().st_size))
+            baseline = dict((preset, size) for preset, _, size in rows)["balanced"]
+            for preset, seconds, size in rows:
+                print(f"{output_format:<6} {preset:<9} {seconds:>9.3f} {size / 1024:>10.0f} {size / baseline:>11.2f}x")
+            print()
+
+
+if __name__ == "__main__":
+    main()
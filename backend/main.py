@@ -3,9 +3,11 @@ from fastapi import FastAPI
 # from dotenv import load_dotenv
 import os
 import logging # Import logging
+import secrets
 from fastapi.middleware.cors import CORSMiddleware # Import CORS
 from contextlib import asynccontextmanager # For lifespan events
-from fastapi import status
+from fastapi import HTTPException, Response, status
+import anyio
 
 # --- Rate Limiting Imports ---
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -20,6 +22,8 @@ from app.schemas.user import UserRead, UserCreate, UserUpdate # Import UserRead,
 from app.routers import conversion # Import the conversion router
 from app.core.config import settings # Import settings
 from app.db.session import init_engine, dispose_engine # Import engine lifecycle functions
+from app.services.events import close_redis # Redis client used by the event stream
+from app.services import metrics # Prometheus registry of this process
 
 # --- Rate Limiting Setup ---
 limiter = Limiter(key_func=get_remote_address, default_limits=["1000/hour", "100/minute"])
@@ -41,6 +45,7 @@ async def lifespan(app: FastAPI):
     logger.info("Disposing database engine...")
     await dispose_engine() # Dispose the database engine
     logger.info("Database engine disposed.")
+    await close_redis() # Close the event pub/sub connection pool
 # --- End App Lifecycle Setup ---
 
 app = FastAPI(
@@ -67,8 +72,9 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.BACKEND_CORS_ORIGINS, # Use configured origins
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], # More specific methods
-    allow_headers=["Content-Type", "Authorization"], # Common required headers
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"], # More specific methods
+    allow_headers=["Content-Type", "Authorization", "Idempotency-Key", "Upload-Offset", "Upload-Checksum"], # Common required headers, plus upload retries and chunks
+    expose_headers=["Location", "Upload-Offset", "Upload-Length"], # Resumable upload state
 )
 
 @app.get("/health", tags=["Health"], status_code=status.HTTP_200_OK)
@@ -77,6 +83,21 @@ async def health_check():
     # For now, just confirms the API is running
     return {"status": "ok"}
 
+# Prometheus scrape endpoint; per process, so scrape every API instance
+metrics.register_api_collectors()
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not secrets.compare_digest(request.headers.get("Authorization", ""), expected):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    # Collectors read the DB pool and the broker's queue lengths, so render off the event loop
+    body = await anyio.to_thread.run_sync(metrics.render)
+    return Response(content=body, media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Universal File Converter API"}
@@ -0,0 +1,28 @@
+"""Test-only converters for chained conversion plans (referenced by target string)."""
+from PIL import Image
+
+# Raw input format: b"<width>:<height>:" followed by RGB pixels
+RAW_CONTENT_TYPE = "image/x-test-raw"
+
+
+def raw_bytes(img: Image.Image) -> bytes:
+    width, height = img.size
+    return f"{width}:{height}:".encode() + img.convert("RGB").tobytes()
+
+
+def decode_raw(input_path, output_path, output_format, progress=None, options=None):
+    """Decodes the raw format to png or jpg; accepts paths and file objects like any `streams` converter."""
+    source = open(input_path, "rb") if not hasattr(input_path, "read") else input_path
+    try:
+        width, height, pixels = source.read().split(b":", 2)
+    finally:
+        if source is not input_path:
+            source.close()
+    img = Image.frombytes("RGB", (int(width), int(height)), pixels)
+    img.save(output_path, format="JPEG" if output_format == "jpg" else output_format.upper())
+    if progress:
+        progress.report(1.0, unit="stage")
+
+
+def fail(input_path, output_path, output_format, progress=None, options=None):
+    raise ValueError("test converter failed")
@@ -0,0 +1,5 @@
+import os
+
+# Settings are read at import time; tests that need a real database or Redis set their own
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
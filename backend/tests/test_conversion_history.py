@@ -0,0 +1,177 @@
+import asyncio
+import datetime
+import json
+import os
+import uuid
+
+import httpx
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.security import current_active_verified_user
+from app.db.session import get_db
+from app.models.conversion import Conversion, ConversionStatus
+from app.models.file import File
+from app.models.user import User
+from app.routers.conversion import _history_query
+
+# The plan checks need Postgres with the migrated schema. The database is reset, so use a
+# disposable one, e.g. TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/converter_test
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith("postgresql"), reason="TEST_DATABASE_URL is not a Postgres database"
+)
+
+HISTORY_INDEX = "ix_conversions_owner_id_created_at_id"
+USERS = 40
+CONVERSIONS_PER_USER = 250
+# Conversions created in the same second, like the rows of one batch
+ROWS_PER_TIMESTAMP = 5
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _engine():
+    return create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+
+
+def _migrate() -> None:
+    previous = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL  # Read by alembic/env.py
+    try:
+        command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
+    finally:
+        if previous is None:
+            del os.environ["DATABASE_URL"]
+        else:
+            os.environ["DATABASE_URL"] = previous
+
+
+async def _reset_schema() -> None:
+    engine = _engine()
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+    await engine.dispose()
+
+
+async def _seed() -> dict:
+    """Fills the history of USERS users; returns each user's conversion ids in history order."""
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    users, files, conversions = [], [], []
+    for number in range(USERS):
+        user_id, file_id = uuid.uuid4(), uuid.uuid4()
+        users.append({"id": user_id, "email": f"user{number}@example.com", "hashed_password": "x"})
+        files.append({
+            "id": file_id, "original_filename": "input.png", "storage_path": f"uploads/{file_id}",
+            "content_type": "image/png", "owner_id": user_id,
+        })
+        for index in range(CONVERSIONS_PER_USER):
+            conversions.append({
+                "id": uuid.uuid4(), "original_file_id": file_id, "owner_id": user_id,
+                "original_filename": "input.png", "output_format": "jpg", "status": ConversionStatus.COMPLETED,
+                "created_at": start + datetime.timedelta(seconds=index // ROWS_PER_TIMESTAMP),
+            })
+    engine = _engine()
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), users)
+        await conn.execute(insert(File), files)
+        await conn.execute(insert(Conversion), conversions)
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+
+    history = {}
+    for row in sorted(conversions, key=lambda row: (row["created_at"], row["id"]), reverse=True):
+        history.setdefault(row["owner_id"], []).append(row["id"])
+    return history
+
+
+@pytest.fixture(scope="module")
+def history():
+    asyncio.run(_reset_schema())
+    _migrate()
+    return asyncio.run(_seed())
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _explain(stmt) -> list:
+    engine = _engine()
+    async with engine.connect() as conn:
+        compiled = stmt.compile(dialect=conn.dialect)
+        params = compiled.construct_params()
+        result = await conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled.string}", tuple(params[name] for name in compiled.positiontup)
+        )
+        plan = result.scalar_one()
+    await engine.dispose()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return list(_plan_nodes(plan[0]["Plan"]))
+
+
+@pytest.mark.parametrize("page", ["first", "after_cursor"])
+def test_history_page_is_read_in_index_order(history, page):
+    owner_id, ids = next(iter(history.items()))
+    after = None
+    if page == "after_cursor":
+        after = (datetime.datetime(2025, 1, 1, 0, 0, 20, tzinfo=datetime.timezone.utc), ids[150])
+
+    nodes = asyncio.run(_explain(_history_query(owner_id, 21, after=after)))
+
+    assert any(node.get("Index Name") == HISTORY_INDEX for node in nodes), nodes
+    assert not [node for node in nodes if "Sort" in node["Node Type"]], nodes
+    assert not [
+        node for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in ("conversions", "files")
+    ], nodes
+
+
+async def _fetch_pages(owner_id: uuid.UUID, limit: int) -> list:
+    import main
+
+    engine = _engine()
+
+    async def session():
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+
+    async with AsyncSession(engine) as db:
+        user = await db.get(User, owner_id)
+    main.app.dependency_overrides[get_db] = session
+    main.app.dependency_overrides[current_active_verified_user] = lambda: user
+    pages = []
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            params = {"limit": limit}
+            while True:
+                response = await client.get("/convert/", params=params)
+                assert response.status_code == 200, response.text
+                pages.append([uuid.UUID(row["conversion_id"]) for row in response.json()])
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+                params = {"limit": limit, "cursor": cursor}
+            invalid = await client.get("/convert/", params={"cursor": "not-a-cursor"})
+            assert invalid.status_code == 400
+    finally:
+        main.app.dependency_overrides.clear()
+        await engine.dispose()
+    return pages
+
+
+def test_history_cursor_walks_every_row_once_across_tied_timestamps(history):
+    owner_id, ids = next(iter(history.items()))
+    # 7 does not divide ROWS_PER_TIMESTAMP, so most page boundaries fall inside a run of ties
+    pages = asyncio.run(_fetch_pages(owner_id, 7))
+
+    assert [row for page in pages for row in page] == ids
+    assert [len(page) for page in pages[:-1]] == [7] * (len(pages) - 1)
+    assert 0 < len(pages[-1]) <= 7
@@ -0,0 +1,246 @@
+import asyncio
+import tempfile
+import uuid
+
+import pytest
+from PIL import Image
+
+from app.converters import chain
+from app.converters.registry import MAX_PLAN_HOPS, ConverterRegistry, ConverterSpec, Hop, plan_label
+from app.core.config import settings
+from app.services import conversion_costs
+from app.worker import tasks
+from tests.chain_converters import RAW_CONTENT_TYPE, raw_bytes
+
+
+def _spec(name, input_types, output_formats, streams=True, target="tests.chain_converters:decode_raw"):
+    return ConverterSpec(
+        name=name,
+        input_types=frozenset(input_types),
+        output_formats=frozenset(output_formats),
+        target=target,
+        streams=streams,
+    )
+
+
+def _formats(plan):
+    return [hop.output_format for hop in plan]
+
+
+def _pillow():
+    return _spec("pillow", {"image/png", "image/jpeg", "image/bmp"}, {"png", "jpg", "webp"}, target="app.converters.image:convert")
+
+
+# --- Planning ---
+
+def test_direct_pair_is_used_even_when_a_chain_is_cheaper():
+    registry = ConverterRegistry()
+    registry.register(_spec("direct", {RAW_CONTENT_TYPE}, {"webp"}))
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png"}))
+    registry.register(_pillow())
+
+    plan = registry.plan(RAW_CONTENT_TYPE, "webp", cost=lambda hop: 100.0 if hop.spec.name == "direct" else 0.001)
+
+    assert [hop.spec.name for hop in plan] == ["direct"]
+
+
+def test_lossless_intermediate_beats_a_cheaper_lossy_one():
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png", "jpg"}))
+    registry.register(_pillow())
+
+    plan = registry.plan(RAW_CONTENT_TYPE, "webp", cost=lambda hop: 0.001 if hop.output_format == "jpg" else 10.0)
+
+    assert _formats(plan) == ["png", "webp"]
+    assert plan_label(plan) == "decode>pillow"
+
+
+def test_lossy_intermediate_is_used_when_nothing_else_connects():
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"jpg"}))
+    registry.register(_pillow())
+
+    assert _formats(registry.plan(RAW_CONTENT_TYPE, "webp")) == ["jpg", "webp"]
+
+
+def test_cost_decides_between_lossless_chains():
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png", "bmp"}))
+    registry.register(_pillow())
+
+    via_bmp = registry.plan(RAW_CONTENT_TYPE, "webp", cost=lambda hop: 0.1 if hop.output_format == "bmp" else 1.0)
+    via_png = registry.plan(RAW_CONTENT_TYPE, "webp", cost=lambda hop: 0.1 if hop.output_format == "png" else 1.0)
+
+    assert _formats(via_bmp) == ["bmp", "webp"]
+    assert _formats(via_png) == ["png", "webp"]
+    assert via_bmp[1] == Hop(registry.by_name("pillow"), "image/bmp", "webp")
+
+
+def test_fewest_hops_win_without_costs():
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"gif", "png"}))
+    registry.register(_spec("gif-to-bmp", {"image/gif"}, {"bmp"}))
+    registry.register(_pillow())
+
+    assert _formats(registry.plan(RAW_CONTENT_TYPE, "webp")) == ["png", "webp"]
+
+
+def test_plans_are_limited_to_max_plan_hops():
+    registry = ConverterRegistry()
+    registry.register(_spec("to-gif", {RAW_CONTENT_TYPE}, {"gif"}))
+    registry.register(_spec("to-bmp", {"image/gif"}, {"bmp"}))
+    registry.register(_spec("to-tiff", {"image/bmp"}, {"tiff"}))
+    registry.register(_spec("to-png", {"image/tiff"}, {"png"}))
+
+    assert len(registry.plan(RAW_CONTENT_TYPE, "tiff")) == MAX_PLAN_HOPS == 3
+    assert registry.plan(RAW_CONTENT_TYPE, "png") is None
+    assert "tiff" in registry.output_formats_for(RAW_CONTENT_TYPE)
+    assert "png" not in registry.output_formats_for(RAW_CONTENT_TYPE)
+
+
+def test_only_streaming_converters_pass_intermediates():
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png"}, streams=False))
+    registry.register(_pillow())
+    # Cannot produce an intermediate, but still handles its own pair
+    assert registry.plan(RAW_CONTENT_TYPE, "webp") is None
+    assert registry.is_supported(RAW_CONTENT_TYPE, "png")
+
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png"}))
+    registry.register(_spec("encode", {"image/png"}, {"webp"}, streams=False))
+    # Cannot read an intermediate
+    assert registry.plan(RAW_CONTENT_TYPE, "webp") is None
+
+
+# --- Running a chain ---
+
+class _RecordingSpool(tempfile.SpooledTemporaryFile):
+    created = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_size = kwargs.get("max_size")
+        _RecordingSpool.created.append(self)
+
+
+class _Progress:
+    def __init__(self):
+        self.values = []
+
+    def report(self, done, total=None, unit="steps"):
+        self.values.append(done)
+
+
+@pytest.fixture
+def chain_registry(monkeypatch, tmp_path):
+    registry = ConverterRegistry()
+    registry.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png"}))
+    registry.register(_pillow())
+    monkeypatch.setattr(chain, "registry", registry)
+    monkeypatch.setattr(chain.tempfile, "SpooledTemporaryFile", _RecordingSpool)
+    monkeypatch.setattr(settings, "TEMP_DIR", str(tmp_path))
+    _RecordingSpool.created = []
+    return registry
+
+
+@pytest.fixture
+def raw_input(tmp_path):
+    path = tmp_path / "input.raw"
+    path.write_bytes(raw_bytes(Image.effect_mandelbrot((120, 80), (-2, -1, 1, 1), 30)))
+    return path
+
+
+def _steps(plan):
+    return [(hop.spec.name, hop.content_type, hop.output_format) for hop in plan]
+
+
+def test_run_chain_spools_intermediates_and_times_every_hop(chain_registry, raw_input, tmp_path):
+    output_path = tmp_path / "output.webp"
+    progress = _Progress()
+
+    timings = chain.run_chain(_steps(chain_registry.plan(RAW_CONTENT_TYPE, "webp")), raw_input, output_path, progress)
+
+    with Image.open(output_path) as out:
+        assert (out.format, out.size) == ("WEBP", (120, 80))
+    [spool] = _RecordingSpool.created
+    assert spool.max_size == settings.CHAIN_SPOOL_MAX_BYTES
+    assert spool.closed
+    # Nothing but the input and the output was written to disk
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["input.raw", "output.webp"]
+
+    assert [size for size, _ in timings] == [raw_input.stat().st_size, timings[1][0]]
+    assert timings[1][0] > 0  # Size of the PNG intermediate
+    assert all(seconds >= 0 for _, seconds in timings)
+    assert progress.values == sorted(progress.values) and progress.values[-1] == 1.0
+
+
+def test_run_chain_closes_intermediates_when_a_hop_fails(chain_registry, raw_input, tmp_path, monkeypatch):
+    failing = ConverterRegistry()
+    failing.register(_spec("decode", {RAW_CONTENT_TYPE}, {"png"}))
+    failing.register(_spec("encode", {"image/png"}, {"webp"}, target="tests.chain_converters:fail"))
+    monkeypatch.setattr(chain, "registry", failing)
+
+    with pytest.raises(ValueError, match="test converter failed"):
+        chain.run_chain(_steps(failing.plan(RAW_CONTENT_TYPE, "webp")), raw_input, tmp_path / "output.webp")
+
+    assert [spool.closed for spool in _RecordingSpool.created] == [True]
+
+
+# --- Worker: planning with learned costs ---
+
+class _FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+
+def test_worker_runs_chains_and_learns_their_costs(chain_registry, raw_input, tmp_path, monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(conversion_costs, "get_redis", lambda: redis)
+    monkeypatch.setattr(conversion_costs, "_cached", None)
+    monkeypatch.setattr(tasks, "registry", chain_registry)
+    monkeypatch.setattr(tasks, "_reporter", lambda owner_id, output: None)
+
+    async def run_in_process(plan, *args, **kwargs):
+        return chain.run_chain(_steps(plan), *args, **kwargs)
+
+    monkeypatch.setattr(tasks, "run_converter_chain", run_in_process)
+    output = tasks._Output(uuid.uuid4(), "webp", None, None, path=tmp_path / "output.webp")
+
+    asyncio.run(tasks._convert_outputs(RAW_CONTENT_TYPE, raw_input, raw_input.stat().st_size, [output], uuid.uuid4()))
+
+    assert output.error is None
+    assert output.converter == "decode>pillow"
+    assert Image.open(output.path).format == "WEBP"
+    assert set(redis.hashes[conversion_costs.COSTS_KEY]) == {
+        f"decode:{RAW_CONTENT_TYPE}:png",
+        "pillow:image/png:webp",
+    }
+
+
+def test_cost_estimates_start_from_the_prior_and_follow_samples(monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(conversion_costs, "get_redis", lambda: redis)
+    monkeypatch.setattr(conversion_costs, "_cached", None)
+    hop = Hop(_pillow(), "image/png", "webp")
+    mib = 1024 * 1024
+
+    table = asyncio.run(conversion_costs.load_costs())
+    prior = table.estimate(hop, mib)
+    assert prior == pytest.approx(0.05 + 0.2)  # Overhead plus the "image" prior for 1 MiB
+
+    asyncio.run(conversion_costs.record_cost(hop, mib, 1.05))
+    asyncio.run(conversion_costs.record_cost(hop, mib, 2.05))
+
+    # First sample is taken as is (1.0 s/MiB), later ones are averaged in with weight 0.2
+    assert float(redis.hashes[conversion_costs.COSTS_KEY][conversion_costs.edge_key(hop)]) == pytest.approx(1.2)
+    assert table.estimate(hop, 2 * mib) == pytest.approx(0.05 + 2.4)
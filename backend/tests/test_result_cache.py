@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.routers import conversion
+from app.services import result_cache
+from app.services.ingest import IngestedFile
+from app.services.result_cache import ResultCache, cache_key
+from app.services.storage import LocalStorage, store_output
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path / "uploads", tmp_path / "converted")
+    monkeypatch.setattr(result_cache, "get_storage", lambda: storage)
+    monkeypatch.setattr(conversion, "get_storage", lambda: storage)
+    return storage
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    # One server stands in for the Redis shared by the API and the workers
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(result_cache, "get_redis", lambda: redis)
+    return redis
+
+
+def _convert(storage, tmp_path, data: bytes, output_format: str = "png"):
+    """What a worker does: writes an output and hands it to storage."""
+    path = tmp_path / f"{uuid.uuid4()}.{output_format}"
+    path.write_bytes(data)
+    return store_output(storage, path, storage.output_key(uuid.uuid4(), output_format))
+
+
+def _upload(content_hash: str) -> IngestedFile:
+    return IngestedFile(uuid.uuid4(), "file", "input.bmp", None, "image/bmp", "image/bmp", 10, content_hash)
+
+
+def test_outputs_stored_by_a_worker_are_reused_by_the_api(storage, redis, tmp_path, monkeypatch):
+    worker, api = ResultCache(max_bytes=1024, ttl_seconds=60), ResultCache(max_bytes=1024, ttl_seconds=60)
+    monkeypatch.setattr(conversion, "result_cache", api)
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    options = {"quality": 80}
+    stored = _convert(storage, tmp_path, b"converted")
+
+    asyncio.run(worker.store(cache_key("input-hash", "png", options), "png", stored))
+    conversion_id = uuid.uuid4()
+    reused = asyncio.run(conversion._reuse_cached_output(_upload("input-hash"), "png", options, conversion_id))
+    missed = asyncio.run(conversion._reuse_cached_output(_upload("other-hash"), "png", options, uuid.uuid4()))
+
+    assert reused.key == storage.output_key(conversion_id, "png")
+    assert (reused.sha256, reused.size) == (stored.sha256, stored.size)
+    with open(reused.key, "rb") as f:
+        assert f.read() == b"converted"
+    assert missed is None
+    # Cache entries are not uploads or outputs, so the orphan sweep leaves them alone
+    listed = {obj.key for obj in storage.list_objects()}
+    assert stored.key in listed and reused.key in listed
+    assert storage.result_cache_key(cache_key("input-hash", "png", options), "png") not in listed
+    # Counters are shared, whichever process updated them
+    stats = asyncio.run(worker.stats())
+    assert {name: stats[name] for name in ("hits", "misses", "stores", "entries", "bytes")} == {
+        "hits": 1, "misses": 1, "stores": 1, "entries": 1, "bytes": len(b"converted"),
+    }
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(storage, redis, tmp_path):
+    cache = ResultCache(max_bytes=30, ttl_seconds=60)
+    for name in ("a", "b", "c"):
+        asyncio.run(cache.store(name, "png", _convert(storage, tmp_path, b"x" * 10)))
+        time.sleep(0.01)
+    assert asyncio.run(cache.lookup("a", "png")) is not None  # "b" is now the least recently used
+
+    asyncio.run(cache.store("d", "png", _convert(storage, tmp_path, b"x" * 10)))
+
+    assert asyncio.run(cache.lookup("b", "png")) is None
+    assert not storage.stat(storage.result_cache_key("b", "png"))
+    assert all(asyncio.run(cache.lookup(name, "png")) for name in ("a", "c", "d"))
+    stats = asyncio.run(cache.stats())
+    assert (stats["evictions"], stats["bytes_evicted"], stats["entries"], stats["bytes"]) == (1, 10, 3, 30)
+
+
+def test_expired_entries_are_misses_and_leave_storage(storage, redis, tmp_path):
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60)
+    asyncio.run(cache.store("old", "png", _convert(storage, tmp_path, b"old")))
+    entry = json.loads(asyncio.run(redis.hget(result_cache.ENTRIES_KEY, "old.png")))
+    entry["created"] -= 120
+    asyncio.run(redis.hset(result_cache.ENTRIES_KEY, "old.png", json.dumps(entry)))
+
+    assert asyncio.run(cache.lookup("old", "png")) is None
+    assert not storage.stat(entry["key"])
+    stats = asyncio.run(cache.stats())
+    assert (stats["expired"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 0, 0)
+
+
+def test_entries_whose_object_is_gone_fall_back_to_a_conversion(storage, redis, tmp_path, monkeypatch):
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60)
+    monkeypatch.setattr(conversion, "result_cache", cache)
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    key = cache_key("input-hash", "png", {})
+    asyncio.run(cache.store(key, "png", _convert(storage, tmp_path, b"converted")))
+    storage.delete(storage.result_cache_key(key, "png"))
+
+    assert asyncio.run(conversion._reuse_cached_output(_upload("input-hash"), "png", {}, uuid.uuid4())) is None
+    assert asyncio.run(cache.lookup(key, "png")) is None
+    assert asyncio.run(cache.stats())["invalidated"] == 1
+
+
+def test_redis_errors_are_misses(storage, tmp_path, monkeypatch):
+    def unreachable():
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(result_cache, "get_redis", unreachable)
+    cache = ResultCache(max_bytes=1024, ttl_seconds=60)
+    stored = _convert(storage, tmp_path, b"converted")
+
+    asyncio.run(cache.store("key", "png", stored))
+    assert asyncio.run(cache.lookup("key", "png")) is None
+    assert not storage.stat(storage.result_cache_key("key", "png"))
@@ -2,11 +2,26 @@ import apiClient from './api';
 
 interface UploadResponse {
     message: string;
-    task_id: string;
+    task_id: string | null; // null when every format came from the result cache
     // Add conversion_id if backend sends it
     conversion_id?: string; 
+    cached?: boolean;
+    // One entry per requested output format, in request order
+    conversions?: { conversion_id: string; output_format: string; cached: boolean }[];
 }
 
+// Returned by every /convert/uploads call (resumable uploads)
+interface ChunkedUploadResponse {
+    upload_id: string;
+    size: number;
+    offset: number; // Bytes received so far; the next chunk starts here
+    complete: boolean;
+    finalize_url: string;
+    max_chunk_size?: number; // Only when the upload is created
+}
+
+const CHUNK_SIZE = 8 * 1024 * 1024; // At least 5 MB: the S3 minimum part size
+
 // Interface matching the data returned by GET /convert/status/{conversion_id}
 interface ConversionStatusResponse {
     conversion_id: string;
@@ -18,19 +33,25 @@ interface ConversionStatusResponse {
     created_at: string; // ISO date string
     updated_at: string; // ISO date string
     original_filename: string;
+    preview_sizes: number[] | null; // Thumbnail sizes available once the worker has rendered them
+    preview_url: string | null; // Path of the smallest thumbnail, see getPreviewObjectUrl
 }
 
 export const fileService = {
-  uploadFile: async (file: File, outputFormat: string): Promise<UploadResponse> => {
+  // Pass the same idempotencyKey (e.g. crypto.randomUUID() per file) when retrying an upload:
+  // the backend then returns the first attempt's conversion instead of starting another one
+  // Several output formats are converted from one upload (and one decode of the image)
+  uploadFile: async (file: File, outputFormat: string | string[], idempotencyKey?: string): Promise<UploadResponse> => {
     const formData = new FormData();
     formData.append('file', file);
-    formData.append('output_format', outputFormat);
+    formData.append('output_format', Array.isArray(outputFormat) ? outputFormat.join(',') : outputFormat);
 
     try {
       // Use apiClient but override Content-Type for FormData
       const response = await apiClient.post<UploadResponse>('/convert/upload', formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
+          ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
         },
         // Optional: Add progress tracking
         // onUploadProgress: (progressEvent) => {
@@ -45,6 +66,44 @@ export const fileService = {
     }
   },
 
+  // Sends a large file in chunks that survive dropped connections. Keep the returned upload_id
+  // (e.g. in localStorage) and pass it back as resumeUploadId to continue after a failure.
+  uploadFileResumable: async (
+    file: File,
+    outputFormat: string,
+    onProgress?: (sent: number, total: number) => void,
+    resumeUploadId?: string,
+  ): Promise<UploadResponse> => {
+    let upload: ChunkedUploadResponse;
+    if (resumeUploadId) {
+      upload = (await apiClient.get<ChunkedUploadResponse>(`/convert/uploads/${resumeUploadId}`)).data;
+    } else {
+      upload = (await apiClient.post<ChunkedUploadResponse>(
+        '/convert/uploads',
+        { filename: file.name, size: file.size },
+        { params: { output_format: outputFormat } },
+      )).data;
+    }
+    const chunkSize = Math.min(CHUNK_SIZE, upload.max_chunk_size ?? CHUNK_SIZE);
+    let offset = upload.offset;
+    while (offset < file.size) {
+      const chunk = file.slice(offset, offset + chunkSize);
+      const digest = await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+      const checksum = btoa(String.fromCharCode(...new Uint8Array(digest)));
+      const response = await apiClient.patch<ChunkedUploadResponse>(`/convert/uploads/${upload.upload_id}`, chunk, {
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(offset),
+          'Upload-Checksum': `sha256 ${checksum}`,
+        },
+      });
+      offset = response.data.offset;
+      onProgress?.(offset, file.size);
+    }
+    const response = await apiClient.post<UploadResponse>(`/convert/uploads/${upload.upload_id}/finalize`);
+    return response.data;
+  },
+
   // Define the expected shape of the status response from the backend
   // Based on the backend endpoint: /convert/status/{conversion_id}
   checkConversionStatus: async (conversionId: string): Promise<ConversionStatusResponse> => {
@@ -86,5 +145,20 @@ export const fileService = {
     return `${cleanBaseUrl}${path}`;
   },
 
+  // Fetches a thumbnail (GET /convert/preview/{conversion_id}) with the auth header and returns
+  // an object URL for an <img>. Call URL.revokeObjectURL when the image is no longer shown.
+  getPreviewObjectUrl: async (conversionId: string, size?: number): Promise<string> => {
+    try {
+      const response = await apiClient.get<Blob>(`/convert/preview/${conversionId}`, {
+        params: size ? { size } : undefined,
+        responseType: 'blob',
+      });
+      return URL.createObjectURL(response.data);
+    } catch (error) {
+      console.error(`Error fetching preview for conversion ${conversionId}:`, error);
+      throw error;
+    }
+  },
+
   // Optional: Add other file-related service calls here
 }; 
\ No newline at end of file